@@ -0,0 +1,101 @@
+/**
+ * Facet filtering over artifacts/facets.json (built by FacetIndexTask).
+ *
+ * Each facet value carries a bitset of the docs that have it, so a
+ * filter is a few bitwise ORs (values within a facet) and ANDs (across
+ * facets) over byte arrays, and the counts shown next to each value are
+ * popcounts of the intersection.
+ */
+
+// Set bits per byte value
+const POPCOUNT = Uint8Array.from({ length: 256 }, (_, byte) => {
+  let count = 0;
+  for (let b = byte; b; b >>= 1) count += b & 1;
+  return count;
+});
+
+/**
+ * Decode a base64 little-endian bitset (doc i is bit i & 7 of byte i >> 3).
+ */
+export function decodeBits(encoded) {
+  return Uint8Array.from(atob(encoded), ch => ch.charCodeAt(0));
+}
+
+export async function loadFacets(baseUrl) {
+  const index = await (await fetch(`${baseUrl}artifacts/facets.json`)).json();
+  // Decode every bitset once
+  for (const values of Object.values(index.facets)) {
+    for (const entry of Object.values(values)) {
+      entry.mask = decodeBits(entry.bits);
+    }
+  }
+  return index;
+}
+
+function allBits(index) {
+  const bits = new Uint8Array(Math.ceil(index.docCount / 8)).fill(0xff);
+  // Clear the padding bits past the last doc
+  if (index.docCount % 8) bits[bits.length - 1] = (1 << (index.docCount % 8)) - 1;
+  return bits;
+}
+
+/**
+ * Get the bitset of docs matching a selection such as
+ * { tags: ['OCR Required'], language: ['Arabic', 'Hebrew'] }:
+ * any selected value within a facet, every facet with a selection.
+ */
+export function filterBits(index, selection) {
+  const result = allBits(index);
+  for (const [facet, values] of Object.entries(selection)) {
+    if (!values || !values.length) continue;
+    const union = new Uint8Array(result.length);
+    for (const value of values) {
+      const mask = index.facets[facet]?.[value]?.mask;
+      if (!mask) continue;
+      for (let i = 0; i < union.length; i++) union[i] |= mask[i];
+    }
+    for (let i = 0; i < result.length; i++) result[i] &= union[i];
+  }
+  return result;
+}
+
+/**
+ * Count the docs in a bitset.
+ */
+export function countBits(bits) {
+  let count = 0;
+  for (const byte of bits) count += POPCOUNT[byte];
+  return count;
+}
+
+/**
+ * Counts of every facet value among the docs in a bitset.
+ *
+ * @returns {Object} { facet: { value: count } }
+ */
+export function facetCounts(index, bits) {
+  const counts = {};
+  for (const [facet, values] of Object.entries(index.facets)) {
+    counts[facet] = {};
+    for (const [value, entry] of Object.entries(values)) {
+      let count = 0;
+      for (let i = 0; i < bits.length; i++) count += POPCOUNT[bits[i] & entry.mask[i]];
+      counts[facet][value] = count;
+    }
+  }
+  return counts;
+}
+
+/**
+ * Get the docs ({ slug, id }) whose bits are set.
+ */
+export function docsFromBits(index, bits) {
+  const docs = [];
+  for (let i = 0; i < bits.length; i++) {
+    if (!bits[i]) continue;
+    for (let bit = 0; bit < 8; bit++) {
+      if (bits[i] & (1 << bit)) docs.push(index.docs[i * 8 + bit]);
+    }
+  }
+  return docs;
+}
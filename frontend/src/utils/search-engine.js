@@ -0,0 +1,430 @@
+/**
+ * Client-side query engine for the sharded inverted search index
+ * (artifacts/search/, built by SearchIndexTask).
+ *
+ * Postings carry precomputed BM25F weights, so a query only fetches the
+ * shards of its own terms and sums their posting lists.
+ */
+
+const STOP_WORDS = new Set([
+  'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+  'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were'
+]);
+
+// Same ranges as CJK_RANGES in processor/utils/text.py
+const CJK_CHARS = '\\u1100-\\u11ff\\u3040-\\u30ff\\u3130-\\u318f\\u31f0-\\u31ff\\u3400-\\u4dbf' +
+  '\\u4e00-\\u9fff\\uac00-\\ud7af\\uf900-\\ufaff\\u{20000}-\\u{2fa1f}';
+// A CJK run, or a run of letters/numbers/marks/underscores that aren't CJK
+const TOKEN_RE = new RegExp(
+  `(?:(?=[\\p{L}\\p{N}\\p{M}])[${CJK_CHARS}])+|(?:(?![${CJK_CHARS}])[\\p{L}\\p{N}\\p{M}_])+`,
+  'gu'
+);
+const CJK_RE = new RegExp(`^[${CJK_CHARS}]`, 'u');
+
+// Soft hyphen, ZWNJ/ZWJ, Arabic tatweel, harakat and superscript alef
+const REMOVED_RE = /[\u00ad\u200c\u200d\u0640\u064b-\u065f\u0670]/g;
+// Alef variants -> alef, alef maksura -> yeh, teh marbuta -> heh
+const ARABIC_LETTERS = {
+  '\u0622': '\u0627', '\u0623': '\u0627', '\u0625': '\u0627', '\u0671': '\u0627',
+  '\u0649': '\u064a',
+  '\u0629': '\u0647'
+};
+const ARABIC_RE = /[\u0622\u0623\u0625\u0671\u0649\u0629]/g;
+
+// Weight of terms matched by prefix (the word still being typed)
+const PREFIX_WEIGHT = 0.7;
+const MAX_PREFIX_TERMS = 10;
+// Weight of terms substituted for a misspelled word
+const FUZZY_WEIGHT = 0.5;
+const MAX_FUZZY_TERMS = 3;
+// Bigrams searched for a lone CJK character (most common first)
+const MAX_CHAR_TERMS = 50;
+
+/**
+ * Normalize text for indexing. Mirrors normalize() in processor/utils/text.py.
+ */
+export function normalize(text) {
+  return (text || '')
+    .normalize('NFKC')
+    .toLowerCase()
+    .replace(REMOVED_RE, '')
+    .replace(ARABIC_RE, ch => ARABIC_LETTERS[ch]);
+}
+
+/**
+ * Split text into lowercase search terms.
+ * Mirrors tokenize() in processor/utils/text.py.
+ */
+export function tokenize(text, minLength = 2) {
+  const tokens = [];
+  for (const run of normalize(text).match(TOKEN_RE) || []) {
+    if (CJK_RE.test(run)) {
+      // Character bigrams for scripts written without spaces
+      const chars = Array.from(run);
+      if (chars.length === 1) {
+        tokens.push(run);
+      }
+      for (let i = 0; i < chars.length - 1; i++) {
+        tokens.push(chars[i] + chars[i + 1]);
+      }
+      continue;
+    }
+    const parts = [run];
+    if (run.includes('_')) {
+      parts.push(...run.split('_').filter(Boolean));
+    }
+    for (const part of parts) {
+      if (Array.from(part).length >= minLength && !STOP_WORDS.has(part)) {
+        tokens.push(part);
+      }
+    }
+  }
+  return tokens;
+}
+
+/**
+ * 32-bit FNV-1a hash of the UTF-8 bytes of text.
+ * Mirrors fnv1a_32() in processor/utils/text.py.
+ */
+export function fnv1a32(text) {
+  let hash = 0x811c9dc5;
+  for (const byte of new TextEncoder().encode(text)) {
+    hash ^= byte;
+    hash = Math.imul(hash, 0x01000193) >>> 0;
+  }
+  return hash >>> 0;
+}
+
+/**
+ * Fetch the index manifest and document table. Shards are fetched
+ * later, only when a query needs them.
+ */
+export async function loadSearchIndex(baseUrl) {
+  const root = `${baseUrl}artifacts/search/`;
+  // The manifest has a fixed name, so always revalidate it
+  const manifest = await (await fetch(`${root}manifest.json`, { cache: 'no-cache' })).json();
+  const docs = await (await fetch(`${root}${manifest.docs}`)).json();
+  return {
+    root,
+    manifest,
+    docs,
+    shards: new Map(),   // shard number -> Promise of { postings, terms }
+    decoded: new Map()
+  };
+}
+
+function shardFor(index, term) {
+  const key = Array.from(term).slice(0, index.manifest.prefixLength).join('');
+  return fnv1a32(key) % index.manifest.shardCount;
+}
+
+/**
+ * Fetch (once) the shard holding a term and all terms sharing its prefix.
+ */
+function loadShard(index, term) {
+  return loadShardNumber(index, shardFor(index, term));
+}
+
+function loadShardNumber(index, number) {
+  if (!index.shards.has(number)) {
+    const file = index.manifest.shards[number];
+    const shard = file
+      ? fetch(`${index.root}${file}`)
+          .then(response => response.json())
+          .then(data => ({ postings: data.postings, terms: Object.keys(data.postings).sort() }))
+      : Promise.resolve({ postings: {}, terms: [] });
+    index.shards.set(number, shard);
+  }
+  return index.shards.get(number);
+}
+
+/**
+ * Decode a term's delta-encoded posting list into [docId, score] pairs,
+ * applying the term's IDF to the stored BM25F weights.
+ */
+function getPostings(index, shard, term) {
+  if (index.decoded.has(term)) {
+    return index.decoded.get(term);
+  }
+  const encoded = shard.postings[term];
+  const pairs = [];
+  if (encoded) {
+    const { docCount, scoreScale } = index.manifest;
+    const df = encoded.length / 2;
+    const idf = Math.log(1 + (docCount - df + 0.5) / (df + 0.5));
+    let docId = 0;
+    for (let i = 0; i < encoded.length; i += 2) {
+      docId += encoded[i];
+      pairs.push([docId, idf * encoded[i + 1] / scoreScale]);
+    }
+  }
+  index.decoded.set(term, pairs);
+  return pairs;
+}
+
+/**
+ * Find a shard's terms starting with a prefix (binary search over its sorted terms).
+ */
+function expandPrefix(shard, prefix) {
+  let lo = 0;
+  let hi = shard.terms.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (shard.terms[mid] < prefix) lo = mid + 1;
+    else hi = mid;
+  }
+  const matches = [];
+  for (let i = lo; i < shard.terms.length && matches.length < MAX_PREFIX_TERMS; i++) {
+    if (!shard.terms[i].startsWith(prefix)) break;
+    matches.push(shard.terms[i]);
+  }
+  return matches;
+}
+
+/**
+ * Find the terms containing a lone CJK character: the character itself
+ * and the bigrams it starts or ends. Bigrams are sharded by both their
+ * characters, so every shard is fetched.
+ *
+ * @returns {Promise<Array>} [[term, shard], ...]
+ */
+async function characterTerms(index, char) {
+  const numbers = Array.from({ length: index.manifest.shardCount }, (_, number) => number);
+  const shards = await Promise.all(numbers.map(number => loadShardNumber(index, number)));
+  const matches = [];
+  for (const shard of shards) {
+    for (const term of shard.terms) {
+      if (term === char || (Array.from(term).length === 2 && (term.startsWith(char) || term.endsWith(char)))) {
+        matches.push([term, shard]);
+      }
+    }
+  }
+  // Most documents first, then alphabetically
+  return matches
+    .sort((a, b) => b[1].postings[b[0]].length - a[1].postings[a[0]].length || (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0))
+    .slice(0, MAX_CHAR_TERMS);
+}
+
+/**
+ * Get term and every string made by deleting up to maxDistance characters.
+ * Mirrors deletes() in processor/utils/fuzzy.py.
+ */
+function deletes(term, maxDistance) {
+  const results = new Set([term]);
+  let frontier = [term];
+  for (let d = 0; d < maxDistance; d++) {
+    const next = [];
+    for (const item of frontier) {
+      const chars = Array.from(item);
+      if (chars.length <= 1) continue;
+      for (let i = 0; i < chars.length; i++) {
+        const candidate = chars.slice(0, i).concat(chars.slice(i + 1)).join('');
+        if (!results.has(candidate)) {
+          results.add(candidate);
+          next.push(candidate);
+        }
+      }
+    }
+    frontier = next;
+  }
+  return results;
+}
+
+/**
+ * Optimal string alignment distance, or maxDistance + 1 once exceeded.
+ * Mirrors edit_distance() in processor/utils/fuzzy.py.
+ */
+function editDistance(a, b, maxDistance) {
+  a = Array.from(a);
+  b = Array.from(b);
+  if (Math.abs(a.length - b.length) > maxDistance) return maxDistance + 1;
+
+  let previous2 = null;
+  let previous = Array.from({ length: b.length + 1 }, (_, j) => j);
+  for (let i = 1; i <= a.length; i++) {
+    const current = [i];
+    for (let j = 1; j <= b.length; j++) {
+      const cost = a[i - 1] === b[j - 1] ? 0 : 1;
+      current[j] = Math.min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost);
+      if (previous2 && i > 1 && j > 1 && a[i - 1] === b[j - 2] && a[i - 2] === b[j - 1]) {
+        current[j] = Math.min(current[j], previous2[j - 2] + 1);
+      }
+    }
+    if (Math.min(...current) > maxDistance) return maxDistance + 1;
+    previous2 = previous;
+    previous = current;
+  }
+  return previous[b.length];
+}
+
+/**
+ * Shard of a typo dictionary deletion key, hashed by its first character.
+ * Mirrors delete_shard() in processor/utils/fuzzy.py.
+ */
+function typoShardFor(index, key) {
+  return fnv1a32(Array.from(key).slice(0, 1).join('')) % index.manifest.typos.shardCount;
+}
+
+/**
+ * Fetch (once) a typo dictionary deletion shard.
+ */
+function loadTypoShard(index, number) {
+  if (!index.typoShards) index.typoShards = new Map();
+  if (!index.typoShards.has(number)) {
+    const file = index.manifest.typos.shards[number];
+    index.typoShards.set(number, file
+      ? fetch(`${index.root}${file}`).then(response => response.json()).then(data => data.deletes)
+      : Promise.resolve({}));
+  }
+  return index.typoShards.get(number);
+}
+
+/**
+ * Find indexed terms within the typo dictionary's edit distance of a term,
+ * using the precomputed SymSpell deletions. The word list and the shards
+ * holding the term's deletions (sharded by their first character, so at
+ * most maxDistance + 1 of them) are fetched on first use.
+ * Mirrors lookup() in processor/utils/fuzzy.py.
+ *
+ * @returns {Promise<Array>} [[word, distance], ...] closest first
+ */
+export async function fuzzyLookup(index, term) {
+  if (!index || !index.manifest.typos) return [];
+  const { maxDistance, prefixLength } = index.manifest.typos;
+  if (!index.typoWords) {
+    index.typoWords = fetch(`${index.root}${index.manifest.typos.words}`)
+      .then(response => response.json())
+      .then(data => data.words);
+  }
+
+  const prefix = Array.from(term).slice(0, prefixLength).join('');
+  const keys = [...deletes(prefix, maxDistance)];
+  const numbers = [...new Set(keys.map(key => typoShardFor(index, key)))];
+  const [words, ...tables] = await Promise.all([
+    index.typoWords,
+    ...numbers.map(number => loadTypoShard(index, number))
+  ]);
+  const byNumber = new Map(numbers.map((number, i) => [number, tables[i]]));
+
+  const candidates = new Set();
+  for (const key of keys) {
+    const table = byNumber.get(typoShardFor(index, key));
+    for (const wordId of table[key] || []) candidates.add(wordId);
+  }
+
+  const matches = [];
+  for (const wordId of candidates) {
+    const distance = editDistance(term, words[wordId], maxDistance);
+    if (distance <= maxDistance) matches.push([distance, wordId]);
+  }
+  return matches
+    .sort((a, b) => a[0] - b[0] || a[1] - b[1])
+    .map(([distance, wordId]) => [words[wordId], distance]);
+}
+
+/**
+ * Score documents for a query.
+ *
+ * Each query term contributes its BM25F score; the last term is also
+ * matched as a prefix, since the user may still be typing it. A term
+ * that isn't in the index is replaced by its closest spellings. Only
+ * the shards holding the query's terms are fetched, except for a lone
+ * CJK character, which matches bigrams in every shard.
+ *
+ * @returns {Promise<Array>} [{ doc, score }] sorted by descending score
+ */
+export async function searchDocuments(index, query, limit = 10) {
+  if (!index) return [];
+
+  const queryTerms = tokenize(query);
+  const shards = await Promise.all(queryTerms.map(term => loadShard(index, term)));
+  const scores = new Map();
+
+  for (const [position, term] of queryTerms.entries()) {
+    const shard = shards[position];
+    // Best score per document for this query term
+    const termScores = new Map();
+    const candidates = [[term, 1, shard]];
+    const loneChar = Array.from(term).length === 1 && CJK_RE.test(term);
+    if (loneChar) {
+      // A lone CJK character matches the bigrams it is part of
+      for (const [match, matchShard] of await characterTerms(index, term)) {
+        if (match !== term) candidates.push([match, 1, matchShard]);
+      }
+    } else if (position === queryTerms.length - 1) {
+      for (const match of expandPrefix(shard, term)) {
+        if (match !== term) candidates.push([match, PREFIX_WEIGHT, shard]);
+      }
+    }
+
+    // Unknown word: fall back to the closest spellings in the vocabulary
+    if (!loneChar && candidates.length === 1 && !shard.postings[term]) {
+      const corrections = await fuzzyLookup(index, term);
+      const best = corrections.length ? corrections[0][1] : 0;
+      for (const [word, distance] of corrections.slice(0, MAX_FUZZY_TERMS)) {
+        if (distance > best) break;
+        candidates.push([word, FUZZY_WEIGHT, await loadShard(index, word)]);
+      }
+    }
+
+    for (const [candidate, weight, candidateShard] of candidates) {
+      for (const [docId, score] of getPostings(index, candidateShard, candidate)) {
+        const weighted = score * weight;
+        if (weighted > (termScores.get(docId) || 0)) {
+          termScores.set(docId, weighted);
+        }
+      }
+    }
+
+    for (const [docId, score] of termScores) {
+      scores.set(docId, (scores.get(docId) || 0) + score);
+    }
+  }
+
+  return Array.from(scores, ([docId, score]) => ({ doc: index.docs[docId], score }))
+    .filter(result => result.doc)
+    .sort((a, b) => b.score - a.score)
+    .slice(0, limit);
+}
+
+/**
+ * Complete a prefix from the autocomplete trie (fetched on first use).
+ * Mirrors complete() in processor/utils/trie.py: the walk touches at
+ * most one edge per typed character, and each node stores its best
+ * completions.
+ *
+ * @returns {Promise<Array>} [[text, weight], ...] by descending weight
+ */
+export async function complete(index, prefix) {
+  if (!index || !index.manifest.autocomplete) return [];
+  if (!index.autocomplete) {
+    index.autocomplete = fetch(`${index.root}${index.manifest.autocomplete}`)
+      .then(response => response.json());
+  }
+  const trie = await index.autocomplete;
+
+  let node = trie.root;
+  // Empty tries of older builds
+  if (node === null) return [];
+  let remaining = normalize(prefix);
+  while (remaining) {
+    if (typeof node === 'number') return [];
+    let next = null;
+    for (const [label, child] of Object.entries(node[1])) {
+      if (remaining.startsWith(label)) {
+        next = child;
+        remaining = remaining.slice(label.length);
+        break;
+      }
+      if (label.startsWith(remaining)) {
+        next = child;
+        remaining = '';
+        break;
+      }
+    }
+    if (next === null) return [];
+    node = next;
+  }
+  const top = typeof node === 'number' ? [node] : node[0];
+  return top.map(entry => trie.entries[entry]);
+}
@@ -0,0 +1,35 @@
+/**
+ * Method call sites from artifacts/usage_index.json (built by UsageIndexTask).
+ *
+ * Sites are stored as [doc, cell, line, kwargs, args], with doc an index
+ * into the [pdf id, slug, title] docs list.
+ */
+
+export async function loadUsageIndex(baseUrl) {
+  const response = await fetch(`${baseUrl}artifacts/usage_index.json`);
+  return response.json();
+}
+
+/**
+ * Expand a method's sites into usage entries:
+ * { example, slug, title, cell, line, usage: { method, args, kwargs } }
+ */
+export function methodSites(index, method) {
+  const entry = index.methods[method];
+  if (!entry) return [];
+  return entry.sites.map(([doc, cell, line, kwargs, args]) => {
+    const [example, slug, title] = index.docs[doc];
+    return { example, slug, title, cell, line, usage: { method, args, kwargs } };
+  });
+}
+
+/**
+ * Usage entries of every method, keyed by method name.
+ */
+export function usageByMethod(index) {
+  const byMethod = {};
+  for (const method of Object.keys(index.methods)) {
+    byMethod[method] = methodSites(index, method);
+  }
+  return byMethod;
+}
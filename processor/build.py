@@ -17,9 +17,9 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from core import Config, GalleryProcessor
 from tasks import (
-    MetadataTask, ExecutionTask, ScreenshotTask,
-    SearchIndexTask, ValidationTask, NotebookTask, DashboardTask,
-    TaskContext
+    MetadataTask, ExecutionTask, ScreenshotTask, ThumbnailSpriteTask,
+    SearchIndexTask, RelatedExamplesTask, FacetIndexTask, UsageIndexTask,
+    ValidationTask, NotebookTask, DashboardTask, TaskContext
 )
 
 
@@ -30,13 +30,13 @@ def main():
     )
     parser.add_argument(
         "command",
-        choices=["build", "clean", "status", "rebuild", "diagnose", "dashboard"],
+        choices=["build", "clean", "status", "rebuild", "diagnose", "dashboard", "bench-render", "bench-search", "bench-parse", "bench-memory"],
         help="Command to run"
     )
     parser.add_argument(
         "--steps",
         nargs="+",
-        choices=["metadata", "execution", "screenshots", "search_index", "validation", "notebooks", "dashboard"],
+        choices=["metadata", "execution", "screenshots", "sprites", "search_index", "related", "facets", "usage_index", "validation", "notebooks", "dashboard"],
         help="Specific steps to run (default: all)"
     )
     parser.add_argument(
@@ -53,6 +53,22 @@ def main():
         "--pdf",
         help="Process only a specific PDF by ID"
     )
+    parser.add_argument(
+        "--queries",
+        help="bench-search: JSON file of [{\"query\": ..., \"relevant\": [doc ids]}] (default: derived from the index)"
+    )
+    parser.add_argument(
+        "-k",
+        type=int,
+        default=10,
+        help="bench-search: results per query for recall@k (default: 10)"
+    )
+    parser.add_argument(
+        "--approaches",
+        type=int,
+        default=10000,
+        help="bench-memory: approaches in the synthetic gallery (default: 10000)"
+    )
     
     args = parser.parse_args()
     
@@ -67,10 +83,35 @@ def main():
     
     # Register all tasks
     all_tasks = {
-        'metadata': MetadataTask(),
+        'metadata': MetadataTask(
+            cache_dir=Path(__file__).parent / ".analysis_cache" if config.get('analysis_cache', True) else None,
+            workers=config.get('metadata_workers')
+        ),
         'execution': ExecutionTask(),
-        'screenshots': ScreenshotTask(),
-        'search_index': SearchIndexTask(),
+        'screenshots': ScreenshotTask(
+            max_pages=config.get('screenshot_max_pages', 10),
+            dpi=config.screenshot_dpi,
+            thumbnail_size=tuple(config.get('thumbnail_size', (400, 400))),
+            mode=config.get('screenshot_mode', 'all'),
+            thumbnail_dpi=config.get('screenshot_thumbnail_dpi', 72),
+            renderer=config.get('screenshot_renderer', 'poppler'),
+            tiles=config.get('screenshot_tiles', False),
+            tile_threshold=config.get('screenshot_tile_threshold', 4096)
+        ),
+        'sprites': ThumbnailSpriteTask(
+            cell_size=tuple(config.get('sprite_cell_size', (340, 440))),
+            columns=config.get('sprite_columns', 4),
+            rows=config.get('sprite_rows', 4)
+        ),
+        'search_index': SearchIndexTask(
+            shard_count=config.get('search_shard_count', 16),
+            size_budget=config.get('search_size_budget')
+        ),
+        'related': RelatedExamplesTask(
+            top_k=config.get('related_top_k', 5)
+        ),
+        'facets': FacetIndexTask(),
+        'usage_index': UsageIndexTask(),
         'validation': ValidationTask(),
         'notebooks': NotebookTask(),
         'dashboard': DashboardTask()
@@ -98,6 +139,7 @@ def main():
         # Sync to frontend if successful
         if success:
             processor.sync_to_frontend()
+            processor.publish()
         
         sys.exit(0 if success else 1)
         
@@ -106,6 +148,7 @@ def main():
         success = processor.process_all(force=True)
         if success:
             processor.sync_to_frontend()
+            processor.publish()
         sys.exit(0 if success else 1)
         
     elif args.command == "clean":
@@ -119,7 +162,7 @@ def main():
         # Check artifacts
         artifacts_exist = {
             "Metadata": (config.artifacts_dir / "all_metadata.json").exists(),
-            "Search Index": (config.artifacts_dir / "search_index.compact.json").exists(),
+            "Search Index": (config.artifacts_dir / "search" / "manifest.json").exists(),
             "Valid PDFs": (config.artifacts_dir / "valid_pdfs.json").exists(),
             "Screenshots": (config.artifacts_dir / "screenshots").exists(),
             "Executions": (config.artifacts_dir / "executions").exists(),
@@ -140,7 +183,7 @@ def main():
         
         # Show last build times
         print(f"\nLast Build Times:")
-        for step in ['metadata', 'execution', 'screenshots', 'search_index', 'validation', 'notebooks', 'dashboard']:
+        for step in ['metadata', 'execution', 'screenshots', 'sprites', 'search_index', 'related', 'facets', 'usage_index', 'validation', 'notebooks', 'dashboard']:
             last_time = processor.cache.get_last_build_time(step)
             if last_time:
                 time_str = last_time.strftime("%Y-%m-%d %H:%M:%S")
@@ -325,8 +368,6 @@ def main():
     
     elif args.command == "dashboard":
         # Quick dashboard generation
-        from domain import Gallery
-        
         # Create minimal context
         context = TaskContext(
             artifacts_dir=config.artifacts_dir,
@@ -336,13 +377,8 @@ def main():
             verbose=True
         )
         
-        # Get all PDFs
-        gallery = Gallery(
-            content_dir=config.content_dir,
-            artifacts_dir=config.artifacts_dir
-        )
         # Get all PDFs (both published and unpublished)
-        all_pdfs = list(gallery.examples.values())
+        all_pdfs = list(processor.gallery.index.examples.values())
         
         # Run dashboard task
         dashboard_task = DashboardTask()
@@ -354,6 +390,111 @@ def main():
             print(f"🌐 Open: file://{dashboard_path.absolute()}")
             print(f"\n📊 {result['total_pdfs']} PDFs ({result['published']} published, {result['unpublished']} unpublished)")
 
+    elif args.command == "bench-render":
+        # Compare the available page renderers on the gallery's PDFs
+        from core.benchmarks import benchmark_renderers
+        from tasks.renderers import get_available_renderers, get_renderer
+        
+        renderers = get_available_renderers()
+        if not renderers:
+            print("❌ No renderers available. Install pdf2image (with poppler) or pypdfium2.")
+            sys.exit(1)
+        # Use the configured renderer as the fidelity baseline
+        baseline = get_renderer(config.get('screenshot_renderer', 'poppler')).name
+        renderers.sort(key=lambda r: r.name != baseline)
+        
+        if args.pdf:
+            example = processor.gallery.get_example(args.pdf)
+            pdfs = [example] if example else []
+        else:
+            pdfs = processor.gallery.get_published()
+        pdf_paths = [p for p in (pdf.get_primary_pdf() for pdf in pdfs) if p]
+        if not pdf_paths:
+            print("❌ No PDF files found to benchmark")
+            sys.exit(1)
+        
+        print(f"🏁 Benchmarking {', '.join(r.name for r in renderers)} on {len(pdf_paths)} PDFs")
+        result = benchmark_renderers(
+            pdf_paths,
+            renderers,
+            dpi=config.screenshot_dpi,
+            max_pages=config.get('screenshot_max_pages', 10)
+        )
+        
+        print(f"\n{'Renderer':<10} {'Pages':>6} {'Seconds':>9} {'s/page':>8} {'Errors':>7} {'Mean diff':>10} {'Min PSNR':>9}")
+        print("-" * 65)
+        for name, stats in result['summary'].items():
+            per_page = f"{stats['seconds_per_page']:.4f}" if stats['seconds_per_page'] is not None else "-"
+            mean_diff = "baseline" if name == result['baseline'] else str(stats.get('mean_abs_diff', '-'))
+            min_psnr = str(stats.get('min_psnr', '-'))
+            print(f"{name:<10} {stats['pages']:>6} {stats['seconds']:>9.3f} {per_page:>8} {stats['errors']:>7} {mean_diff:>10} {min_psnr:>9}")
+    
+    elif args.command == "bench-search":
+        # Replay queries against the built search index
+        import json
+        from core.benchmarks import benchmark_search, build_search_queries
+        
+        search_dir = config.artifacts_dir / "search"
+        full_index_path = config.artifacts_dir / "search_index.json"
+        if not (search_dir / "manifest.json").exists() or not full_index_path.exists():
+            print("❌ No search index found. Run: python build.py build --steps search_index")
+            sys.exit(1)
+        
+        if args.queries:
+            with open(args.queries) as f:
+                queries = json.load(f)
+        else:
+            with open(full_index_path) as f:
+                queries = build_search_queries(json.load(f))
+        
+        print(f"🏁 Replaying {len(queries)} queries against {search_dir}")
+        result = benchmark_search(search_dir, queries, k=args.k)
+        
+        print(f"\nIndex load: {result['load']['seconds'] * 1000:.1f} ms, {result['load']['bytes'] / 1024:.1f} KB "
+              f"({result['bytes_after_queries'] / 1024:.1f} KB after all queries)")
+        print(f"\n{'Pass':<6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        print("-" * 36)
+        for name, stats in result['latency'].items():
+            print(f"{name:<6} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['max_ms']:>9.3f}")
+        memory = result['memory']
+        print(f"\nMemory: {memory['loaded_bytes'] / 1024:.1f} KB loaded, "
+              f"{memory['after_queries_bytes'] / 1024:.1f} KB after queries, {memory['peak_bytes'] / 1024:.1f} KB peak")
+        print(f"\nRecall@{result['k']}:")
+        for kind, recall in result['recall'].items():
+            print(f"  {kind:<8} {recall:.3f}")
+        if result['misses']:
+            print(f"\n⚠️  {len(result['misses'])} queries found nothing relevant:")
+            for query in result['misses'][:10]:
+                print(f"  - {query}")
+    
+    elif args.command == "bench-parse":
+        # Time the markdown scanner against the old regexes on pathological inputs
+        from core.benchmarks import benchmark_parse
+        
+        result = benchmark_parse()
+        sizes = result['sizes']
+        print(f"🏁 Scanning markdown of {', '.join(str(size) for size in sizes)} lines")
+        print(f"\n{'Input':<16} {'Parser':<8} " + " ".join(f"{str(size) + ' ms':>10}" for size in sizes) + f" {'Growth':>7}")
+        print("-" * (34 + 11 * len(sizes)))
+        for kind, parsers in result['inputs'].items():
+            for name, stats in parsers.items():
+                times = " ".join(f"{ms:>10.3f}" for ms in stats['ms'])
+                print(f"{kind:<16} {name:<8} {times} {stats['growth']:>7.2f}")
+        print("\nGrowth ~1 is linear in the input size; ~N is N times worse than linear.")
+    
+    elif args.command == "bench-memory":
+        # Memory held by the domain model over a synthetic gallery
+        from core.benchmarks import benchmark_memory
+        
+        print(f"🏁 Loading a synthetic gallery of {args.approaches} approaches")
+        result = benchmark_memory(approaches=args.approaches)
+        print(f"\n{'Stage':<12} {'Seconds':>8} {'Retained MB':>12} {'Per approach':>13} {'Peak MB':>8}")
+        print("-" * 57)
+        for name, stats in result['stages'].items():
+            print(f"{name:<12} {stats['seconds']:>8.3f} {stats['bytes'] / 1e6:>12.1f} "
+                  f"{stats['bytes_per_approach']:>11} B {stats['peak_bytes'] / 1e6:>8.1f}")
+        print("\nStages are cumulative; retained is what the Gallery holds after each.")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
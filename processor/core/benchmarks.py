@@ -0,0 +1,479 @@
+"""
+Benchmarks for the PDF Gallery processor.
+
+These are run from build.py (e.g. `python build.py bench-render`) and
+return plain dicts so results can be printed or saved as JSON.
+"""
+
+import gc
+import math
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from domain import Gallery
+from domain.document import clear_document_cache, scan_document
+from tasks.renderers import PageRenderer
+from utils.search_engine import SearchEngine
+
+# Try to import PIL
+try:
+    from PIL import Image, ImageChops, ImageStat
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+    Image = None
+
+
+def _compare_images(baseline, candidate) -> Dict[str, Any]:
+    """Compare two renderings of the same page."""
+    result = {
+        "baseline_size": list(baseline.size),
+        "size": list(candidate.size),
+    }
+    
+    if candidate.size != baseline.size:
+        # Renderers round page sizes differently - compare at baseline size
+        candidate = candidate.resize(baseline.size)
+    
+    diff = ImageChops.difference(baseline.convert('RGB'), candidate.convert('RGB'))
+    stat = ImageStat.Stat(diff)
+    mean_abs = sum(stat.mean) / len(stat.mean)
+    mse = sum(rms ** 2 for rms in stat.rms) / len(stat.rms)
+    
+    result["mean_abs_diff"] = round(mean_abs, 3)
+    result["psnr"] = round(10 * math.log10(255 ** 2 / mse), 2) if mse else None  # None = identical
+    return result
+
+
+def benchmark_renderers(pdf_paths: List[Path], renderers: List[PageRenderer],
+                        dpi: int = 150, max_pages: int = 10) -> Dict[str, Any]:
+    """
+    Compare page renderers for speed and output fidelity.
+    
+    Each PDF is rendered (first max_pages pages) with every renderer.
+    Fidelity is measured against the first renderer in the list, as the
+    mean absolute pixel difference and PSNR per page.
+    
+    Returns:
+        Dict with per-PDF results and per-renderer totals
+    """
+    if not HAS_PIL:
+        raise RuntimeError("PIL/Pillow is required to compare renderings")
+    if not renderers:
+        raise ValueError("No renderers to benchmark")
+    
+    baseline_name = renderers[0].name
+    totals = {
+        r.name: {"seconds": 0.0, "pages": 0, "errors": 0, "mean_abs_diff": [], "psnr": []}
+        for r in renderers
+    }
+    pdf_results = []
+    
+    for pdf_path in pdf_paths:
+        entry = {"pdf": pdf_path.name, "renderers": {}}
+        baseline_images: Optional[List[Any]] = None
+        
+        for renderer in renderers:
+            try:
+                start = time.perf_counter()
+                page_count = renderer.page_count(pdf_path)
+                last_page = min(max_pages, page_count)
+                images = renderer.render(pdf_path, 1, last_page, dpi) if last_page else []
+                seconds = time.perf_counter() - start
+            except Exception as e:
+                entry["renderers"][renderer.name] = {"error": str(e)}
+                totals[renderer.name]["errors"] += 1
+                continue
+            
+            stats = {
+                "seconds": round(seconds, 4),
+                "pages": len(images),
+                "seconds_per_page": round(seconds / len(images), 4) if images else None,
+            }
+            totals[renderer.name]["seconds"] += seconds
+            totals[renderer.name]["pages"] += len(images)
+            
+            if renderer.name == baseline_name:
+                baseline_images = images
+            elif baseline_images is not None:
+                pages = [
+                    _compare_images(base, image)
+                    for base, image in zip(baseline_images, images)
+                ]
+                stats["fidelity"] = pages
+                for page in pages:
+                    totals[renderer.name]["mean_abs_diff"].append(page["mean_abs_diff"])
+                    if page["psnr"] is not None:
+                        totals[renderer.name]["psnr"].append(page["psnr"])
+            
+            entry["renderers"][renderer.name] = stats
+        
+        pdf_results.append(entry)
+    
+    summary = {}
+    for name, total in totals.items():
+        summary[name] = {
+            "seconds": round(total["seconds"], 3),
+            "pages": total["pages"],
+            "errors": total["errors"],
+            "seconds_per_page": round(total["seconds"] / total["pages"], 4) if total["pages"] else None,
+        }
+        if name != baseline_name and total["mean_abs_diff"]:
+            diffs = total["mean_abs_diff"]
+            summary[name]["mean_abs_diff"] = round(sum(diffs) / len(diffs), 3)
+            summary[name]["worst_mean_abs_diff"] = max(diffs)
+            if total["psnr"]:
+                summary[name]["min_psnr"] = min(total["psnr"])
+    
+    return {
+        "baseline": baseline_name,
+        "dpi": dpi,
+        "max_pages": max_pages,
+        "pdfs": pdf_results,
+        "summary": summary,
+    }
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _latency_summary(seconds: List[float]) -> Dict[str, Any]:
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+    
+    return {
+        "p50_ms": ms(_percentile(seconds, 50)),
+        "p99_ms": ms(_percentile(seconds, 99)),
+        "max_ms": ms(max(seconds) if seconds else None),
+    }
+
+
+def build_search_queries(full_index: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Derive a known-item query set from search_index.json.
+    
+    - "title": each document's title should find that document
+    - "method": each method name should find the documents using it
+    - "typo": the same method names with two middle letters swapped,
+      exercising the typo dictionary
+    """
+    queries = []
+    for doc in full_index.get("documents", []):
+        if doc.get("title"):
+            queries.append({"query": doc["title"], "relevant": [doc["id"]], "kind": "title"})
+    
+    for method, doc_ids in full_index.get("methodIndex", {}).items():
+        queries.append({"query": method, "relevant": doc_ids, "kind": "method"})
+        if len(method) >= 6:
+            middle = len(method) // 2
+            typo = method[:middle - 1] + method[middle] + method[middle - 1] + method[middle + 1:]
+            if typo.lower() != method.lower():
+                queries.append({"query": typo, "relevant": doc_ids, "kind": "typo"})
+    
+    return queries
+
+
+def benchmark_search(search_dir: Path, queries: List[Dict[str, Any]],
+                     k: int = 10, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Replay a query set against the sharded search index.
+    
+    The first pass starts from a freshly loaded index, so its latencies
+    include loading shards (like a browser's first queries); the next
+    `repeat` passes are warm. Memory is measured in a separate pass under
+    tracemalloc, which would otherwise slow down the timed passes.
+    
+    Args:
+        search_dir: artifacts/search/ as written by SearchIndexTask
+        queries: [{"query": str, "relevant": [doc ids], "kind": str}]
+        k: Results per query; recall@k is |relevant in top k| / min(|relevant|, k)
+        repeat: Number of warm passes
+    
+    Returns:
+        Dict with load time, latency percentiles, memory, recall@k per
+        query kind and the queries that found nothing relevant
+    """
+    if not (Path(search_dir) / "manifest.json").exists():
+        raise FileNotFoundError(f"No search index in {search_dir} - run the search_index step first")
+    
+    start = time.perf_counter()
+    engine = SearchEngine(search_dir)
+    load_seconds = time.perf_counter() - start
+    load_bytes = engine.bytes_loaded
+    
+    cold = []
+    recalls: Dict[str, List[float]] = {}
+    misses = []
+    for item in queries:
+        start = time.perf_counter()
+        results = engine.search(item["query"], k)
+        cold.append(time.perf_counter() - start)
+        
+        relevant = set(item["relevant"])
+        found = {result["doc"]["id"] for result in results}
+        recall = len(relevant & found) / min(len(relevant), k) if relevant else 1.0
+        recalls.setdefault("all", []).append(recall)
+        recalls.setdefault(item.get("kind", "custom"), []).append(recall)
+        if relevant and not recall:
+            misses.append(item["query"])
+    
+    warm = []
+    for _ in range(repeat):
+        for item in queries:
+            start = time.perf_counter()
+            engine.search(item["query"], k)
+            warm.append(time.perf_counter() - start)
+    
+    # Memory: index as loaded, then the peak while every query runs once
+    tracemalloc.start()
+    try:
+        engine_for_memory = SearchEngine(search_dir)
+        loaded_bytes, _ = tracemalloc.get_traced_memory()
+        for item in queries:
+            engine_for_memory.search(item["query"], k)
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return {
+        "documents": sum(1 for doc in engine.docs if doc),
+        "queries": len(queries),
+        "k": k,
+        "load": {
+            "seconds": round(load_seconds, 4),
+            "bytes": load_bytes,
+        },
+        "bytes_after_queries": engine.bytes_loaded,
+        "latency": {
+            "cold": _latency_summary(cold),
+            "warm": _latency_summary(warm),
+        },
+        "memory": {
+            "loaded_bytes": loaded_bytes,
+            "after_queries_bytes": current_bytes,
+            "peak_bytes": peak_bytes,
+        },
+        "recall": {
+            kind: round(sum(values) / len(values), 4)
+            for kind, values in recalls.items()
+        },
+        "misses": misses,
+    }
+
+
+# The lazy DOTALL patterns cells used to be split with, for comparison
+LEGACY_TAB_SPLIT = re.compile(r'(/// tab \| [^\n]+\n.*?\n///)', re.DOTALL)
+LEGACY_FENCE = re.compile(r'```(\w+)(?:\s*)\n(.*?)\n```', re.DOTALL)
+
+
+def _legacy_regex_scan(content: str) -> int:
+    """Run the old tab split and fence search over content."""
+    parts = LEGACY_TAB_SPLIT.split(content)
+    return sum(len(LEGACY_FENCE.findall(part)) for part in parts)
+
+
+def build_parse_inputs(lines: int) -> Dict[str, str]:
+    """
+    Markdown documents of about `lines` lines each.
+    
+    - "typical": prose, python/bash fences and tab groups
+    - "inline_fences": ```python at the end of lines, never closed
+    - "inline_tabs": /// tab | in the middle of lines, never closed
+    - "unclosed_fence": one fence left open at the top of the file
+    """
+    front_matter = "---\ntitle: Benchmark\npublished: true\n---\n"
+    section = [
+        "## Step",
+        "",
+        "Some prose about the page.",
+        "",
+        "```python",
+        "page = pdf.pages[0]",
+        "page.find('text:contains(Total)').show()",
+        "```",
+        "",
+        "/// tab | Option",
+        "```bash",
+        "pip install natural-pdf",
+        "```",
+        "///",
+        "",
+    ]
+    typical = (section * (lines // len(section) + 1))[:lines]
+    return {
+        "typical": front_matter + "\n".join(typical),
+        "inline_fences": front_matter + "\n".join(
+            f"Step {i}: ```python" for i in range(lines)
+        ),
+        "inline_tabs": front_matter + "\n".join(
+            f"See /// tab | Note {i} for details" for i in range(lines)
+        ),
+        "unclosed_fence": front_matter + "```python\n" + "\n".join(
+            f"x_{i} = {i}" for i in range(lines)
+        ),
+    }
+
+
+def benchmark_parse(sizes: List[int] = (500, 1000, 2000, 4000),
+                    repeat: int = 3, legacy: bool = True) -> Dict[str, Any]:
+    """
+    Time the markdown scanner on regular and pathological documents.
+    
+    Each input is scanned at every size (in lines); growth is how much
+    slower the largest size is than the smallest, relative to how much
+    bigger it is, so ~1 means linear. With legacy, the old regexes are
+    timed on the same inputs for comparison.
+    
+    Returns:
+        {"sizes": [...], "inputs": {kind: {"scanner": {...}, "regex": {...}}}}
+    """
+    def best_of(function, content):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function(content)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+    
+    def summarize(seconds):
+        growth = (seconds[-1] / seconds[0]) / (sizes[-1] / sizes[0]) if seconds[0] else None
+        return {
+            "ms": [round(value * 1000, 3) for value in seconds],
+            "growth": round(growth, 2) if growth is not None else None,
+        }
+    
+    sizes = list(sizes)
+    timings: Dict[str, Dict[str, List[float]]] = {}
+    for size in sizes:
+        for kind, content in build_parse_inputs(size).items():
+            entry = timings.setdefault(kind, {"scanner": [], "regex": []})
+            entry["scanner"].append(best_of(scan_document, content))
+            if legacy:
+                entry["regex"].append(best_of(_legacy_regex_scan, content))
+    
+    return {
+        "sizes": sizes,
+        "inputs": {
+            kind: {name: summarize(seconds) for name, seconds in entry.items() if seconds}
+            for kind, entry in timings.items()
+        },
+    }
+
+
+def build_memory_gallery(content_dir: Path, approaches: int = 10000,
+                         approaches_per_pdf: int = 2, lines: int = 60):
+    """
+    Write a synthetic gallery of `approaches` markdown files of about
+    `lines` lines each (the "typical" parse input), spread over PDF
+    directories. Two thirds are published; methods and tags come from
+    small pools, so they repeat across approaches like in real content.
+    """
+    body = build_parse_inputs(lines)["typical"].split("---\n", 2)[2]
+    methods = [f"method_{i}" for i in range(40)]
+    tags = [f"Tag {i}" for i in range(60)]
+    pdfs_dir = Path(content_dir) / "pdfs"
+    for number in range(approaches):
+        pdf_dir = pdfs_dir / f"pdf{number // approaches_per_pdf:05d}"
+        pdf_dir.mkdir(parents=True, exist_ok=True)
+        front_matter = "\n".join([
+            "---",
+            f"title: Approach {number}",
+            f"description: Synthetic approach {number}",
+            f"published: {'false' if number % 3 == 2 else 'true'}",
+            f"methods: [{methods[number % 40]}, {methods[(number * 7) % 40]}]",
+            f"tags: [{tags[number % 60]}, {tags[(number * 11) % 60]}]",
+            "difficulty: " + ("easy", "medium", "hard")[number % 3],
+            "---",
+            "",
+        ])
+        (pdf_dir / f"approach{number % approaches_per_pdf}.md").write_text(front_matter + body, encoding='utf-8')
+
+
+def benchmark_memory(approaches: int = 10000, content_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Measure the memory a Gallery holds at each stage of a build.
+    
+    Stages are cumulative: discovery (examples and the index), metadata
+    (front matter of every approach and example) and documents (every
+    approach parsed into cells and code blocks, as the tasks do). Each
+    is timed in one pass, then measured with tracemalloc in another.
+    
+    Args:
+        approaches: Size of the synthetic gallery (see build_memory_gallery)
+        content_dir: Existing content directory to measure instead
+    
+    Returns:
+        Dict with the gallery size and, per stage, seconds, retained
+        bytes (total and per approach) and the peak
+    """
+    def run(measure):
+        # Documents parsed in an earlier pass would be reused
+        clear_document_cache()
+        gallery = Gallery(content_dir, Path(content_dir) / "artifacts")
+        stages = {}
+        
+        def stage(name, function):
+            start = time.perf_counter()
+            function()
+            seconds = time.perf_counter() - start
+            if measure:
+                gc.collect()
+                current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+                stages[name] = {"bytes": current_bytes, "peak_bytes": peak_bytes}
+            else:
+                stages[name] = {"seconds": round(seconds, 3)}
+        
+        def load_metadata():
+            for example in gallery.examples.values():
+                for approach in example.approaches:
+                    approach.metadata
+                example.metadata
+        
+        def load_documents():
+            for example in gallery.examples.values():
+                for approach in example.approaches:
+                    approach.document
+                    approach.code_blocks
+        
+        stage("discovery", lambda: gallery.index)
+        stage("metadata", load_metadata)
+        stage("documents", load_documents)
+        count = sum(len(example.approaches) for example in gallery.examples.values())
+        return count, stages
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if content_dir is None:
+            content_dir = Path(temp_dir)
+            build_memory_gallery(content_dir, approaches)
+        
+        count, timings = run(measure=False)
+        tracemalloc.start()
+        try:
+            _, memory = run(measure=True)
+        finally:
+            tracemalloc.stop()
+            clear_document_cache()
+    
+    return {
+        "approaches": count,
+        "stages": {
+            name: {
+                "seconds": timings[name]["seconds"],
+                "bytes": memory[name]["bytes"],
+                "bytes_per_approach": round(memory[name]["bytes"] / count) if count else None,
+                "peak_bytes": memory[name]["peak_bytes"],
+            }
+            for name in timings
+        },
+    }
@@ -21,7 +21,24 @@ class Config:
         "r2_public_url": "https://pub-4e99d31d19cb404d8d4f5f7efa51ef6e.r2.dev",
         "screenshot_dpi": 150,
         "screenshot_max_pages": 10,
+        "screenshot_mode": "all",  # "all" or "referenced"
+        "screenshot_thumbnail_dpi": 72,
+        "screenshot_renderer": "poppler",  # "poppler", "pdfium" or "auto"
+        "screenshot_tiles": False,  # Deep-zoom tiles for oversized pages
+        "screenshot_tile_threshold": 4096,  # Longest side in pixels
         "thumbnail_size": (400, 400),
+        "sprite_cell_size": (340, 440),  # Index-page thumbnails packed into sheets
+        "sprite_columns": 4,
+        "sprite_rows": 4,
+        "search_shard_count": 16,  # Inverted index shards fetched per query term
+        "search_size_budget": 1024 * 1024,  # Bytes of shipped search files before warning
+        "related_top_k": 5,  # Related examples listed per approach
+        "gallery_manifest": True,  # Start up from .gallery_manifest.json when content is unchanged
+        "analysis_cache": True,  # Reuse parsed markdown + code analysis across builds
+        "metadata_workers": None,  # Processes analyzing uncached markdown (None = one per CPU, 1 = serial)
+        "publish": True,  # Precompressed .gz/.br variants after syncing to the frontend
+        "publish_hashed_names": False,  # Also write content-hashed copies + asset-manifest.json
+        "publish_min_size": 1024,  # Smaller files aren't worth compressing
         "max_execution_time": 30,  # seconds
         "enable_notebooks": True,
         "verbose": False
@@ -65,6 +82,7 @@ class Config:
             "R2_PUBLIC_URL": "r2_public_url",
             "PDF_GALLERY_VERBOSE": "verbose",
             "PDF_GALLERY_DPI": "screenshot_dpi",
+            "PDF_GALLERY_SCREENSHOT_MODE": "screenshot_mode",
         }
         
         for env_key, config_key in env_mappings.items():
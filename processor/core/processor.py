@@ -10,9 +10,10 @@ from datetime import datetime
 import shutil
 
 from domain import Gallery, PDFExample
-from tasks import Task, BatchTask, TaskContext, TaskResult
+from tasks import Task, BatchTask, TaskContext, TaskResult, SearchIndexTask
 from .cache import BuildCache
 from .config import Config
+from .publish import publish_artifacts
 
 
 class TaskGraph:
@@ -78,10 +79,12 @@ class GalleryProcessor:
         self.cache = BuildCache(self.cache_file)
         self.verbose = verbose if verbose is not None else self.config.verbose
         
-        # Initialize gallery
+        # Initialize gallery (from the manifest next to the build cache)
         self.gallery = Gallery(
             content_dir=self.config.content_dir,
-            artifacts_dir=self.config.artifacts_dir
+            artifacts_dir=self.config.artifacts_dir,
+            manifest_file=self.cache_file.parent / ".gallery_manifest.json"
+            if self.config.get("gallery_manifest", True) else None
         )
         
         # Task registry
@@ -190,12 +193,13 @@ class GalleryProcessor:
         Returns:
             True if processing succeeded
         """
-        pdf = self.gallery.get_example(pdf_id)
+        index = self.gallery.index
+        pdf = index.get(pdf_id)
         if not pdf:
             self.log(f"PDF not found: {pdf_id}", "ERROR")
             return False
         
-        if not pdf.is_published():
+        if not index.is_published(pdf_id):
             self.log(f"PDF not published: {pdf_id}", "SKIP")
             return True
         
@@ -266,6 +270,9 @@ class GalleryProcessor:
         
         self.log(f"Found {len(changed_files)} changed PDFs: {', '.join(sorted(changed_files))}")
         
+        # Rescan the changed PDFs so they are processed as they are now
+        self.gallery.invalidate(sorted(changed_files))
+        
         # Process each changed PDF
         success = True
         for pdf_id in changed_files:
@@ -293,19 +300,21 @@ class GalleryProcessor:
             if task_name not in context.results:
                 context.results[task_name] = set()
             
-            for pdf in pdfs:
-                if force or task.needs_processing(pdf, context):
-                    result = self._run_task(task, pdf, context)
-                    if result.success:
-                        processed += 1
-                        # Record that this task processed this PDF
-                        context.results[task_name].add(pdf.id)
-                    else:
-                        failed += 1
-                        self.failed_pdfs[pdf.id] = result.error or "Unknown error"
+            todo = [pdf for pdf in pdfs if force or task.needs_processing(pdf, context)]
+            # Don't update cache when skipping - the task didn't actually process the changes!
+            skipped = len(pdfs) - len(todo)
+            if todo:
+                task.prefetch(todo, context)
+            
+            for pdf in todo:
+                result = self._run_task(task, pdf, context)
+                if result.success:
+                    processed += 1
+                    # Record that this task processed this PDF
+                    context.results[task_name].add(pdf.id)
                 else:
-                    skipped += 1
-                    # Don't update cache when skipping - the task didn't actually process the changes!
+                    failed += 1
+                    self.failed_pdfs[pdf.id] = result.error or "Unknown error"
             
             self.log(
                 f"Task {task_name} complete: "
@@ -448,7 +457,9 @@ class GalleryProcessor:
         # Files to sync
         files_to_sync = [
             "all_metadata.json",
-            "search_index.compact.json",
+            "related.json",
+            "facets.json",
+            "usage_index.json",
             "valid_pdfs.json"
         ]
         
@@ -460,6 +471,11 @@ class GalleryProcessor:
                 shutil.copy2(src, dst)
                 self.log(f"Synced {filename}", "SUCCESS")
         
+        # No longer built: the frontend queries the sharded index in search/
+        retired = frontend_artifacts / "search_index.compact.json"
+        if retired.exists():
+            retired.unlink()
+        
         # Sync PDF artifacts (executions, screenshots, notebooks)
         pdfs_dir = self.config.artifacts_dir / "pdfs"
         if pdfs_dir.exists():
@@ -468,6 +484,54 @@ class GalleryProcessor:
             shutil.copytree(pdfs_dir, dst_pdfs_dir, dirs_exist_ok=True)
             self.log(f"Synced PDF artifacts", "SUCCESS")
         
+        # Sync the sharded search index before publish() compresses it;
+        # shards and tables are content-hashed, so drop the ones earlier
+        # builds wrote (but not publish()'s hashed copy of manifest.json)
+        search_dir = self.config.artifacts_dir / "search"
+        if search_dir.exists():
+            dst_search_dir = frontend_artifacts / "search"
+            shutil.copytree(search_dir, dst_search_dir, dirs_exist_ok=True)
+            for stale in dst_search_dir.glob("*.json"):
+                if SearchIndexTask.SEARCH_FILE_RE.fullmatch(stale.name) \
+                        and not (search_dir / stale.name).exists():
+                    stale.unlink()
+            self.log(f"Synced search index", "SUCCESS")
+        
+        # Sync thumbnail sprite sheets and their atlas
+        sprites_dir = self.config.artifacts_dir / "sprites"
+        if sprites_dir.exists():
+            dst_sprites_dir = frontend_artifacts / "sprites"
+            shutil.copytree(sprites_dir, dst_sprites_dir, dirs_exist_ok=True)
+            # Drop sheets replaced by newer builds
+            for stale in dst_sprites_dir.glob("sheet-*.webp"):
+                if not (sprites_dir / stale.name).exists():
+                    stale.unlink()
+            self.log(f"Synced sprite sheets", "SUCCESS")
+        
+        return True
+    
+    def publish(self) -> bool:
+        """Write precompressed (and optionally hashed) variants of the frontend artifacts."""
+        if not self.config.get("publish", True):
+            return True
+        
+        frontend_artifacts = self.config.frontend_artifacts_dir
+        if not frontend_artifacts.exists():
+            return True
+        
+        self.log("Publishing frontend artifacts")
+        summary = publish_artifacts(
+            frontend_artifacts,
+            self._publish_state_path(),
+            hashed_names=self.config.get("publish_hashed_names", False),
+            min_size=self.config.get("publish_min_size", 1024),
+            log=self.log
+        )
+        if not summary["brotli"]:
+            self.log("brotli not installed - writing gzip variants only")
+        
+        saved = summary["bytes"] - (summary["brotli_bytes"] or summary["gzip_bytes"])
+        self.log(f"Published {summary['files']} files, {saved / 1024:.0f}KB saved over the wire", "SUCCESS")
         return True
     
     def clean(self):
@@ -487,15 +551,21 @@ class GalleryProcessor:
         # Clear cache
         self.cache.clear()
         self.cache.save()
+        if self._publish_state_path().exists():
+            self._publish_state_path().unlink()
         self.log("Cleared build cache", "SUCCESS")
     
+    def _publish_state_path(self) -> Path:
+        """publish() state, kept next to the build cache (not shipped with the artifacts)."""
+        return self.cache_file.parent / ".publish_state.json"
+    
     def _report_results(self):
         """Report build results."""
         self.log("=" * 60)
         self.log("BUILD SUMMARY")
         self.log("=" * 60)
         
-        total_pdfs = len(self.gallery.get_published())
+        total_pdfs = len(self.gallery.index.published)
         processed = len(self.processed_pdfs)
         failed = len(self.failed_pdfs)
         
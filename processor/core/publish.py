@@ -0,0 +1,219 @@
+"""
+Publish stage: precompressed and content-hashed artifact variants.
+
+Runs over the frontend artifacts directory after sync_to_frontend, so a
+static host can serve `.br`/`.gz` bytes directly and, with hashed names,
+send immutable cache headers.
+"""
+
+import gzip
+import hashlib
+import json
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# Try to import brotli
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+    brotli = None
+
+
+COMPRESSIBLE_SUFFIXES = {'.json', '.ipynb', '.html', '.js', '.css', '.svg', '.txt', '.xml', '.dzi'}
+
+# Files already named after their content, e.g. search/shard-03.1a2b3c4d5e.json
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{8,}\.[^.]+$')
+
+# Where older builds kept the publish state, inside the published root
+LEGACY_STATE_FILE = '.publish_state.json'
+MANIFEST_FILE = 'asset-manifest.json'
+
+
+def _file_hash(path: Path) -> str:
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _hashed_name(path: Path, digest: str) -> Path:
+    """all_metadata.json -> all_metadata.<hash>.json"""
+    return path.with_name(f"{path.stem}.{digest[:10]}{path.suffix}")
+
+
+def _publish_file(path: Path, digest: str, hashed_names: bool,
+                  min_size: int) -> Dict[str, Any]:
+    """Write the compressed siblings (and hashed copy) of one file."""
+    targets = [path]
+    if hashed_names:
+        hashed = _hashed_name(path, digest)
+        if not hashed.exists():
+            shutil.copy2(path, hashed)
+        targets.append(hashed)
+    
+    written = []
+    data = path.read_bytes()
+    if len(data) >= min_size:
+        gz_data = gzip.compress(data, compresslevel=9, mtime=0)
+        br_data = brotli.compress(data, quality=11) if HAS_BROTLI else None
+        for target in targets:
+            gz_path = target.with_name(target.name + '.gz')
+            gz_path.write_bytes(gz_data)
+            written.append(gz_path)
+            if br_data is not None:
+                br_path = target.with_name(target.name + '.br')
+                br_path.write_bytes(br_data)
+                written.append(br_path)
+    
+    return {
+        "hashed": str(targets[1]) if hashed_names else None,
+        "written": [str(p) for p in written],
+        "size": len(data),
+        "gzip_size": len(gz_data) if len(data) >= min_size else None,
+        "brotli_size": len(br_data) if len(data) >= min_size and br_data is not None else None,
+    }
+
+
+def publish_artifacts(root: Path, state_path: Path, hashed_names: bool = False,
+                      min_size: int = 1024,
+                      max_workers: Optional[int] = None,
+                      log=None) -> Dict[str, Any]:
+    """
+    Write precompressed (and optionally content-hashed) variants of every
+    compressible file under root.
+    
+    - `<file>.gz` (and `<file>.br` if brotli is installed) next to each file
+      of at least min_size bytes
+    - with hashed_names, a `<stem>.<hash><suffix>` copy of each file (plus its
+      compressed siblings) and asset-manifest.json mapping original to
+      hashed paths; files already named after their content are mapped
+      to themselves
+    - files whose content hash matches the last run are skipped, and
+      variants of files that changed or disappeared are removed
+    
+    Compression runs in a thread pool (zlib and brotli release the GIL).
+    The hashes, sizes and outputs of the run are kept in state_path, which
+    belongs outside root so it isn't published.
+    
+    Returns:
+        Summary with counts and byte totals
+    """
+    legacy_state_path = root / LEGACY_STATE_FILE
+    read_path = state_path if state_path.exists() or not legacy_state_path.exists() else legacy_state_path
+    try:
+        previous = json.loads(read_path.read_text()) if read_path.exists() else {}
+    except (ValueError, IOError):
+        previous = {}
+    if legacy_state_path.exists():
+        legacy_state_path.unlink()
+    previous_files = previous.get("files", {})
+    removed = 0
+    if previous.get("hashed_names") != hashed_names or previous.get("min_size") != min_size \
+            or previous.get("brotli") != HAS_BROTLI:
+        # Settings changed - drop every old variant and republish everything
+        for entry in previous_files.values():
+            for output in entry.get("outputs", []):
+                if (root / output).exists():
+                    (root / output).unlink()
+                    removed += 1
+        previous_files = {}
+    
+    # Hashed copies written by earlier runs aren't sources themselves
+    own_outputs = {
+        output for entry in previous_files.values() for output in entry.get("outputs", [])
+    }
+    
+    sources = {}
+    for path in sorted(root.rglob('*')):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        if path.name == MANIFEST_FILE:
+            continue
+        rel = path.relative_to(root).as_posix()
+        if rel not in own_outputs:
+            sources[rel] = path
+    
+    files: Dict[str, Dict[str, Any]] = {}
+    jobs = {}
+    skipped = 0
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for rel, path in sources.items():
+            digest = _file_hash(path)
+            old = previous_files.get(rel)
+            already_hashed = bool(HASHED_NAME_RE.search(path.name))
+            hash_this = hashed_names and not already_hashed
+            
+            if old and old.get("hash") == digest and all(
+                    (root / p).exists() for p in old.get("outputs", [])):
+                files[rel] = old
+                skipped += 1
+                continue
+            
+            if old:
+                # Content changed: drop the variants of the old content
+                for output in old.get("outputs", []):
+                    if (root / output).exists():
+                        (root / output).unlink()
+                        removed += 1
+            
+            jobs[rel] = (digest, already_hashed, executor.submit(
+                _publish_file, path, digest, hash_this, min_size
+            ))
+        
+        for rel, (digest, already_hashed, future) in jobs.items():
+            result = future.result()
+            hashed = result["hashed"]
+            files[rel] = {
+                "hash": digest,
+                "hashed": Path(hashed).relative_to(root).as_posix() if hashed else (rel if already_hashed else None),
+                "outputs": [Path(p).relative_to(root).as_posix() for p in result["written"]]
+                           + ([Path(hashed).relative_to(root).as_posix()] if hashed else []),
+                "size": result["size"],
+                "gzip_size": result["gzip_size"],
+                "brotli_size": result["brotli_size"],
+            }
+    
+    # Variants of files that no longer exist
+    for rel, old in previous_files.items():
+        if rel in sources:
+            continue
+        for output in old.get("outputs", []):
+            output_path = root / output
+            if output_path.exists():
+                output_path.unlink()
+                removed += 1
+    
+    if hashed_names:
+        manifest = {rel: entry["hashed"] for rel, entry in sorted(files.items()) if entry.get("hashed")}
+        (root / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    elif (root / MANIFEST_FILE).exists():
+        (root / MANIFEST_FILE).unlink()
+    
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    state_path.write_text(json.dumps({
+        "hashed_names": hashed_names,
+        "min_size": min_size,
+        "brotli": HAS_BROTLI,
+        "files": files
+    }, indent=2))
+    
+    if log:
+        log(f"Published {len(jobs)} files ({skipped} unchanged, {removed} stale variants removed)")
+    
+    return {
+        "files": len(files),
+        "published": len(jobs),
+        "skipped": skipped,
+        "removed": removed,
+        "brotli": HAS_BROTLI,
+        "bytes": sum(entry["size"] for entry in files.values()),
+        "gzip_bytes": sum(entry["gzip_size"] or entry["size"] for entry in files.values()),
+        "brotli_bytes": sum(entry["brotli_size"] or entry["size"] for entry in files.values()) if HAS_BROTLI else None,
+    }
@@ -3,6 +3,9 @@ Domain models for PDF Gallery.
 """
 
 from .models import PDFExample, Approach, Gallery, CodeBlock
+from .document import ParsedDocument, Cell
+from .manifest import GalleryManifest
+from .index import GalleryIndex
 from .exceptions import (
     PDFGalleryException,
     PDFNotFoundException,
@@ -20,6 +23,10 @@ __all__ = [
     'Approach',
     'Gallery',
     'CodeBlock',
+    'ParsedDocument',
+    'Cell',
+    'GalleryManifest',
+    'GalleryIndex',
     
     # Exceptions
     'PDFGalleryException',
@@ -0,0 +1,514 @@
+"""
+Parsed document representation for approach markdown files.
+
+A markdown file is split once into front matter and an ordered list of
+cells (markdown, code, bash and tab groups) by a line scanner that is
+linear in the file size. Tasks read the cells from here instead of
+running their own regexes over the raw text, and code cells keep their
+parsed AST so it is built at most once per file.
+"""
+
+import ast
+import functools
+import hashlib
+import re
+import sys
+from collections import OrderedDict
+from dataclasses import MISSING, dataclass, field, fields
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterator, Sequence
+
+import yaml
+
+# Use libyaml's loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Opening fence line: ```language (matched against one line only)
+FENCE_OPEN = re.compile(r'```(\w*)\s*$')
+TAB_OPEN = '/// tab |'
+BLOCK_CLOSE = '///'
+
+# Bump when parsing changes, to invalidate stored documents
+DOCUMENT_VERSION = 2
+
+# Parsed documents kept in memory, keyed by content hash
+DOCUMENT_CACHE_SIZE = 1024
+_document_cache: 'OrderedDict[str, ParsedDocument]' = OrderedDict()
+
+_UNPARSED = object()
+
+
+def slotted(cls):
+    """
+    Rebuild a dataclass with __slots__ for its fields, so instances carry
+    no per-instance __dict__ (what dataclass(slots=True) does on Python
+    3.10+). Apply it on top of @dataclass.
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in names + ('__dict__', '__weakref__'):
+        namespace.pop(name, None)
+    namespace['__slots__'] = names
+    
+    # The generated __init__ leaves init=False fields to their class
+    # attribute, which a slot replaces, so it sets them itself now
+    defaults = tuple(
+        (f.name, f.default) for f in fields(cls)
+        if not f.init and f.default is not MISSING
+    )
+    if defaults:
+        generated_init = cls.__init__
+        
+        @functools.wraps(generated_init)
+        def __init__(self, *args, **kwargs):
+            for name, value in defaults:
+                object.__setattr__(self, name, value)
+            generated_init(self, *args, **kwargs)
+        namespace['__init__'] = __init__
+    
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@slotted
+@dataclass
+class Cell:
+    """
+    A single cell of a document.
+    
+    type is one of 'markdown', 'code' (python), 'bash' or 'tab'. Fenced
+    blocks in other languages are kept as markdown cells with their
+    fence. Tab cells hold their own (list of) cells and a title; other
+    cells share an empty tuple. line is the 1-based line in the file
+    where the cell's content starts.
+    """
+    type: str
+    content: str = ""
+    language: Optional[str] = None
+    title: Optional[str] = None
+    cells: Sequence['Cell'] = ()
+    line: int = 0
+    _tree: Any = field(default=_UNPARSED, init=False, repr=False, compare=False)
+    
+    @property
+    def tree(self) -> Optional[ast.Module]:
+        """The cell's AST, parsed on first access (None if it isn't valid python)."""
+        if self._tree is _UNPARSED:
+            self._tree = None
+            if self.type == 'code':
+                try:
+                    self._tree = ast.parse(self.content)
+                except SyntaxError:
+                    pass
+        return self._tree
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Cell in the format stored in execution results."""
+        if self.type == 'tab':
+            return {
+                'type': 'tab',
+                'title': self.title,
+                'cells': [cell.to_dict() for cell in self.cells]
+            }
+        return {'type': self.type, 'content': self.content}
+    
+    def serialize(self) -> Dict[str, Any]:
+        """All fields, for storing a parsed document (see Cell.from_dict)."""
+        data = {'type': self.type, 'line': self.line}
+        if self.type == 'tab':
+            data['title'] = self.title
+            data['cells'] = [cell.serialize() for cell in self.cells]
+        else:
+            data['content'] = self.content
+            if self.language:
+                data['language'] = self.language
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Cell':
+        """Rebuild a cell from serialize() output."""
+        language = data.get('language')
+        return cls(
+            type=sys.intern(data['type']),
+            content=data.get('content', ''),
+            language=sys.intern(language) if language else None,
+            title=data.get('title'),
+            cells=[cls.from_dict(cell) for cell in data['cells']] if 'cells' in data else (),
+            line=data.get('line', 0)
+        )
+
+
+@slotted
+@dataclass
+class ParsedDocument:
+    """Front matter and cells of one markdown file."""
+    front_matter: Dict[str, Any]
+    cells: List[Cell]
+    content_hash: str
+    
+    @classmethod
+    def parse(cls, content: str) -> 'ParsedDocument':
+        """Parse markdown content, reusing the result for content seen before."""
+        digest = content_hash(content)
+        document = _document_cache.get(digest)
+        if document is not None:
+            _document_cache.move_to_end(digest)
+            return document
+        
+        front_matter, cells = scan_document(content)
+        return _remember(cls(
+            front_matter=front_matter,
+            cells=cells,
+            content_hash=digest
+        ))
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ParsedDocument':
+        """
+        Rebuild a document saved with to_dict().
+        
+        It is remembered like a parsed one, so parse() returns it for the
+        same content without parsing again.
+        """
+        return _remember(cls(
+            front_matter=intern_metadata(data['front_matter']),
+            cells=[Cell.from_dict(cell) for cell in data['cells']],
+            content_hash=data['content_hash']
+        ))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form (without ASTs), see from_dict()."""
+        return {
+            'front_matter': self.front_matter,
+            'cells': [cell.serialize() for cell in self.cells],
+            'content_hash': self.content_hash
+        }
+    
+    def iter_cells(self) -> Iterator[Cell]:
+        """All cells in order, with tab groups flattened into their cells."""
+        for cell in self.cells:
+            if cell.type == 'tab':
+                yield from cell.cells
+            else:
+                yield cell
+    
+    @property
+    def code_cells(self) -> List[Cell]:
+        """Python code cells in order, including those inside tabs."""
+        return [cell for cell in self.iter_cells() if cell.type == 'code']
+    
+    def cell_dicts(self) -> List[Dict[str, Any]]:
+        """Fresh cell dicts (safe to annotate, e.g. with execution results)."""
+        return [cell.to_dict() for cell in self.cells]
+
+
+def content_hash(content: str) -> str:
+    """Hash identifying a file's content."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def clear_document_cache():
+    """Forget the parsed documents kept in memory."""
+    _document_cache.clear()
+
+
+def _remember(document: ParsedDocument) -> ParsedDocument:
+    _document_cache[document.content_hash] = document
+    _document_cache.move_to_end(document.content_hash)
+    if len(_document_cache) > DOCUMENT_CACHE_SIZE:
+        _document_cache.popitem(last=False)
+    return document
+
+
+def scan_document(content: str):
+    """
+    Parse markdown content (uncached) in one pass over its lines.
+    
+    Returns:
+        (front matter dict, cells)
+    """
+    front_matter, body_lines, body_line = _split_front_matter(content)
+    return front_matter, _BlockScanner(body_line).scan(body_lines)
+
+
+def read_front_matter_text(path: Path) -> Optional[str]:
+    """
+    Read just the front matter block of a markdown file, stopping at its
+    closing --- instead of reading the whole file.
+    
+    Returns:
+        The YAML text, or None if the file has no front matter
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if f.readline().rstrip() != '---':
+            return None
+        lines = []
+        for line in f:
+            if line.rstrip() == '---':
+                return ''.join(lines)
+            lines.append(line)
+    return None
+
+
+def parse_front_matter(text: Optional[str]) -> Dict[str, Any]:
+    """Parse front matter text (as read by read_front_matter_text)."""
+    return _load_front_matter(text) if text is not None else {}
+
+
+# YAML 1.1 booleans, as resolved by PyYAML
+YAML_BOOLEANS = {
+    value: flag
+    for flag, words in ((True, ('yes', 'true', 'on')), (False, ('no', 'false', 'off')))
+    for word in words
+    for value in (word, word.capitalize(), word.upper())
+}
+
+
+# Lines of front matter that is known to parse without parsing it:
+# top-level `key: value` lines, one-line [a, b] lists, list items and
+# wrapped plain values
+_PLAIN_SCALAR = r"""(?![-?:,\[\]{}#&*!|>'"%@` ])(?!(?:=|<<) *$)(?:(?!: | #).)+(?<!:)"""
+_SIMPLE_VALUE = rf"""(?:{_PLAIN_SCALAR}|'(?:[^']|'')*'|"[^"\\]*")"""
+_FLOW_ITEM = r"""(?:(?![-?,\[\]{}#&*!|>'"%@` ])(?!(?:=|<<) *[,\]])[^:?,\[\]{}#]+(?<! )|'(?:[^']|'')*'|"[^"\\]*")"""
+_FLOW_LIST = rf'\[ *(?:{_FLOW_ITEM}(?: *, *{_FLOW_ITEM})*)? *\]'
+SIMPLE_KEY_LINE = re.compile(rf'[A-Za-z_][\w-]*:(?: +({_SIMPLE_VALUE}|{_FLOW_LIST}))? *')
+SIMPLE_ITEM_LINE = re.compile(rf'( *)- +{_SIMPLE_VALUE} *')
+SIMPLE_CONTINUATION_LINE = re.compile(rf' +{_PLAIN_SCALAR} *')
+# Anything but printable characters and newlines: tabs, YAML 1.1's extra
+# line breaks, BOMs and the characters PyYAML rejects
+SIMPLE_UNSAFE_CHARACTER = re.compile(
+    '[^\n\x20-\x7E\xA0-\u2027\u202A-\uD7FF\uE000-\uFEFE\uFF00-\uFFFD\U00010000-\U0010FFFF]'
+)
+
+
+def is_simple_front_matter(text: str) -> bool:
+    """
+    Whether front matter text is known to parse as a mapping without
+    parsing it: it has a key, and every line is blank, a comment, a top-level `key: value`
+    or `key:` line, a list item under a `key:` line, or the wrapped
+    continuation of a plain value. Anything else (nested flow collections,
+    block scalars, multi-line quotes, nested mappings) returns False.
+    """
+    if SIMPLE_UNSAFE_CHARACTER.search(text):
+        return False
+    
+    previous = None  # "key", "plain" (a wrappable value), "value" or "item"
+    item_indent = None
+    keys = 0
+    for line in text.split('\n'):
+        if not line.strip():
+            continue
+        if line.startswith('#'):
+            # Ends a wrapped value or a list
+            previous = None
+            continue
+        match = SIMPLE_KEY_LINE.fullmatch(line)
+        if match:
+            value = match.group(1)
+            keys += 1
+            previous = "key" if value is None else ("plain" if value[0] not in '\'"[' else "value")
+            item_indent = None
+            continue
+        match = SIMPLE_ITEM_LINE.fullmatch(line)
+        if match and previous in ("key", "item"):
+            if item_indent is not None and len(match.group(1)) != item_indent:
+                return False
+            previous, item_indent = "item", len(match.group(1))
+            continue
+        if previous == "plain" and SIMPLE_CONTINUATION_LINE.fullmatch(line):
+            continue
+        return False
+    return keys > 0
+
+
+def peek_front_matter_flag(text: Optional[str], key: str) -> Optional[bool]:
+    """
+    Get a top-level boolean from front matter text without parsing the YAML.
+    
+    Front matter that fails to parse has no metadata, so a True flag is
+    only returned when the text is known to parse (is_simple_front_matter).
+    
+    Returns:
+        The flag for a single plain `key: true/false` line, False if the key
+        isn't mentioned at all, or None when only a real parse can tell
+    """
+    if text is None:
+        return False
+    if key not in text:
+        return False
+    prefix = key + ':'
+    values = [line[len(prefix):].strip() for line in text.split('\n') if line.startswith(prefix)]
+    if len(values) != 1:
+        return None
+    flag = YAML_BOOLEANS.get(values[0])
+    if flag and not is_simple_front_matter(text):
+        return None
+    return flag
+
+
+# Front matter fields whose values repeat across approaches
+INTERNED_FIELDS = ('methods', 'tags', 'difficulty', 'language', 'approach_type')
+
+
+def intern_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of metadata with its keys and the values of INTERNED_FIELDS
+    interned, so every approach shares one copy of e.g. each method name.
+    """
+    result = {}
+    for key, value in metadata.items():
+        if isinstance(key, str):
+            key = sys.intern(key)
+        if key in INTERNED_FIELDS:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            elif isinstance(value, list):
+                value = [sys.intern(item) if isinstance(item, str) else item for item in value]
+        result[key] = value
+    return result
+
+
+def _load_front_matter(text: str) -> Dict[str, Any]:
+    try:
+        front_matter = yaml.load(text, Loader=SafeLoader) or {}
+    except yaml.YAMLError:
+        return {}
+    return intern_metadata(front_matter) if isinstance(front_matter, dict) else {}
+
+
+def _split_front_matter(content: str):
+    """
+    Split off the YAML front matter: a first line of --- up to the next
+    line of ---.
+    
+    Returns:
+        (front matter, body lines, file line number of the first body line)
+    """
+    lines = content.split('\n')
+    if lines[0].rstrip() != '---':
+        return {}, lines, 1
+    
+    for end in range(1, len(lines)):
+        if lines[end].rstrip() == '---':
+            break
+    else:
+        return {}, lines, 1
+    
+    return _load_front_matter('\n'.join(lines[1:end])), lines[end + 1:], end + 2
+
+
+class _BlockScanner:
+    """
+    Single pass over the body lines, building cells.
+    
+    Every line is looked at once and matched on its own, so the work is
+    linear in the size of the file whatever it contains (nothing is
+    rescanned when a fence or tab is never closed).
+    
+    - A line of ```language opens a fence, closed by the next line
+      starting with ```; markers inside a fence are plain code.
+    - /// tab | Title opens a tab, closed by a line of /// or by the next
+      tab (or the end of the file).
+    - A fence that is never closed is kept as markdown, as written.
+    """
+    
+    def __init__(self, first_line: int):
+        self.first_line = first_line
+        self.cells: List[Cell] = []
+        self.tab: Optional[Cell] = None
+        self.markdown: List[str] = []
+        self.markdown_start = 0
+        self.fence: Optional[List[str]] = None
+        self.fence_opener = ''
+        self.fence_language = ''
+        self.fence_start = 0
+    
+    def scan(self, lines: List[str]) -> List[Cell]:
+        for number, line in enumerate(lines):
+            if self.fence is not None:
+                if line.startswith('```'):
+                    self._close_fence()
+                else:
+                    self.fence.append(line)
+                continue
+            
+            if line.startswith('```'):
+                match = FENCE_OPEN.match(line)
+                if match:
+                    # Markdown before the fence is flushed when it closes
+                    self.fence = []
+                    self.fence_opener = line
+                    self.fence_language = sys.intern(match.group(1))
+                    self.fence_start = number
+                    continue
+            elif line.startswith(TAB_OPEN):
+                title = line[len(TAB_OPEN):].strip()
+                if title:
+                    self._close_tab()
+                    self._flush_markdown()
+                    self.tab = Cell(type='tab', title=title, cells=[], line=self.first_line + number)
+                    continue
+            elif self.tab is not None and line.rstrip() == BLOCK_CLOSE:
+                self._close_tab()
+                continue
+            
+            if not self.markdown:
+                self.markdown_start = number
+            self.markdown.append(line)
+        
+        if self.fence is not None:
+            # Never closed: the fence and everything after it is markdown
+            if not self.markdown:
+                self.markdown_start = self.fence_start
+            self.markdown += [self.fence_opener] + self.fence
+            self.fence = None
+        self._close_tab()
+        self._flush_markdown()
+        return self.cells
+    
+    def _target(self) -> List[Cell]:
+        return self.tab.cells if self.tab is not None else self.cells
+    
+    def _flush_markdown(self):
+        text = '\n'.join(self.markdown)
+        content = text.strip()
+        if content:
+            leading = len(text) - len(text.lstrip())
+            self._target().append(Cell(
+                type='markdown',
+                content=content,
+                line=self.first_line + self.markdown_start + text.count('\n', 0, leading)
+            ))
+        self.markdown = []
+    
+    def _close_tab(self):
+        if self.tab is not None:
+            self._flush_markdown()
+            self.cells.append(self.tab)
+            self.tab = None
+    
+    def _close_fence(self):
+        self._flush_markdown()
+        text = '\n'.join(self.fence)
+        code = text.strip()
+        language = self.fence_language
+        content_line = self.fence_start + 1 + text.count('\n', 0, len(text) - len(text.lstrip()))
+        if language in ('python', 'bash'):
+            cell = Cell(
+                type='code' if language == 'python' else 'bash',
+                content=code,
+                language=language,
+                line=self.first_line + content_line
+            )
+        else:
+            # Other languages are shown as-is
+            cell = Cell(
+                type='markdown',
+                content=f'```{language}\n{code}\n```',
+                language=language or None,
+                line=self.first_line + self.fence_start
+            )
+        self._target().append(cell)
+        self.fence = None
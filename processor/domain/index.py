@@ -0,0 +1,69 @@
+"""
+Snapshot query layer over a gallery's examples.
+"""
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .models import PDFExample
+
+
+class GalleryIndex:
+    """
+    Immutable snapshot of a gallery with precomputed lookups.
+    
+    Built once from the loaded examples, it answers the questions the CLI,
+    the dashboard and the processor keep asking (which examples are
+    published, which use a method, have a tag or a difficulty) with dict
+    lookups instead of scans over every example's metadata. Gallery
+    replaces the snapshot when its examples are invalidated; a snapshot
+    itself never changes.
+    """
+    
+    def __init__(self, examples: Dict[str, 'PDFExample'], generation: int = 0):
+        self.generation = generation
+        self.examples = dict(examples)
+        self.published: Tuple['PDFExample', ...] = tuple(
+            example for example in self.examples.values() if example.is_published()
+        )
+        self.published_ids = frozenset(example.id for example in self.published)
+        self.by_method = self._group(lambda metadata: metadata.get("methods"))
+        self.by_tag = self._group(lambda metadata: metadata.get("tags"))
+        self.by_difficulty = self._group(lambda metadata: metadata.get("difficulty"))
+        self.stats = {
+            "total_pdfs": len(self.examples),
+            "published_pdfs": len(self.published),
+            "total_approaches": sum(len(example.approaches) for example in self.published),
+            "unique_methods": len(self.by_method),
+            "methods": sorted(self.by_method)
+        }
+    
+    def _group(self, field) -> Dict[str, Tuple['PDFExample', ...]]:
+        """Published examples by each value of a metadata field (scalar or list)."""
+        groups: Dict[str, List['PDFExample']] = {}
+        for example in self.published:
+            value = field(example.metadata)
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            for item in dict.fromkeys(str(v) for v in values if v is not None):
+                groups.setdefault(item, []).append(example)
+        return {key: tuple(group) for key, group in groups.items()}
+    
+    def get(self, pdf_id: str) -> Optional['PDFExample']:
+        return self.examples.get(pdf_id)
+    
+    def is_published(self, pdf_id: str) -> bool:
+        return pdf_id in self.published_ids
+    
+    def with_method(self, method: str) -> Tuple['PDFExample', ...]:
+        return self.by_method.get(method, ())
+    
+    def with_tag(self, tag: str) -> Tuple['PDFExample', ...]:
+        return self.by_tag.get(tag, ())
+    
+    def with_difficulty(self, difficulty: str) -> Tuple['PDFExample', ...]:
+        return self.by_difficulty.get(str(difficulty), ())
+    
+    def __repr__(self):
+        return f"GalleryIndex(generation={self.generation}, examples={len(self.examples)}, published={len(self.published)})"
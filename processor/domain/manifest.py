@@ -0,0 +1,180 @@
+"""
+Persistent manifest of the gallery's content directory.
+
+The manifest records, per PDF directory, its approaches (published flag,
+and front matter metadata if it was parsed) and PDF files (names and
+sizes), together with the mtime/size signatures they were read at. A
+later run that finds the same signatures builds its PDFExamples from the
+manifest without opening any markdown file.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+# 2: published flags of front matter that fails to parse are false
+MANIFEST_VERSION = 2
+
+
+def _signature(stat_result: os.stat_result) -> List[int]:
+    return [stat_result.st_mtime_ns, stat_result.st_size]
+
+
+class GalleryManifest:
+    """
+    Manifest file for one content directory.
+    
+    entries maps PDF ID -> {"dir_mtime", "approaches": [...], "pdf_files": [...]}
+    where every approach and PDF file carries the [mtime_ns, size]
+    signature it was read at.
+    """
+    
+    def __init__(self, path: Path, content_dir: Path):
+        self.path = Path(path)
+        self.content_dir = Path(content_dir)
+        self.pdfs_dir_mtime: Optional[int] = None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self._load()
+    
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Warning: Could not load gallery manifest: {e}")
+            return
+        
+        # Written by another version or for another content directory
+        if data.get("version") != MANIFEST_VERSION or \
+                data.get("content_dir") != str(self.content_dir.absolute()):
+            return
+        self.pdfs_dir_mtime = data.get("pdfs_dir_mtime")
+        self.entries = data.get("examples", {})
+    
+    def list_dirs(self, pdfs_dir: Path) -> List[Path]:
+        """
+        The PDF directories: taken from the manifest while the pdfs
+        directory's mtime (which changes when entries are added, removed
+        or renamed) is the one recorded, otherwise scanned.
+        """
+        mtime = pdfs_dir.stat().st_mtime_ns
+        if mtime == self.pdfs_dir_mtime:
+            return [pdfs_dir / pdf_id for pdf_id in self.entries]
+        
+        self.pdfs_dir_mtime = mtime
+        self.dirty = True
+        with os.scandir(pdfs_dir) as entries:
+            return [pdfs_dir / entry.name for entry in entries if entry.is_dir()]
+    
+    def cached_example(self, base_dir: Path):
+        """
+        Build a PDFExample from its manifest entry, or None if the entry is
+        missing or any of its signatures no longer match.
+        """
+        from .models import PDFExample
+        
+        entry = self.entries.get(base_dir.name)
+        if entry is not None and self._is_current(base_dir, entry):
+            return PDFExample.from_manifest_entry(base_dir, entry)
+        return None
+    
+    def update(self, example):
+        """Record a freshly discovered example."""
+        self.entries[example.id] = self._entry_for(example)
+        self.dirty = True
+    
+    def record_metadata(self, example):
+        """
+        Add front matter parsed since the example was recorded (the
+        signatures stay those the files were discovered at).
+        """
+        entry = self.entries.get(example.id)
+        if entry is None:
+            return
+        by_file = {item["file"]: item for item in entry["approaches"]}
+        for approach in example.approaches:
+            item = by_file.get(approach.file.name)
+            metadata = approach.parsed_metadata
+            if item is None or item.get("metadata") is not None or metadata is None:
+                continue
+            try:
+                json.dumps(metadata)
+            except (TypeError, ValueError):
+                continue
+            item["metadata"] = metadata
+            self.dirty = True
+    
+    def _is_current(self, base_dir: Path, entry: Dict[str, Any]) -> bool:
+        # Plain string paths: pathlib costs more than the stat calls here
+        directory = str(base_dir)
+        try:
+            # The directory mtime covers files being added or removed,
+            # the file signatures cover edits
+            if os.stat(directory).st_mtime_ns != entry.get("dir_mtime"):
+                return False
+            for item in entry.get("approaches", []) + entry.get("pdf_files", []):
+                if _signature(os.stat(os.path.join(directory, item["file"]))) != item["signature"]:
+                    return False
+        except (OSError, KeyError, TypeError):
+            return False
+        return True
+    
+    def _entry_for(self, example) -> Dict[str, Any]:
+        """Manifest entry for a freshly discovered example."""
+        approaches = []
+        for approach in example.approaches:
+            # Only front matter that was already parsed: parsing it here
+            # would undo the lazy YAML parse of discovery
+            metadata = approach.parsed_metadata
+            try:
+                json.dumps(metadata)
+            except (TypeError, ValueError):
+                # e.g. dates in the front matter; re-read from the file instead
+                metadata = None
+            approaches.append({
+                "file": approach.file.name,
+                "signature": _signature(approach.file.stat()),
+                # Parses the YAML unless the front matter is known to parse
+                "published": approach.is_published(),
+                "metadata": metadata,
+            })
+        
+        return {
+            "dir_mtime": example.base_dir.stat().st_mtime_ns,
+            "approaches": approaches,
+            "pdf_files": [
+                {"file": pdf_file.name, "signature": _signature(pdf_file.stat())}
+                for pdf_file in example.pdf_files
+            ],
+        }
+    
+    def retain(self, pdf_ids: List[str]):
+        """Drop entries for PDF directories that no longer exist."""
+        for pdf_id in set(self.entries) - set(pdf_ids):
+            del self.entries[pdf_id]
+            self.dirty = True
+    
+    def save(self):
+        """Write the manifest if anything changed."""
+        if not self.dirty:
+            return
+        
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to temp file first for atomicity
+            temp_file = self.path.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": MANIFEST_VERSION,
+                    "content_dir": str(self.content_dir.absolute()),
+                    "pdfs_dir_mtime": self.pdfs_dir_mtime,
+                    "examples": self.entries,
+                }, f, separators=(',', ':'), ensure_ascii=False)
+            temp_file.replace(self.path)
+            self.dirty = False
+        except IOError as e:
+            print(f"Warning: Could not save gallery manifest: {e}")
@@ -8,12 +8,17 @@ These models represent the core business objects in our system:
 """
 
 import json
-import yaml
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 from dataclasses import dataclass, field
 
+from .index import GalleryIndex
+from .manifest import GalleryManifest
+from .document import ParsedDocument, parse_front_matter, peek_front_matter_flag, read_front_matter_text, slotted, intern_metadata
 
+@slotted
 @dataclass
 class CodeBlock:
     """Represents a code block in a markdown file."""
@@ -25,13 +30,24 @@ class CodeBlock:
         return f"CodeBlock({self.language}, {len(self.content)} chars)"
 
 
+@slotted
 @dataclass
 class Approach:
-    """Represents a single markdown file showing a PDF extraction approach."""
+    """
+    Represents a single markdown file showing a PDF extraction approach.
+    
+    The raw text is only kept until the file is parsed: document (front
+    matter and cells) is what tasks use, and content re-reads the file
+    if anything asks for it later.
+    """
     file: Path
     pdf_example: Optional['PDFExample'] = None
     _metadata: Optional[Dict[str, Any]] = field(default=None, init=False)
     _content: Optional[str] = field(default=None, init=False)
+    _document: Optional[ParsedDocument] = field(default=None, init=False)
+    _front_matter_text: Optional[str] = field(default=None, init=False)
+    _front_matter_read: bool = field(default=False, init=False)
+    _published: Optional[bool] = field(default=None, init=False)
     _code_blocks: Optional[List[CodeBlock]] = field(default=None, init=False)
     
     @property
@@ -41,16 +57,36 @@ class Approach:
     
     @property
     def content(self) -> str:
-        """Lazy load file content."""
-        if self._content is None:
-            self._content = self.file.read_text(encoding='utf-8')
-        return self._content
+        """Lazy load file content (cached until the document is parsed)."""
+        if self._content is not None:
+            return self._content
+        content = self.file.read_text(encoding='utf-8')
+        if self._document is None:
+            self._content = content
+        return content
+    
+    @property
+    def document(self) -> ParsedDocument:
+        """Parsed front matter and cells, shared by every task."""
+        if self._document is None:
+            self._document = ParsedDocument.parse(self.content)
+            # Evict the raw text, the cells hold everything tasks need
+            self._content = None
+        return self._document
     
     @property
     def metadata(self) -> Dict[str, Any]:
         """Extract and cache YAML frontmatter."""
         if self._metadata is None:
             self._metadata = self._extract_metadata()
+            # Only needed until the metadata is parsed
+            self._front_matter_text = None
+            self._front_matter_read = False
+        return self._metadata
+    
+    @property
+    def parsed_metadata(self) -> Optional[Dict[str, Any]]:
+        """The metadata if it has been parsed already, without parsing it."""
         return self._metadata
     
     @property
@@ -61,45 +97,53 @@ class Approach:
         return self._code_blocks
     
     def _extract_metadata(self) -> Dict[str, Any]:
-        """Extract YAML frontmatter from markdown content."""
-        content = self.content
-        if not content.startswith('---'):
+        """Get the YAML frontmatter, plus computed fields."""
+        if self._document is not None:
+            metadata = dict(self._document.front_matter)
+        else:
+            metadata = parse_front_matter(self._read_front_matter_text())
+        if not metadata:
             return {}
         
-        try:
-            # Find the closing ---
-            end_index = content.index('---', 3)
-            yaml_content = content[3:end_index].strip()
-            metadata = yaml.safe_load(yaml_content) or {}
-            
-            # Add computed fields
-            metadata['slug'] = self.slug
-            metadata['file'] = self.file.name
+        # Add computed fields
+        metadata['slug'] = self.slug
+        metadata['file'] = self.file.name
             
-            return metadata
-        except (ValueError, yaml.YAMLError):
-            return {}
+        return metadata
     
     def _extract_code_blocks(self) -> List[CodeBlock]:
-        """Extract code blocks from markdown content."""
-        import re
-        blocks = []
-        
-        # Match ```language\ncode\n```
-        pattern = r'```(\w+)?\n(.*?)\n```'
-        matches = re.findall(pattern, self.content, re.DOTALL)
-        
-        for lang, code in matches:
-            language = lang or 'python'
-            blocks.append(CodeBlock(
-                content=code,
-                language=language
-            ))
-        
-        return blocks
+        """Get the python and bash code blocks, including those inside tabs."""
+        return [
+            CodeBlock(
+                content=cell.content,
+                language=cell.language,
+                line_number=cell.line
+            )
+            for cell in self.document.iter_cells()
+            if cell.type in ('code', 'bash')
+        ]
+    
+    def _read_front_matter_text(self) -> Optional[str]:
+        """Read (once) only the front matter block, not the whole file."""
+        if not self._front_matter_read:
+            try:
+                self._front_matter_text = read_front_matter_text(self.file)
+            except (OSError, UnicodeDecodeError):
+                self._front_matter_text = None
+            self._front_matter_read = True
+        return self._front_matter_text
     
     def is_published(self) -> bool:
         """Check if this approach is published."""
+        if self._metadata is None and self._document is None:
+            # Recorded in the gallery manifest
+            if self._published is not None:
+                return self._published
+            # A plain `published:` line answers this without parsing YAML, as
+            # long as the rest of the front matter is known to parse
+            published = peek_front_matter_flag(self._read_front_matter_text(), 'published')
+            if published is not None:
+                return published
         return self.metadata.get('published', False)
     
     def get_title(self) -> str:
@@ -111,6 +155,7 @@ class Approach:
         return self.metadata.get('methods', [])
 
 
+@slotted
 @dataclass
 class PDFExample:
     """Represents a PDF with all its extraction approaches."""
@@ -119,6 +164,7 @@ class PDFExample:
     _metadata: Optional[Dict[str, Any]] = field(default=None, init=False)
     _approaches: Optional[List[Approach]] = field(default=None, init=False)
     _pdf_files: Optional[List[Path]] = field(default=None, init=False)
+    _pdf_sizes: Optional[Dict[str, int]] = field(default=None, init=False)
     
     @property
     def approaches(self) -> List[Approach]:
@@ -141,6 +187,49 @@ class PDFExample:
             self._metadata = self._compute_metadata()
         return self._metadata
     
+    @classmethod
+    def discover(cls, base_dir: Path) -> 'PDFExample':
+        """
+        Scan a PDF directory in one pass, reading only the front matter
+        block of its markdown files (parsed when metadata is first used).
+        Safe to run in a worker thread.
+        """
+        example = cls(id=base_dir.name, base_dir=base_dir)
+        md_files = []
+        example._pdf_files = []
+        with os.scandir(base_dir) as entries:
+            for entry in entries:
+                # Same files as glob("*.md") / glob("*.pdf")
+                if entry.name.startswith('.'):
+                    continue
+                if entry.name.endswith('.md'):
+                    md_files.append(base_dir / entry.name)
+                elif entry.name.endswith('.pdf'):
+                    example._pdf_files.append(base_dir / entry.name)
+        
+        example._approaches = []
+        for md_file in sorted(md_files):
+            approach = Approach(file=md_file, pdf_example=example)
+            approach._read_front_matter_text()
+            example._approaches.append(approach)
+        return example
+    
+    @classmethod
+    def from_manifest_entry(cls, base_dir: Path, entry: Dict[str, Any]) -> 'PDFExample':
+        """Rebuild an example from its GalleryManifest entry, without reading files."""
+        example = cls(id=base_dir.name, base_dir=base_dir)
+        example._pdf_files = [base_dir / item["file"] for item in entry["pdf_files"]]
+        example._pdf_sizes = {item["file"]: item["signature"][1] for item in entry["pdf_files"]}
+        example._approaches = []
+        for item in entry["approaches"]:
+            approach = Approach(file=base_dir / item["file"], pdf_example=example)
+            if item.get("metadata") is not None:
+                approach._metadata = intern_metadata(item["metadata"])
+            else:
+                approach._published = item.get("published")
+            example._approaches.append(approach)
+        return example
+    
     def _load_approaches(self) -> List[Approach]:
         """Load all markdown files as approaches."""
         approaches = []
@@ -171,7 +260,11 @@ class PDFExample:
         if self.pdf_files:
             pdf_file = self.pdf_files[0]
             metadata["pdf"] = pdf_file.name
-            metadata["pdf_size"] = pdf_file.stat().st_size / (1024 * 1024)  # MB
+            if self._pdf_sizes and pdf_file.name in self._pdf_sizes:
+                size = self._pdf_sizes[pdf_file.name]
+            else:
+                size = pdf_file.stat().st_size
+            metadata["pdf_size"] = size / (1024 * 1024)  # MB
         
         return metadata
     
@@ -203,10 +296,17 @@ class PDFExample:
 class Gallery:
     """Collection of all PDF examples."""
     
-    def __init__(self, content_dir: Path, artifacts_dir: Path):
+    def __init__(self, content_dir: Path, artifacts_dir: Path,
+                 manifest_file: Optional[Path] = None):
         self.content_dir = content_dir
         self.artifacts_dir = artifacts_dir
+        self.manifest_file = manifest_file
         self._examples: Optional[Dict[str, PDFExample]] = None
+        self._index: Optional[GalleryIndex] = None
+        self._generation = 0
+        # Examples whose parsed metadata the manifest may lack
+        self._unrecorded: List[PDFExample] = []
+        self._manifest: Optional[GalleryManifest] = None
     
     @property
     def examples(self) -> Dict[str, PDFExample]:
@@ -215,35 +315,122 @@ class Gallery:
             self._examples = self._load_all()
         return self._examples
     
+    @property
+    def index(self) -> GalleryIndex:
+        """Snapshot of the examples with precomputed lookups."""
+        if self._index is None:
+            self._index = GalleryIndex(self.examples, self._generation)
+            self._record_metadata()
+        return self._index
+    
+    def _record_metadata(self):
+        """Store the front matter the index parsed in the manifest."""
+        if not self._unrecorded:
+            return
+        for example in self._unrecorded:
+            self._manifest.record_metadata(example)
+        self._manifest.save()
+        self._unrecorded = []
+    
+    def invalidate(self, pdf_ids: Optional[List[str]] = None):
+        """
+        Forget loaded content after it changed on disk: everything, or
+        just some examples (rescanned now). Either way the next index
+        access builds a new snapshot.
+        """
+        self._generation += 1
+        self._index = None
+        self._unrecorded = []
+        if pdf_ids is None or self._examples is None:
+            self._examples = None
+            return
+        
+        pdfs_dir = self.content_dir / "pdfs"
+        for pdf_id in pdf_ids:
+            base_dir = pdfs_dir / pdf_id
+            if base_dir.is_dir():
+                self._examples[pdf_id] = PDFExample.discover(base_dir)
+            else:
+                self._examples.pop(pdf_id, None)
+    
     def _load_all(self) -> Dict[str, PDFExample]:
-        """Load all PDF examples from the content directory."""
-        examples = {}
+        """
+        Load all PDF examples from the content directory.
+        
+        With a manifest file, examples whose files still have the recorded
+        signatures come straight from the manifest; the rest (and the
+        manifest, if anything changed) are refreshed from disk.
+        
+        Directories are scanned in a thread pool (most of the time is
+        spent waiting on the filesystem), and approaches only have their
+        front matter block read; YAML is parsed and content loaded when
+        something needs them.
+        """
         pdfs_dir = self.content_dir / "pdfs"
         
         if not pdfs_dir.exists():
-            return examples
+            return {}
         
-        for pdf_dir in pdfs_dir.iterdir():
-            if pdf_dir.is_dir():
-                example = PDFExample(
-                    id=pdf_dir.name,
-                    base_dir=pdf_dir
-                )
-                examples[example.id] = example
+        manifest = GalleryManifest(self.manifest_file, self.content_dir) if self.manifest_file else None
+        if manifest:
+            pdf_dirs = manifest.list_dirs(pdfs_dir)
+            # Checking signatures is a few stat calls per example, no threads needed
+            cached = {pdf_dir: manifest.cached_example(pdf_dir) for pdf_dir in pdf_dirs}
+        else:
+            with os.scandir(pdfs_dir) as entries:
+                pdf_dirs = [Path(entry.path) for entry in entries if entry.is_dir()]
+            cached = {}
         
+        discovered = self._discover([pdf_dir for pdf_dir in pdf_dirs if cached.get(pdf_dir) is None])
+        examples = {}
+        for pdf_dir in pdf_dirs:
+            example = cached.get(pdf_dir) or discovered[pdf_dir]
+            examples[example.id] = example
+        
+        if manifest:
+            for example in discovered.values():
+                manifest.update(example)
+            manifest.retain(list(examples))
+            manifest.save()
+            # Front matter is parsed lazily; what the index parses is
+            # added to the manifest once it is built
+            self._manifest = manifest
+            self._unrecorded = list(examples.values())
         return examples
     
+    def _discover(self, pdf_dirs: List[Path]) -> Dict[Path, PDFExample]:
+        """Scan PDF directories in a thread pool."""
+        if not pdf_dirs:
+            return {}
+        
+        # A few chunks per worker: one future per directory costs more
+        # than scanning it
+        workers = min(32, (os.cpu_count() or 1) + 4)
+        chunk_size = max(1, len(pdf_dirs) // (workers * 4))
+        chunks = [pdf_dirs[i:i + chunk_size] for i in range(0, len(pdf_dirs), chunk_size)]
+        
+        discovered = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chunk in executor.map(lambda dirs: [PDFExample.discover(d) for d in dirs], chunks):
+                for example in chunk:
+                    discovered[example.base_dir] = example
+        return discovered
+    
     def get_published(self) -> List[PDFExample]:
         """Get all published PDF examples."""
-        return [ex for ex in self.examples.values() if ex.is_published()]
+        return list(self.index.published)
     
     def get_by_method(self, method: str) -> List[PDFExample]:
         """Get all examples that use a specific method."""
-        results = []
-        for example in self.get_published():
-            if method in example.metadata.get("methods", []):
-                results.append(example)
-        return results
+        return list(self.index.with_method(method))
+    
+    def get_by_tag(self, tag: str) -> List[PDFExample]:
+        """Get all examples with a specific tag."""
+        return list(self.index.with_tag(tag))
+    
+    def get_by_difficulty(self, difficulty: str) -> List[PDFExample]:
+        """Get all examples of a specific difficulty."""
+        return list(self.index.with_difficulty(difficulty))
     
     def get_example(self, pdf_id: str) -> Optional[PDFExample]:
         """Get a specific example by ID."""
@@ -251,23 +438,13 @@ class Gallery:
     
     def get_all_methods(self) -> List[str]:
         """Get all unique methods used across all examples."""
-        methods = set()
-        for example in self.get_published():
-            methods.update(example.metadata.get("methods", []))
-        return sorted(methods)
+        return list(self.index.stats["methods"])
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the gallery."""
-        published = self.get_published()
-        total_approaches = sum(len(ex.approaches) for ex in published)
-        
-        return {
-            "total_pdfs": len(self.examples),
-            "published_pdfs": len(published),
-            "total_approaches": total_approaches,
-            "unique_methods": len(self.get_all_methods()),
-            "methods": self.get_all_methods()
-        }
+        stats = dict(self.index.stats)
+        stats["methods"] = list(stats["methods"])
+        return stats
     
     def __repr__(self):
-        return f"Gallery(examples={len(self.examples)}, published={len(self.get_published())})"
\ No newline at end of file
+        return f"Gallery(examples={len(self.examples)}, published={len(self.index.published)})"
\ No newline at end of file
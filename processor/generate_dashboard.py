@@ -37,7 +37,7 @@ def generate_dashboard():
     )
     
     # Get all PDFs (published and unpublished)
-    all_pdfs = list(gallery.examples.values())
+    all_pdfs = list(gallery.index.examples.values())
     
     # Create and run dashboard task
     dashboard_task = DashboardTask()
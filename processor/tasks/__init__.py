@@ -6,7 +6,11 @@ from .base import Task, BatchTask, TaskContext, TaskResult
 from .metadata import MetadataTask
 from .execution import ExecutionTask
 from .screenshots import ScreenshotTask
+from .sprites import ThumbnailSpriteTask
 from .search import SearchIndexTask
+from .related import RelatedExamplesTask
+from .facets import FacetIndexTask
+from .usage import UsageIndexTask
 from .validation import ValidationTask
 from .validation_incremental import IncrementalValidationTask
 from .notebooks import NotebookTask
@@ -22,7 +26,11 @@ __all__ = [
     'MetadataTask',
     'ExecutionTask',
     'ScreenshotTask',
+    'ThumbnailSpriteTask',
     'SearchIndexTask',
+    'RelatedExamplesTask',
+    'FacetIndexTask',
+    'UsageIndexTask',
     'ValidationTask',
     'IncrementalValidationTask',
     'NotebookTask',
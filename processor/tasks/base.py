@@ -83,6 +83,15 @@ class Task(ABC):
         """
         pass
     
+    def prefetch(self, pdfs: List[PDFExample], context: TaskContext):
+        """
+        Hook called with all the PDFs about to be processed, before the
+        first process() call, e.g. to compute their results in parallel.
+        
+        Default implementation does nothing.
+        """
+        pass
+    
     def needs_processing(self, pdf: PDFExample, context: TaskContext) -> bool:
         """
         Check if this task needs to run for the given PDF.
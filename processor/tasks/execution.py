@@ -165,8 +165,8 @@ class ExecutionTask(Task):
         # Set current file path for image saving
         self.current_file_path = f"pdfs/{approach.pdf_example.id}/{approach.slug}"
         
-        # Parse cells
-        cells = self._parse_cells(approach.content)
+        # Cells from the parsed document (fresh copies, annotated below)
+        cells = approach.document.cell_dicts()
         
         # Save current directory
         original_cwd = os.getcwd()
@@ -214,104 +214,6 @@ class ExecutionTask(Task):
             'cells': cells
         }
     
-    def _parse_cells(self, content: str) -> List[Dict[str, Any]]:
-        """Parse markdown content into cells."""
-        # Remove frontmatter
-        content = re.sub(r'^---\n.*?\n---\n', '', content, flags=re.DOTALL)
-        
-        # Check for tab blocks
-        if '/// tab |' in content:
-            return self._parse_with_tabs(content)
-        else:
-            return self._parse_regular_cells(content)
-    
-    def _parse_with_tabs(self, content: str) -> List[Dict[str, Any]]:
-        """Parse markdown content with tab blocks."""
-        cells = []
-        
-        # Pattern for tab blocks
-        tab_pattern = r'/// tab \| ([^\n]+)\n(.*?)\n///'
-        
-        # Split content by tabs
-        parts = re.split(r'(/// tab \| [^\n]+\n.*?\n///)', content, flags=re.DOTALL)
-        
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-            
-            # Check if this is a tab block
-            tab_match = re.match(tab_pattern, part, re.DOTALL)
-            if tab_match:
-                tab_title = tab_match.group(1).strip()
-                tab_content = tab_match.group(2).strip()
-                
-                # Parse content within tab
-                tab_cells = self._parse_regular_cells(tab_content)
-                
-                cells.append({
-                    'type': 'tab',
-                    'title': tab_title,
-                    'cells': tab_cells
-                })
-            else:
-                # Regular content
-                regular_cells = self._parse_regular_cells(part)
-                cells.extend(regular_cells)
-        
-        return cells
-    
-    def _parse_regular_cells(self, content: str) -> List[Dict[str, Any]]:
-        """Parse regular markdown content."""
-        # More flexible pattern that allows spaces after language identifier
-        pattern = r'```(\w+)(?:\s*)\n(.*?)\n```'
-        cells = []
-        last_end = 0
-        
-        for match in re.finditer(pattern, content, re.DOTALL):
-            # Add markdown before code block
-            if match.start() > last_end:
-                markdown_content = content[last_end:match.start()].strip()
-                if markdown_content:
-                    cells.append({
-                        'type': 'markdown',
-                        'content': markdown_content
-                    })
-            
-            # Add code block
-            language = match.group(1).strip()  # Strip any whitespace from language
-            code_content = match.group(2).strip()
-            
-            if language == 'python':
-                cells.append({
-                    'type': 'code',
-                    'content': code_content
-                })
-            elif language == 'bash':
-                cells.append({
-                    'type': 'bash',
-                    'content': code_content
-                })
-            else:
-                # Other languages as markdown
-                cells.append({
-                    'type': 'markdown',
-                    'content': f'```{language}\n{code_content}\n```'
-                })
-            
-            last_end = match.end()
-        
-        # Add remaining markdown
-        if last_end < len(content):
-            markdown_content = content[last_end:].strip()
-            if markdown_content:
-                cells.append({
-                    'type': 'markdown',
-                    'content': markdown_content
-                })
-        
-        return cells
-    
     def _execute_code(self, code: str, context: TaskContext) -> Dict[str, Any]:
         """Execute Python code and capture output."""
         # Clear figures
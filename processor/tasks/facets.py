@@ -0,0 +1,135 @@
+"""
+Facet index task for PDF Gallery.
+"""
+
+import base64
+import json
+from pathlib import Path
+from typing import Dict, List, Any
+
+from domain import PDFExample
+from tasks import BatchTask, TaskContext
+
+
+class FacetIndexTask(BatchTask):
+    """
+    Task to precompute facet counts and filter bitsets.
+    
+    Every published approach gets an integer doc ID (in slug order). For
+    each facet value, facets.json stores its count and a bitset of the
+    docs that have it, so the frontend filters with bitwise AND/OR over
+    a few bytes instead of looping over all_metadata.json.
+    
+    Bitsets are base64 encoded bytes, little-endian: doc i is bit
+    (i & 7) of byte (i >> 3).
+    """
+    
+    FACET_INDEX_VERSION = 1
+    # Facet name -> metadata field. Fields an example doesn't declare
+    # (e.g. difficulty) are simply left out for it.
+    FACET_FIELDS = {
+        "tags": "tags",
+        "methods": "methods",
+        "language": "language",
+        "difficulty": "difficulty",
+        "approach_type": "approach_type",
+    }
+    
+    def __init__(self):
+        super().__init__(name="facets", dependencies=["metadata"])
+    
+    def process_batch(self, pdfs: List[PDFExample], context: TaskContext) -> Dict[str, Any]:
+        """Build facets.json from all published approaches."""
+        items = []
+        for pdf in pdfs:
+            if not pdf.is_published():
+                continue
+            metadata_path = context.get_artifact_path(pdf, "metadata.json")
+            for metadata in context.read_artifact(metadata_path) or []:
+                if metadata.get("slug"):
+                    items.append(metadata)
+        items.sort(key=lambda item: item["slug"])
+        
+        facets = {}
+        for facet, field in self.FACET_FIELDS.items():
+            members: Dict[str, List[int]] = {}
+            for doc_id, item in enumerate(items):
+                for value in self._facet_values(item.get(field)):
+                    members.setdefault(value, []).append(doc_id)
+            
+            # Most common values first, so UIs can show the top N
+            facets[facet] = {
+                value: {
+                    "count": len(doc_ids),
+                    "bits": self.encode_bitset(doc_ids, len(items))
+                }
+                for value, doc_ids in sorted(members.items(), key=lambda entry: (-len(entry[1]), entry[0]))
+            }
+        
+        index = {
+            "version": self.FACET_INDEX_VERSION,
+            "docCount": len(items),
+            "docs": [{"slug": item["slug"], "id": item.get("id", "")} for item in items],
+            "facets": facets
+        }
+        
+        output_path = self._facets_path(context)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump(index, f, separators=(',', ':'), ensure_ascii=False)
+        
+        return {
+            "documents": len(items),
+            "facet_values": {facet: len(values) for facet, values in facets.items()},
+            "size": output_path.stat().st_size
+        }
+    
+    def get_inputs(self, pdf: PDFExample) -> List[Path]:
+        """Inputs are the approach files the metadata is extracted from."""
+        return [approach.file for approach in pdf.approaches if approach.is_published()]
+    
+    def get_outputs(self, pdf: PDFExample, context: TaskContext) -> List[Path]:
+        """Output files - not used for batch tasks."""
+        return []
+    
+    def get_batch_outputs(self, context: TaskContext) -> List[Path]:
+        """Output files for the batch task."""
+        return [self._facets_path(context)]
+    
+    def _facets_path(self, context: TaskContext) -> Path:
+        return context.artifacts_dir / "facets.json"
+    
+    def _facet_values(self, value: Any) -> List[str]:
+        """Normalize a front matter value (scalar, list or empty) into distinct strings."""
+        if value is None:
+            return []
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        result = []
+        for item in values:
+            if item is None:
+                continue
+            text = str(item).strip()
+            if text and text not in result:
+                result.append(text)
+        return result
+    
+    @staticmethod
+    def encode_bitset(doc_ids: List[int], doc_count: int) -> str:
+        """Encode doc IDs as a base64 little-endian bitset of doc_count bits."""
+        bits = bytearray((doc_count + 7) // 8)
+        for doc_id in doc_ids:
+            bits[doc_id >> 3] |= 1 << (doc_id & 7)
+        return base64.b64encode(bytes(bits)).decode('ascii')
+    
+    @staticmethod
+    def decode_bitset(encoded: str) -> List[int]:
+        """Decode a base64 bitset back into sorted doc IDs."""
+        bits = int.from_bytes(base64.b64decode(encoded), 'little')
+        doc_ids = []
+        doc_id = 0
+        while bits:
+            if bits & 1:
+                doc_ids.append(doc_id)
+            bits >>= 1
+            doc_id += 1
+        return doc_ids
@@ -4,11 +4,15 @@ Metadata extraction task for PDF Gallery.
 
 import re
 import ast
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
-from domain import PDFExample, Approach
+from domain import PDFExample, Approach, Cell, ParsedDocument
+from domain.document import DOCUMENT_VERSION, content_hash
 from tasks import Task, TaskContext
+from utils.analysis_cache import AnalysisCache
 
 
 class MetadataTask(Task):
@@ -20,36 +24,114 @@ class MetadataTask(Task):
     - Methods used (via AST parsing)
     - CSS selectors
     - Code complexity metrics
+    - Page indices referenced by the code
+    
+    With a cache_dir, the parsed document and code analysis of each file
+    are stored by content hash (see AnalysisCache), so unchanged files
+    aren't parsed or walked again in later builds.
+    
+    Parsing and analysis are pure CPU work, so prefetch() runs them for
+    every uncached published approach in a pool of `workers` processes
+    (default: one per CPU) before process() is called; process() then
+    only writes the results. With workers=1, or just a few files to
+    analyze, everything runs in process() as before.
     """
     
-    def __init__(self):
+    # Bump when the extracted fields or visitors change
+    ANALYZER_VERSION = 2
+    # Below this many approaches to analyze, starting processes costs more than it saves
+    MIN_PARALLEL = 32
+    
+    def __init__(self, cache_dir: Optional[Path] = None, workers: Optional[int] = None):
         super().__init__(name="metadata", dependencies=[])
+        self.analysis_cache = AnalysisCache(
+            cache_dir, f"v{DOCUMENT_VERSION}.{self.ANALYZER_VERSION}"
+        ) if cache_dir else None
+        self.workers = workers
+        # File path -> (content hash, document dict, analysis) from prefetch()
+        self._prefetched: Dict[str, Tuple[str, Dict[str, Any], Dict[str, Any]]] = {}
+    
+    def prefetch(self, pdfs: List[PDFExample], context: TaskContext):
+        """Analyze the approaches of pdfs that aren't cached, in parallel."""
+        self._prefetched = {}
+        workers = self.workers or os.cpu_count() or 1
+        if workers < 2:
+            return
+        
+        paths = []
+        for pdf in pdfs:
+            for approach in pdf.approaches:
+                if not approach.is_published():
+                    continue
+                if self.analysis_cache:
+                    try:
+                        content = approach.file.read_text(encoding='utf-8')
+                    except (OSError, UnicodeDecodeError):
+                        continue  # process() reports it
+                    if self.analysis_cache.has(content):
+                        continue
+                paths.append(str(approach.file))
+        if len(paths) < self.MIN_PARALLEL:
+            return
+        
+        # A few chunks per worker keeps them busy without a round trip per file
+        workers = min(workers, len(paths))
+        chunk_size = max(1, len(paths) // (workers * 4))
+        chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for results in executor.map(_analyze_files, chunks):
+                    for path, digest, document, analysis in filter(None, results):
+                        self._prefetched[path] = (digest, document, analysis)
+        except (OSError, RuntimeError, NotImplementedError) as e:
+            # e.g. no multiprocessing support here, or a worker died
+            context.log(f"Parallel metadata extraction unavailable, running serially: {e}", "WARNING")
+            self._prefetched = {}
+            return
+        context.log(f"Analyzed {len(self._prefetched)} approaches in {workers} processes")
+    
+    def _take_prefetched(self, approach: Approach) -> Optional[Dict[str, Any]]:
+        """The analysis prefetch() computed for an approach, if its file is unchanged since."""
+        entry = self._prefetched.pop(str(approach.file), None)
+        if entry is None:
+            return None
+        digest, document, analysis = entry
+        if digest != content_hash(approach.content):
+            return None
+        # Registered so approach.document reuses it instead of parsing again
+        ParsedDocument.from_dict(document)
+        return analysis
     
     def process(self, pdf: PDFExample, context: TaskContext) -> Dict[str, Any]:
         """Extract metadata from all approaches for a PDF."""
         all_metadata = []
+        cache_hits = 0
         
         for approach in pdf.approaches:
+            # Look up before is_published() so a hit skips the YAML parse too
+            analysis = self.analysis_cache.get(approach.content) if self.analysis_cache else None
             if not approach.is_published():
+                if analysis is None and self.analysis_cache:
+                    # Nothing to analyze, but remember the parsed document
+                    self.analysis_cache.put(approach.document, None)
                 continue
             
+            if analysis is None:
+                analysis = self._take_prefetched(approach)
+                if analysis is None:
+                    analysis = self._analyze(approach)
+                if self.analysis_cache:
+                    self.analysis_cache.put(approach.document, analysis)
+            else:
+                cache_hits += 1
+            
             # Get base metadata from approach
             metadata = approach.metadata.copy()
             
-            # Add additional extracted data
-            content = approach.content
-            
-            # Extract methods using AST
-            methods = self._extract_methods(content)
-            method_usage = self._extract_method_usage_details(content)
-            
             metadata.update({
                 "id": pdf.id,
                 "slug": approach.slug,
-                "methods": methods,
-                "method_usage": method_usage,
-                "selectors": self._extract_selectors(content),
-                "complexity": self._calculate_complexity(content),
+                **analysis,
                 "approaches": [a.file.name for a in pdf.approaches]
             })
             
@@ -64,7 +146,7 @@ class MetadataTask(Task):
             combined_path = context.get_artifact_path(pdf, "metadata.json")
             context.write_artifact(combined_path, all_metadata)
         
-        return {"metadata_count": len(all_metadata)}
+        return {"metadata_count": len(all_metadata), "analysis_cache_hits": cache_hits}
     
     def get_inputs(self, pdf: PDFExample) -> List[Path]:
         """Input files are all markdown files."""
@@ -85,53 +167,70 @@ class MetadataTask(Task):
         
         return outputs
     
-    def _extract_methods(self, content: str) -> List[str]:
-        """Extract natural-pdf methods using AST parsing."""
-        methods = set()
-        code_blocks = re.findall(r'```python\n(.*?)\n```', content, re.DOTALL)
+    def _analyze(self, approach: Approach) -> Dict[str, Any]:
+        """
+        Extract everything derived from an approach's python code cells.
         
-        for code in code_blocks:
-            try:
-                tree = ast.parse(code)
-                visitor = NaturalPDFVisitor()
-                visitor.visit(tree)
-                
-                # Simplify method names
-                for method in visitor.methods:
-                    if '.' in method:
-                        simple_name = method.split('.')[-1]
-                        methods.add(simple_name)
-                    else:
-                        methods.add(method)
-            except SyntaxError:
+        Each cell's AST comes from the approach's parsed document and is
+        walked once; the usage visitor also collects the methods and page
+        references. Usage details are located by their line in the file
+        and the index of their cell among the code cells.
+        """
+        cells = approach.document.code_cells
+        visitors = []
+        for index, cell in enumerate(cells):
+            if cell.tree is None:
                 continue
+            visitor = DetailedUsageVisitor(line_offset=cell.line - 1)
+            visitor.visit(cell.tree)
+            for detail in visitor.usage_details:
+                detail['cell'] = index
+            visitors.append(visitor)
         
-        return sorted(list(methods))
+        return {
+            "methods": self._extract_methods(visitors),
+            "method_usage": [detail for visitor in visitors for detail in visitor.usage_details],
+            "selectors": self._extract_selectors(cells),
+            "complexity": self._calculate_complexity(cells),
+            "page_references": self._extract_page_references(visitors)
+        }
     
-    def _extract_method_usage_details(self, content: str) -> List[Dict[str, Any]]:
-        """Extract detailed method usage including arguments."""
-        usage_details = []
-        code_blocks = re.findall(r'```python\n(.*?)\n```', content, re.DOTALL)
-        
-        for code in code_blocks:
-            try:
-                tree = ast.parse(code)
-                visitor = DetailedUsageVisitor()
-                visitor.visit(tree)
-                usage_details.extend(visitor.usage_details)
-            except SyntaxError:
-                continue
+    def _extract_methods(self, visitors: List['NaturalPDFVisitor']) -> List[str]:
+        """Collect natural-pdf method names, simplified to the last component."""
+        methods = set()
+        for visitor in visitors:
+            for method in visitor.methods:
+                methods.add(method.split('.')[-1])
+        return sorted(methods)
+    
+    def _extract_page_references(self, visitors: List['NaturalPDFVisitor']) -> Dict[str, List[Any]]:
+        """
+        Collect the page indices the code touches, e.g. pdf.pages[0].
+                
+        Indices are kept as written (0-based, possibly negative) and slices
+        as [start, stop] pairs, since resolving them needs the page count.
+        A bound of None means open-ended or not statically known.
+        """
+        indices = set()
+        slices = set()
+        for visitor in visitors:
+            indices.update(visitor.page_indices)
+            slices.update(visitor.page_slices)
         
-        return usage_details
+        return {
+            "indices": sorted(indices),
+            "slices": [list(s) for s in sorted(slices, key=lambda s: (
+                s[0] if s[0] is not None else float('-inf'),
+                s[1] if s[1] is not None else float('inf')
+            ))]
+        }
     
-    def _extract_selectors(self, content: str) -> List[str]:
+    def _extract_selectors(self, cells: List[Cell]) -> List[str]:
         """Extract CSS-like selectors used in find/find_all calls."""
         selectors = set()
-        code_blocks = re.findall(r'```python\n(.*?)\n```', content, re.DOTALL)
         
-        for code in code_blocks:
-            lines = code.split('\n')
-            for line in lines:
+        for cell in cells:
+            for line in cell.content.split('\n'):
                 if '.find' in line:
                     # Extract selector strings
                     single_quote = re.search(r"\.find(?:_all)?\s*\(\s*'([^']*)'", line)
@@ -144,15 +243,13 @@ class MetadataTask(Task):
         
         return sorted(list(selectors))
     
-    def _calculate_complexity(self, content: str) -> Dict[str, Any]:
+    def _calculate_complexity(self, cells: List[Cell]) -> Dict[str, Any]:
         """Calculate code complexity metrics."""
-        code_blocks = re.findall(r'```python\n(.*?)\n```', content, re.DOTALL)
-        
         total_lines = 0
         total_chars = 0
         
-        for code in code_blocks:
-            lines = code.strip().split('\n')
+        for cell in cells:
+            lines = cell.content.split('\n')
             code_lines = [
                 line for line in lines 
                 if line.strip() and not line.strip().startswith('#')
@@ -161,13 +258,32 @@ class MetadataTask(Task):
             total_chars += sum(len(line) for line in code_lines)
         
         return {
-            "code_blocks": len(code_blocks),
+            "code_blocks": len(cells),
             "total_lines": total_lines,
             "total_chars": total_chars
         }
 
 
-# AST Visitors (adapted from metadata_extractor.py)
+def _analyze_files(paths: List[str]) -> List[Optional[tuple]]:
+    """
+    Process pool worker for MetadataTask.prefetch(): parse and analyze
+    markdown files.
+    
+    Returns:
+        (path, content hash, document dict, analysis) per file, or None
+        for files that failed (process() analyzes those and reports errors)
+    """
+    task = MetadataTask()
+    results = []
+    for path in paths:
+        try:
+            approach = Approach(file=Path(path))
+            document = approach.document
+            results.append((path, document.content_hash, document.to_dict(), task._analyze(approach)))
+        except Exception:
+            results.append(None)
+    return results
+
 
 class NaturalPDFVisitor(ast.NodeVisitor):
     """AST visitor to track natural-pdf objects and their method calls."""
@@ -176,6 +292,8 @@ class NaturalPDFVisitor(ast.NodeVisitor):
         self.methods = set()
         self.natural_pdf_vars = {}
         self.imports = set()
+        self.page_indices = set()
+        self.page_slices = set()
     
     def visit_ImportFrom(self, node):
         """Track imports from natural_pdf."""
@@ -252,9 +370,57 @@ class NaturalPDFVisitor(ast.NodeVisitor):
                 return base
         return None
     
+    def visit_Subscript(self, node):
+        """Track page indexing like pdf.pages[0] and pdf.pages[2:5]."""
+        if self._is_pages_attribute(node.value):
+            index = node.slice
+            if hasattr(ast, 'Index') and isinstance(index, ast.Index):
+                index = index.value  # Python < 3.9
+            
+            if isinstance(index, ast.Slice):
+                self.page_slices.add((
+                    self._constant_int(index.lower),
+                    self._constant_int(index.upper)
+                ))
+            else:
+                value = self._constant_int(index)
+                if value is not None:
+                    self.page_indices.add(value)
+                else:
+                    # Computed index - could be any page
+                    self.page_slices.add((None, None))
+        
+        self.generic_visit(node)
+    
+    def visit_For(self, node):
+        """Iterating over pdf.pages touches every page."""
+        if self._is_pages_attribute(node.iter):
+            self.page_slices.add((None, None))
+        self.generic_visit(node)
+    
+    def _is_pages_attribute(self, node) -> bool:
+        """Check if a node is the .pages attribute of a natural-pdf object."""
+        if not isinstance(node, ast.Attribute) or node.attr != 'pages':
+            return False
+        if isinstance(node.value, ast.Call):
+            return True
+        obj_name = self._get_object_name(node.value)
+        return obj_name in self.natural_pdf_vars or obj_name == 'pdf'
+    
+    def _constant_int(self, node) -> Optional[int]:
+        """Get an integer literal (including negative ones) from a node."""
+        if isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = self._constant_int(node.operand)
+            return -value if value is not None else None
+        return None
+    
     def visit_ListComp(self, node):
         """Handle list comprehensions."""
         for generator in node.generators:
+            if self._is_pages_attribute(generator.iter):
+                self.page_slices.add((None, None))
             if isinstance(generator.iter, ast.Attribute):
                 obj_name = self._get_object_name(generator.iter.value)
                 if obj_name in self.natural_pdf_vars or obj_name in ['pdf', 'page']:
@@ -271,11 +437,18 @@ class NaturalPDFVisitor(ast.NodeVisitor):
 
 
 class DetailedUsageVisitor(NaturalPDFVisitor):
-    """Extended visitor that captures method arguments and usage details."""
+    """
+    Extended visitor that captures method arguments and usage details.
     
-    def __init__(self):
+    Each detail records the line of the call; line_offset is added to
+    the AST's line numbers, e.g. to turn them into lines of the file the
+    code was taken from.
+    """
+    
+    def __init__(self, line_offset: int = 0):
         super().__init__()
         self.usage_details = []
+        self.line_offset = line_offset
     
     def visit_Assign(self, node):
         """Override parent to also track class instantiation usage."""
@@ -285,13 +458,14 @@ class DetailedUsageVisitor(NaturalPDFVisitor):
             func_name = node.value.func.id
             if func_name in ['PDF', 'Guides', 'Flow']:
                 args = [self._extract_arg_value(arg) for arg in node.value.args]
-                kwargs = {kw.arg: self._extract_arg_value(kw.value) for kw in node.value.keywords}
+                kwargs = self._extract_kwargs(node.value.keywords)
                 
                 self.usage_details.append({
                     'method': func_name,
                     'method_full': func_name,
                     'args': args,
-                    'kwargs': kwargs
+                    'kwargs': kwargs,
+                    'line': node.value.lineno + self.line_offset
                 })
     
     def visit_Call(self, node):
@@ -302,7 +476,7 @@ class DetailedUsageVisitor(NaturalPDFVisitor):
             
             # Track all method calls, not just a predefined list
             args = [self._extract_arg_value(arg) for arg in node.args]
-            kwargs = {kw.arg: self._extract_arg_value(kw.value) for kw in node.keywords}
+            kwargs = self._extract_kwargs(node.keywords)
             
             # Determine if this is likely a natural-pdf related call
             is_natural_pdf = (
@@ -316,11 +490,20 @@ class DetailedUsageVisitor(NaturalPDFVisitor):
                     'method': method_name,
                     'method_full': f"{obj_name}.{method_name}" if obj_name else method_name,
                     'args': args,
-                    'kwargs': kwargs
+                    'kwargs': kwargs,
+                    # Where .method is, not where a multi-line chain starts
+                    'line': (getattr(node.func, 'end_lineno', None) or node.lineno) + self.line_offset
                 })
         
         super().visit_Call(node)
     
+    def _extract_kwargs(self, keywords) -> Dict[str, Any]:
+        """Keyword arguments by name; a **mapping argument is stored under '**'."""
+        return {
+            kw.arg if kw.arg is not None else '**': self._extract_arg_value(kw.value)
+            for kw in keywords
+        }
+    
     def _extract_arg_value(self, node):
         """Extract the value from an AST node."""
         if isinstance(node, ast.Constant):
@@ -7,7 +7,7 @@ import yaml
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
-from domain import PDFExample, Approach
+from domain import PDFExample, Approach, Cell
 from tasks import Task, TaskContext
 
 
@@ -174,83 +174,52 @@ class NotebookTask(Task):
             ]
         })
         
-        # Parse the full content to preserve markdown and code order
-        content = approach.content
-        
-        # Remove frontmatter
-        if content.startswith('---'):
-            try:
-                end_index = content.index('---', 3)
-                content = content[end_index + 3:].strip()
-            except ValueError:
-                pass
-        
-        # Split content into sections (markdown and code blocks)
-        import re
-        
-        # Pattern to match code blocks (including language)
-        code_pattern = r'```(\w*)\n(.*?)\n```'
-        
-        # Split the content by code blocks
-        parts = re.split(code_pattern, content, flags=re.DOTALL)
-        
-        # Process parts: parts[0] is markdown, then alternates: lang, code, markdown, lang, code, etc.
-        i = 0
-        while i < len(parts):
-            if i % 3 == 0:  # Markdown sections
-                markdown_content = parts[i].strip()
-                if markdown_content:
-                    # Split into lines and add newlines
-                    lines = markdown_content.split('\n')
-                    source_lines = [line + '\n' for line in lines[:-1]]
-                    if lines[-1]:
-                        source_lines.append(lines[-1])
-                    
-                    notebook["cells"].append({
-                        "cell_type": "markdown",
-                        "metadata": {},
-                        "source": source_lines
-                    })
-            elif i % 3 == 1:  # Language identifier
-                lang = parts[i] or 'python'
-                code = parts[i + 1]
+        # Add the approach's cells in document order
+        for cell in approach.document.cells:
+            if cell.type == 'tab':
+                # Tabs can't be shown side by side, so each gets a heading
+                notebook["cells"].append(self._markdown_cell(f"#### {cell.title}"))
+                for tab_cell in cell.cells:
+                    self._append_cell(notebook, tab_cell)
+            else:
+                self._append_cell(notebook, cell)
+        
+        return notebook
+        
+    def _append_cell(self, notebook: Dict[str, Any], cell: Cell):
+        """Add a markdown, python or bash cell to the notebook."""
+        if cell.type == 'markdown':
+            notebook["cells"].append(self._markdown_cell(cell.content))
+        elif cell.type == 'code':
+            notebook["cells"].append(self._code_cell(self._source_lines(cell.content)))
+        elif cell.type == 'bash':
+            # Bash blocks become code cells with ! prefixed commands
+            notebook["cells"].append(self._code_cell(self._source_lines(cell.content, prefix='!')))
+        
+    def _markdown_cell(self, text: str) -> Dict[str, Any]:
+        return {
+            "cell_type": "markdown",
+            "metadata": {},
+            "source": self._source_lines(text)
+        }
                 
-                if lang in ['python', 'py']:
-                    # Split code into lines for notebook format, preserving newlines
-                    lines = code.split('\n')
-                    # Add newline to all lines except the last one
-                    source_lines = [line + '\n' for line in lines[:-1]]
-                    if lines[-1]:  # If last line is not empty, add it without newline
-                        source_lines.append(lines[-1])
-                    
-                    notebook["cells"].append({
-                        "cell_type": "code",
-                        "execution_count": None,
-                        "metadata": {},
-                        "outputs": [],
-                        "source": source_lines
-                    })
-                elif lang == 'bash':
-                    # For bash blocks, add them as code cells with ! prefix
-                    lines = code.split('\n')
-                    source_lines = []
-                    for line in lines[:-1]:
-                        if line.strip():
-                            source_lines.append('!' + line + '\n')
-                        else:
-                            source_lines.append('\n')
-                    if lines[-1]:
-                        source_lines.append('!' + lines[-1])
-                    
-                    notebook["cells"].append({
-                        "cell_type": "code",
-                        "execution_count": None,
-                        "metadata": {},
-                        "outputs": [],
-                        "source": source_lines
-                    })
-                # Skip i+1 since we already processed the code
-                i += 1
-            i += 1
-        
-        return notebook
\ No newline at end of file
+    def _code_cell(self, source: List[str]) -> Dict[str, Any]:
+        return {
+            "cell_type": "code",
+            "execution_count": None,
+            "metadata": {},
+            "outputs": [],
+            "source": source
+        }
+    
+    def _source_lines(self, text: str, prefix: str = '') -> List[str]:
+        """Split text into notebook source lines, keeping the newlines."""
+        lines = [
+            prefix + line if line.strip() else line
+            for line in text.split('\n')
+        ]
+        # Every line but the last ends with a newline
+        source_lines = [line + '\n' for line in lines[:-1]]
+        if lines[-1]:
+            source_lines.append(lines[-1])
+        return source_lines
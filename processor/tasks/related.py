@@ -0,0 +1,390 @@
+"""
+Related examples task for PDF Gallery.
+"""
+
+import hashlib
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from collections import Counter
+
+import numpy as np
+
+from domain import PDFExample
+from tasks import BatchTask, TaskContext
+from utils.text import tokenize
+
+# Try to import scipy for sparse matrices
+try:
+    from scipy import sparse
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+    sparse = None
+
+
+class RelatedExamplesTask(BatchTask):
+    """
+    Task to precompute "related examples" for every approach.
+    
+    Each approach becomes a TF-IDF vector over its methods, selectors,
+    tags and description words; related.json lists its top_k nearest
+    approaches of other PDFs by cosine similarity, so the frontend needs
+    no client-side computation.
+    
+    Updates are incremental: the IDF weights are frozen between full
+    rebuilds, so when only a few approaches changed, only their rows of
+    the similarity matrix are computed and merged into the stored
+    neighbour lists. A full rebuild (fresh IDF) happens once more than
+    full_rebuild_ratio of the approaches changed since the last one.
+    
+    Without scipy the matrix is dense (approaches x vocabulary); the task
+    is skipped when that would take more than DENSE_MAX_BYTES.
+    """
+    
+    STATE_VERSION = 2
+    # Feature prefix and weight per metadata field
+    FIELD_WEIGHTS = {
+        "methods": ("m", 1.0),
+        "selectors": ("s", 1.0),
+        "tags": ("t", 1.5),
+        "description": ("d", 0.5),
+    }
+    # Rows of the similarity matrix computed at once
+    BLOCK_SIZE = 1024
+    # Largest dense TF-IDF matrix built when scipy isn't installed
+    DENSE_MAX_BYTES = 512 * 1024 * 1024
+    
+    def __init__(self, top_k: int = 5, full_rebuild_ratio: float = 0.25):
+        super().__init__(name="related", dependencies=["metadata"])
+        self.top_k = top_k
+        self.full_rebuild_ratio = full_rebuild_ratio
+        # Neighbours kept in the state beyond top_k, so dropping a
+        # changed neighbour rarely forces a full row recompute
+        self.keep = top_k * 2
+    
+    def process_batch(self, pdfs: List[PDFExample], context: TaskContext) -> Dict[str, Any]:
+        """Build or update related.json."""
+        items = self._collect_items(pdfs, context)
+        slugs = sorted(items)
+        features = {slug: self._features(items[slug]) for slug in slugs}
+        hashes = {slug: self._feature_hash(features[slug]) for slug in slugs}
+        
+        previous = self._load_state(context)
+        changed = [slug for slug in slugs if not previous or previous["docs"].get(slug, {}).get("hash") != hashes[slug]]
+        removed = [slug for slug in (previous["docs"] if previous else {}) if slug not in items]
+        
+        # Changes accumulate against the frozen IDF until a full rebuild
+        drift = len(changed) + len(removed) + (previous.get("drift", 0) if previous else 0)
+        incremental = bool(previous) and drift <= self.full_rebuild_ratio * max(len(slugs), 1)
+        
+        if incremental:
+            idf = previous["idf"]
+            idf_default = previous["idf_default"]
+        else:
+            idf, idf_default = self._compute_idf(features)
+        
+        if not HAS_SCIPY:
+            vocabulary_size = len(set().union(*features.values()))
+            dense_bytes = len(slugs) * vocabulary_size * 8
+            if dense_bytes > self.DENSE_MAX_BYTES:
+                context.log(
+                    f"scipy not installed and a dense {len(slugs)}x{vocabulary_size} TF-IDF matrix "
+                    f"needs {dense_bytes // (1024 * 1024)}MB, skipping related examples",
+                    "ERROR"
+                )
+                return {"error": "scipy not installed"}
+        
+        matrix, _vocabulary = self._build_matrix(slugs, features, idf, idf_default)
+        groups = [items[slug]["id"] for slug in slugs]
+        
+        if incremental:
+            neighbours, truncated, rows_computed = self._update_neighbours(
+                slugs, groups, matrix, set(changed), set(removed), previous
+            )
+        else:
+            ranked, truncated_rows = self._top_neighbours(matrix, groups, list(range(len(slugs))))
+            neighbours = {
+                slugs[row]: [[slugs[col], score] for col, score in cols]
+                for row, cols in ranked.items()
+            }
+            truncated = {slugs[row] for row in truncated_rows}
+            rows_computed = len(slugs)
+            drift = 0
+        
+        # Persist full-precision state for the next incremental update
+        state = {
+            "version": self.STATE_VERSION,
+            "top_k": self.top_k,
+            "keep": self.keep,
+            "drift": drift,
+            "fields": {field: list(spec) for field, spec in self.FIELD_WEIGHTS.items()},
+            "idf": idf,
+            "idf_default": idf_default,
+            "docs": {
+                slug: {
+                    "hash": hashes[slug],
+                    "neighbours": neighbours[slug],
+                    "truncated": slug in truncated
+                }
+                for slug in slugs
+            }
+        }
+        self._state_path(context).write_text(json.dumps(state, separators=(',', ':')))
+        
+        related = {
+            slug: [
+                {
+                    "slug": other,
+                    "id": items[other]["id"],
+                    "title": items[other]["title"],
+                    "score": round(score, 4)
+                }
+                for other, score in neighbours[slug][:self.top_k]
+            ]
+            for slug in slugs
+        }
+        context.write_artifact(self._related_path(context), {
+            "version": self.STATE_VERSION,
+            "related": related
+        })
+        
+        return {
+            "approaches": len(slugs),
+            "changed": len(changed),
+            "removed": len(removed),
+            "incremental": incremental,
+            "rows_computed": rows_computed,
+            "vocabulary": matrix.shape[1],
+            "sparse": HAS_SCIPY
+        }
+    
+    def get_inputs(self, pdf: PDFExample) -> List[Path]:
+        """Inputs are the approach files the metadata is extracted from."""
+        return [approach.file for approach in pdf.approaches if approach.is_published()]
+    
+    def get_outputs(self, pdf: PDFExample, context: TaskContext) -> List[Path]:
+        """Output files - not used for batch tasks."""
+        return []
+    
+    def get_batch_outputs(self, context: TaskContext) -> List[Path]:
+        """Output files for the batch task."""
+        return [self._related_path(context), self._state_path(context)]
+    
+    def needs_batch_processing(self, pdfs: List[PDFExample], context: TaskContext) -> bool:
+        """Rebuild when any approach's features changed or approaches came or went."""
+        if any(not output.exists() for output in self.get_batch_outputs(context)):
+            return True
+        
+        previous = self._load_state(context)
+        if previous is None:
+            return True
+        
+        items = self._collect_items(pdfs, context)
+        current = {slug: self._feature_hash(self._features(item)) for slug, item in items.items()}
+        recorded = {slug: doc["hash"] for slug, doc in previous["docs"].items()}
+        return current != recorded
+    
+    def _related_path(self, context: TaskContext) -> Path:
+        return context.artifacts_dir / "related.json"
+    
+    def _state_path(self, context: TaskContext) -> Path:
+        return context.artifacts_dir / "related.state.json"
+    
+    def _load_state(self, context: TaskContext) -> Optional[Dict[str, Any]]:
+        """Load the previous state if it was built with the same settings."""
+        path = self._state_path(context)
+        if not path.exists() or not self._related_path(context).exists():
+            return None
+        try:
+            state = json.loads(path.read_text())
+        except (ValueError, IOError):
+            return None
+        
+        if (state.get("version") != self.STATE_VERSION
+                or state.get("top_k") != self.top_k
+                or state.get("keep") != self.keep
+                or state.get("fields") != {f: list(s) for f, s in self.FIELD_WEIGHTS.items()}):
+            return None
+        return state
+    
+    def _collect_items(self, pdfs: List[PDFExample],
+                       context: TaskContext) -> Dict[str, Dict[str, Any]]:
+        """Load the metadata of every published approach, keyed by slug."""
+        items = {}
+        for pdf in pdfs:
+            if not pdf.is_published():
+                continue
+            metadata_path = context.get_artifact_path(pdf, "metadata.json")
+            for metadata in context.read_artifact(metadata_path) or []:
+                if metadata.get("slug"):
+                    items[metadata["slug"]] = metadata
+        return items
+    
+    def _features(self, metadata: Dict[str, Any]) -> Dict[str, float]:
+        """Weighted term counts, prefixed by field so a tag never matches a method."""
+        counts: Counter = Counter()
+        for field, (prefix, weight) in self.FIELD_WEIGHTS.items():
+            value = metadata.get(field) or []
+            terms = tokenize(value) if isinstance(value, str) else [str(v) for v in value]
+            for term, count in Counter(terms).items():
+                # Sublinear tf: repeating a word in a description shouldn't dominate
+                counts[f"{prefix}:{term}"] += weight * (1 + math.log(count))
+        return dict(counts)
+    
+    def _feature_hash(self, features: Dict[str, float]) -> str:
+        payload = json.dumps(features, sort_keys=True)
+        return hashlib.md5(payload.encode('utf-8')).hexdigest()
+    
+    def _compute_idf(self, features: Dict[str, Dict[str, float]]) -> Tuple[Dict[str, float], float]:
+        """Smoothed IDF per feature, plus the IDF of a feature seen in one document."""
+        df: Counter = Counter()
+        for terms in features.values():
+            df.update(terms.keys())
+        n = len(features)
+        idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+        return idf, math.log((1 + n) / 2) + 1
+    
+    def _build_matrix(self, slugs: List[str], features: Dict[str, Dict[str, float]],
+                      idf: Dict[str, float], idf_default: float):
+        """Build the L2-normalised TF-IDF matrix (sparse with scipy, dense otherwise)."""
+        vocabulary: Dict[str, int] = {}
+        rows, cols, values = [], [], []
+        for row, slug in enumerate(slugs):
+            for term, tf in features[slug].items():
+                col = vocabulary.setdefault(term, len(vocabulary))
+                rows.append(row)
+                cols.append(col)
+                values.append(tf * idf.get(term, idf_default))
+        
+        shape = (len(slugs), max(len(vocabulary), 1))
+        values = np.asarray(values, dtype=np.float64)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        
+        norms = np.zeros(shape[0])
+        np.add.at(norms, rows, values ** 2)
+        norms = np.sqrt(norms)
+        norms[norms == 0] = 1.0
+        values = values / norms[rows]
+        
+        if HAS_SCIPY:
+            matrix = sparse.csr_matrix((values, (rows, cols)), shape=shape)
+        else:
+            matrix = np.zeros(shape)
+            matrix[rows, cols] = values
+        return matrix, vocabulary
+    
+    def _similarities(self, matrix, row_indices: List[int]) -> np.ndarray:
+        """Cosine similarities of the given rows against every row (dense block)."""
+        block = matrix[row_indices]
+        result = block @ matrix.T
+        return result.toarray() if HAS_SCIPY else np.asarray(result)
+    
+    def _top_neighbours(self, matrix, groups: List[str],
+                        row_indices: List[int]) -> Tuple[Dict[int, List[List[Any]]], set]:
+        """
+        Get the `keep` most similar rows of other PDFs for each given row.
+        
+        Returns:
+            ({row: [[row, score], ...]} by descending score, ties by row
+            (rows are in slug order), rows with more than `keep` similar
+            rows, whose lists were cut)
+        """
+        # Integer codes per PDF, so same-PDF masking is one comparison per block
+        codes = {group: code for code, group in enumerate(sorted(set(groups)))}
+        group_codes = np.array([codes[group] for group in groups], dtype=np.int64)
+        neighbours = {}
+        truncated = set()
+        
+        for start in range(0, len(row_indices), self.BLOCK_SIZE):
+            block_rows = row_indices[start:start + self.BLOCK_SIZE]
+            sims = self._similarities(matrix, block_rows)
+            
+            # Approaches of the same PDF are already linked on its page
+            sims[group_codes[block_rows][:, None] == group_codes[None, :]] = 0.0
+            
+            count = min(self.keep, sims.shape[1])
+            if not count:
+                continue
+            candidates = np.argpartition(-sims, count - 1, axis=1)[:, :count]
+            
+            for offset, row in enumerate(block_rows):
+                scores = sims[offset]
+                ranked = sorted(
+                    (int(col) for col in candidates[offset] if scores[col] > 0),
+                    key=lambda col: (-scores[col], col)
+                )
+                neighbours[row] = [[col, float(scores[col])] for col in ranked]
+                if np.count_nonzero(scores > 0) > count:
+                    truncated.add(row)
+        
+        return neighbours, truncated
+    
+    def _update_neighbours(self, slugs: List[str], groups: List[str], matrix,
+                           changed: set, removed: set,
+                           previous: Dict[str, Any]) -> Tuple[Dict[str, List[List[Any]]], set, int]:
+        """
+        Merge the similarities of changed rows into the stored neighbour lists.
+        
+        With IDF frozen, an unchanged approach's similarity to another
+        unchanged approach is the same as last build. Its new list is its
+        stored list minus changed/removed approaches, merged with the
+        fresh similarities to the changed ones.
+        
+        A stored list that wasn't truncated holds every similar approach,
+        so the merge is exact. A truncated one is only exact down to its
+        last score (approaches past it scored no higher), so merged
+        entries below that are dropped, and the row is recomputed once
+        fewer than top_k remain.
+        
+        Returns:
+            (neighbours by slug, slugs whose lists are truncated, rows computed)
+        """
+        index = {slug: row for row, slug in enumerate(slugs)}
+        changed_rows = [index[slug] for slug in slugs if slug in changed]
+        stale = changed | removed
+        
+        neighbours: Dict[str, List[List[Any]]] = {}
+        truncated = set()
+        recompute = list(changed_rows)
+        
+        # Similarities of every row to the changed rows
+        to_changed = self._similarities(matrix, changed_rows).T if changed_rows else None
+        
+        for row, slug in enumerate(slugs):
+            if slug in changed:
+                continue
+            stored = previous["docs"][slug]
+            kept = [
+                [other, score]
+                for other, score in stored["neighbours"]
+                if other not in stale
+            ]
+            
+            if to_changed is not None:
+                for offset, changed_row in enumerate(changed_rows):
+                    score = float(to_changed[row][offset])
+                    if score > 0 and groups[changed_row] != groups[row]:
+                        kept.append([slugs[changed_row], score])
+            kept.sort(key=lambda item: (-item[1], item[0]))
+            
+            if stored["truncated"]:
+                floor = stored["neighbours"][-1][1]
+                kept = [item for item in kept if item[1] >= floor]
+                if len(kept) < self.top_k:
+                    # Too many neighbours dropped to know the rest of the top_k
+                    recompute.append(row)
+                    continue
+            
+            neighbours[slug] = kept[:self.keep]
+            if stored["truncated"] or len(kept) > self.keep:
+                truncated.add(slug)
+        
+        fresh, fresh_truncated = self._top_neighbours(matrix, groups, recompute)
+        for row, ranked in fresh.items():
+            neighbours[slugs[row]] = [[slugs[col], score] for col, score in ranked]
+        truncated |= {slugs[row] for row in fresh_truncated}
+        
+        return neighbours, truncated, len(recompute)
@@ -0,0 +1,147 @@
+"""
+Page renderers used by the screenshot task.
+
+Two backends are available:
+- PopplerRenderer: pdf2image, which shells out to pdftoppm/pdftocairo
+- PdfiumRenderer: pypdfium2, which renders in-process
+"""
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Type
+
+# Try to import pdf2image
+try:
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    HAS_PDF2IMAGE = True
+except ImportError:
+    HAS_PDF2IMAGE = False
+    convert_from_path = None
+    pdfinfo_from_path = None
+
+# Try to import pypdfium2
+try:
+    import pypdfium2 as pdfium
+    HAS_PDFIUM = True
+except ImportError:
+    HAS_PDFIUM = False
+    pdfium = None
+
+
+class PageRenderer(ABC):
+    """Base class for PDF page renderers."""
+    
+    name = "base"
+    
+    @classmethod
+    @abstractmethod
+    def is_available(cls) -> bool:
+        """Check if the backend's dependencies are installed."""
+        pass
+    
+    @abstractmethod
+    def page_count(self, pdf_path: Path) -> int:
+        """Get the number of pages without rendering anything."""
+        pass
+    
+    @abstractmethod
+    def render(self, pdf_path: Path, first_page: int, last_page: int,
+               dpi: int) -> List['Image.Image']:
+        """
+        Render a range of pages to PIL images.
+        
+        Args:
+            pdf_path: Path to the PDF
+            first_page: First page to render (1-based, inclusive)
+            last_page: Last page to render (1-based, inclusive)
+            dpi: Rendering resolution
+        """
+        pass
+    
+    def __repr__(self):
+        return f"{self.__class__.__name__}()"
+
+
+class PopplerRenderer(PageRenderer):
+    """Render pages with poppler via pdf2image (one subprocess per call)."""
+    
+    name = "poppler"
+    
+    @classmethod
+    def is_available(cls) -> bool:
+        return HAS_PDF2IMAGE
+    
+    def page_count(self, pdf_path: Path) -> int:
+        info = pdfinfo_from_path(pdf_path)
+        return int(info.get('Pages', 0))
+    
+    def render(self, pdf_path: Path, first_page: int, last_page: int,
+               dpi: int) -> List['Image.Image']:
+        return convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=first_page,
+            last_page=last_page,
+            fmt='png',
+            use_pdftocairo=True  # Better rendering if available
+        )
+
+
+class PdfiumRenderer(PageRenderer):
+    """Render pages in-process with pypdfium2."""
+    
+    name = "pdfium"
+    
+    @classmethod
+    def is_available(cls) -> bool:
+        return HAS_PDFIUM
+    
+    def page_count(self, pdf_path: Path) -> int:
+        doc = pdfium.PdfDocument(str(pdf_path))
+        try:
+            return len(doc)
+        finally:
+            doc.close()
+    
+    def render(self, pdf_path: Path, first_page: int, last_page: int,
+               dpi: int) -> List['Image.Image']:
+        images = []
+        doc = pdfium.PdfDocument(str(pdf_path))
+        try:
+            for index in range(first_page - 1, min(last_page, len(doc))):
+                page = doc[index]
+                try:
+                    bitmap = page.render(scale=dpi / 72)
+                    # Copy so the image doesn't share memory with the bitmap
+                    images.append(bitmap.to_pil().convert('RGB'))
+                finally:
+                    page.close()
+        finally:
+            doc.close()
+        return images
+
+
+RENDERERS: Dict[str, Type[PageRenderer]] = {
+    PopplerRenderer.name: PopplerRenderer,
+    PdfiumRenderer.name: PdfiumRenderer,
+}
+
+
+def get_renderer(name: str = "poppler") -> PageRenderer:
+    """
+    Get a renderer by name.
+    
+    "auto" picks pdfium if it is installed and falls back to poppler.
+    """
+    if name == "auto":
+        name = "pdfium" if PdfiumRenderer.is_available() else "poppler"
+    
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown renderer: {name} (expected one of {sorted(RENDERERS)} or 'auto')")
+    
+    return RENDERERS[name]()
+
+
+def get_available_renderers() -> List[PageRenderer]:
+    """Get an instance of every renderer whose dependencies are installed."""
+    return [cls() for cls in RENDERERS.values() if cls.is_available()]
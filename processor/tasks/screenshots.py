@@ -4,18 +4,26 @@ Screenshot generation task for PDF Gallery.
 
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
+import hashlib
+import json
 import logging
+import shutil
 
 from domain import PDFExample
 from tasks import Task, TaskContext
+from tasks.renderers import get_renderer
+from utils.imaging import generate_dzi, make_placeholder
 
-# Try to import pdf2image
+# Try to import pypdf (used to hash individual pages)
 try:
-    from pdf2image import convert_from_path
-    HAS_PDF2IMAGE = True
+    import pypdf
+    from pypdf.generic import (
+        ArrayObject, DictionaryObject, IndirectObject, StreamObject
+    )
+    HAS_PYPDF = True
 except ImportError:
-    HAS_PDF2IMAGE = False
-    convert_from_path = None
+    HAS_PYPDF = False
+    pypdf = None
 
 # Try to import PIL
 try:
@@ -37,27 +45,57 @@ class ScreenshotTask(Task):
     - Converting PDF pages to PNG images
     - Generating thumbnails
     - Handling multi-page PDFs
+    - Reusing images of pages whose content hasn't changed
+    - Tiny inline placeholders (LQIP) for every page
+    - Optionally, deep-zoom (DZI) tile pyramids for oversized pages
+    
+    Modes:
+    - "all": render the first max_pages pages at full DPI
+    - "referenced": render page 1 and the pages the example code
+      references (see MetadataTask) at full DPI, and the remaining
+      pages as low-DPI thumbnails only
     """
     
+    MODES = ("all", "referenced")
+    
     def __init__(self, 
                  max_pages: int = 10,
                  dpi: int = 150,
-                 thumbnail_size: Tuple[int, int] = (400, 400)):
-        super().__init__(name="screenshots", dependencies=[])
+                 thumbnail_size: Tuple[int, int] = (400, 400),
+                 mode: str = "all",
+                 thumbnail_dpi: int = 72,
+                 renderer: str = "poppler",
+                 tiles: bool = False,
+                 tile_threshold: int = 4096,
+                 tile_size: int = 256):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown screenshot mode: {mode} (expected one of {self.MODES})")
+        
+        # Referenced mode needs the page references extracted from the code
+        dependencies = ["metadata"] if mode == "referenced" else []
+        super().__init__(name="screenshots", dependencies=dependencies)
         self.max_pages = max_pages
         self.dpi = dpi
         self.thumbnail_size = thumbnail_size
+        self.mode = mode
+        self.thumbnail_dpi = thumbnail_dpi
+        self.renderer = get_renderer(renderer)
+        self.tiles = tiles
+        self.tile_threshold = tile_threshold  # Longest side in pixels
+        self.tile_size = tile_size
         
-        if not HAS_PDF2IMAGE:
-            logger.warning("pdf2image not installed. PDF screenshots will not be available.")
+        if not self.renderer.is_available():
+            logger.warning(f"{self.renderer.name} renderer not available. PDF screenshots will not be available.")
         if not HAS_PIL:
             logger.warning("PIL/Pillow not installed. Image operations will be limited.")
+        if not HAS_PYPDF:
+            logger.warning("pypdf not installed. Changed PDFs will be fully re-rendered.")
     
     def process(self, pdf: PDFExample, context: TaskContext) -> Dict[str, Any]:
         """Generate screenshots for a PDF."""
-        if not HAS_PDF2IMAGE:
-            context.log(f"Skipping {pdf.id}: pdf2image not installed", "SKIP")
-            return {"status": "skipped", "reason": "pdf2image not installed"}
+        if not self.renderer.is_available():
+            context.log(f"Skipping {pdf.id}: {self.renderer.name} renderer not available", "SKIP")
+            return {"status": "skipped", "reason": f"{self.renderer.name} renderer not available"}
         
         # Get primary PDF file
         pdf_file = pdf.get_primary_pdf()
@@ -75,7 +113,10 @@ class ScreenshotTask(Task):
                 "status": "success",
                 "pdf_file": pdf_file.name,
                 "page_count": result['page_count'],
-                "screenshots_generated": len(result['screenshots'])
+                "screenshots_generated": len(result['screenshots']),
+                "full_pages": result['full_pages'],
+                "pages_rendered": result['pages_rendered'],
+                "pages_reused": result['pages_reused']
             }
             
         except Exception as e:
@@ -116,65 +157,358 @@ class ScreenshotTask(Task):
     
     def _generate_screenshots(self, pdf_path: Path, pdf: PDFExample, 
                             context: TaskContext) -> Dict[str, Any]:
-        """Generate screenshots from a PDF file."""
+        """
+        Generate screenshots from a PDF file.
+        
+        Pages are keyed on a hash of their content stream and resources,
+        so when a PDF is replaced by a revised version only the pages that
+        actually changed are rendered again.
+        """
         result = {
             'pdf_path': str(pdf_path),
             'page_count': 0,
-            'screenshots': []
+            'screenshots': [],
+            'full_pages': [],
+            'pages_rendered': 0,
+            'pages_reused': 0
         }
         
-        # Convert PDF to images
+        screenshots_dir = context.artifacts_dir / "screenshots" / pdf.id
+        screenshots_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = screenshots_dir / "manifest.json"
+        previous = self._load_previous_pages(manifest_path, context)
+        
         try:
-            # Get page count with low DPI first
-            all_pages = convert_from_path(pdf_path, dpi=72, fmt='jpeg')
-            result['page_count'] = len(all_pages)
-            
-            # Convert pages with high quality
-            images = convert_from_path(
-                pdf_path,
-                dpi=self.dpi,
-                first_page=1,
-                last_page=min(self.max_pages, len(all_pages)),
-                fmt='png',
-                use_pdftocairo=True  # Better rendering if available
-            )
-            
+            page_hashes = self._compute_page_hashes(pdf_path)
+            if page_hashes is not None:
+                result['page_count'] = len(page_hashes)
+            else:
+                result['page_count'] = self.renderer.page_count(pdf_path)
         except Exception as e:
-            raise RuntimeError(f"Failed to convert PDF: {e}")
+            raise RuntimeError(f"Failed to read PDF: {e}")
         
-        # Save screenshots
-        screenshots_dir = context.artifacts_dir / "screenshots" / pdf.id
-        screenshots_dir.mkdir(parents=True, exist_ok=True)
+        full_pages = self._get_full_pages(pdf, context, result['page_count'])
+        result['full_pages'] = sorted(full_pages)
+        page_nums = sorted(set(range(1, min(self.max_pages, result['page_count']) + 1)) | full_pages)
+        pages = {}
+        to_render = []
+        
+        for page_num in page_nums:
+            full = page_num in full_pages
+            dpi = self.dpi if full else self.thumbnail_dpi
+            page_hash = page_hashes[page_num - 1] if page_hashes else None
+            old = previous.get(page_num)
+            if (page_hash and old and old.get('hash') == page_hash
+                    and old.get('dpi') == dpi and old.get('full', True) == full):
+                reused = self._reuse_page(old, pdf_path, page_num, screenshots_dir, context)
+                if reused:
+                    if 'placeholder' not in reused and HAS_PIL:
+                        with Image.open(context.artifacts_dir / self._preview_path(reused)) as preview:
+                            reused['placeholder'] = make_placeholder(preview)
+                    self._update_tiles(reused, None, pdf_path, page_num, screenshots_dir, context)
+                    pages[page_num] = reused
+                    result['pages_reused'] += 1
+                    continue
+            to_render.append((page_num, dpi))
         
-        for i, image in enumerate(images):
-            page_num = i + 1
+        # Render changed pages in contiguous runs to keep the number of
+        # renderer calls (poppler subprocesses) down
+        for first, last, dpi in self._group_runs(to_render):
+            try:
+                images = self.renderer.render(pdf_path, first, last, dpi)
+            except Exception as e:
+                raise RuntimeError(f"Failed to convert PDF: {e}")
             
+            for offset, image in enumerate(images):
+                page_num = first + offset
+                full = page_num in full_pages
+                info = self._save_page(image, pdf_path, page_num, screenshots_dir, context, full)
+                info['dpi'] = dpi
+                info['full'] = full
+                info['hash'] = page_hashes[page_num - 1] if page_hashes else None
+                self._update_tiles(info, image, pdf_path, page_num, screenshots_dir, context)
+                pages[page_num] = info
+                result['pages_rendered'] += 1
+        
+        result['screenshots'] = [pages[n] for n in sorted(pages)]
+            
+        self._remove_stale_images(screenshots_dir, result['screenshots'], context)
+        context.write_artifact(manifest_path, {
+            'pdf_file': pdf_path.name,
+            'page_count': result['page_count'],
+            'mode': self.mode,
+            'renderer': self.renderer.name,
+            'dpi': self.dpi,
+            'thumbnail_size': list(self.thumbnail_size) if self.thumbnail_size else None,
+            'pages': result['screenshots']
+        })
+        
+        return result
+    
+    def _save_page(self, image, pdf_path: Path, page_num: int,
+                   screenshots_dir: Path, context: TaskContext,
+                   full: bool = True) -> Dict[str, Any]:
+        """Save a rendered page and its thumbnail (only the thumbnail if not full)."""
+        screenshot_info = {
+            'page': page_num,
+            'width': image.size[0],
+            'height': image.size[1]
+        }
+        
+        if HAS_PIL:
+            screenshot_info['placeholder'] = make_placeholder(image)
+        
+        if full:
             # Main screenshot path
             img_path = screenshots_dir / f"{pdf_path.stem}-{page_num}.png"
-            
+        
             # Save main screenshot
             image.save(str(img_path), 'PNG')
-            
-            screenshot_info = {
-                'page': page_num,
-                'file_path': str(img_path.relative_to(context.artifacts_dir)),
-                'width': image.size[0],
-                'height': image.size[1]
-            }
-            
-            # Generate thumbnail
-            if HAS_PIL and self.thumbnail_size:
-                thumb_path = screenshots_dir / f"{pdf_path.stem}-{page_num}-thumb.png"
-                thumb = image.copy()
+            screenshot_info['file_path'] = str(img_path.relative_to(context.artifacts_dir))
+        
+        # Generate thumbnail
+        if HAS_PIL and (self.thumbnail_size or not full):
+            thumb_path = screenshots_dir / f"{pdf_path.stem}-{page_num}-thumb.png"
+            thumb = image.copy()
+            if self.thumbnail_size:
                 thumb.thumbnail(self.thumbnail_size, self._get_resample_filter())
-                thumb.save(str(thumb_path), 'PNG')
-                screenshot_info['thumbnail_path'] = str(
-                    thumb_path.relative_to(context.artifacts_dir)
-                )
+            thumb.save(str(thumb_path), 'PNG')
+            screenshot_info['thumbnail_path'] = str(
+                thumb_path.relative_to(context.artifacts_dir)
+            )
             
-            result['screenshots'].append(screenshot_info)
+        return screenshot_info
         
-        return result
+    def _preview_path(self, info: Dict[str, Any]) -> str:
+        """Get the smallest image saved for a page."""
+        return info.get('thumbnail_path') or info['file_path']
+    
+    def _load_previous_pages(self, manifest_path: Path,
+                             context: TaskContext) -> Dict[int, Dict[str, Any]]:
+        """
+        Load page entries from the previous build's manifest.
+        
+        Entries are only usable if they were rendered with the same
+        settings as this task.
+        """
+        try:
+            manifest = context.read_artifact(manifest_path)
+        except (json.JSONDecodeError, IOError):
+            return {}
+        if not manifest:
+            return {}
+        
+        thumbnail_size = list(self.thumbnail_size) if self.thumbnail_size else None
+        if manifest.get('thumbnail_size') != thumbnail_size:
+            return {}
+        if manifest.get('renderer', 'poppler') != self.renderer.name:
+            return {}
+        
+        pages = {}
+        for entry in manifest.get('pages', []):
+            if 'page' in entry:
+                entry.setdefault('dpi', manifest.get('dpi'))
+                pages[entry['page']] = entry
+        return pages
+    
+    def _reuse_page(self, old: Dict[str, Any], pdf_path: Path, page_num: int,
+                    screenshots_dir: Path, context: TaskContext) -> Optional[Dict[str, Any]]:
+        """
+        Reuse a previously rendered page.
+        
+        Returns the updated page entry, or None if the old images are gone.
+        Images are renamed if the PDF file itself was renamed.
+        """
+        entry = dict(old)
+        targets = {
+            'file_path': screenshots_dir / f"{pdf_path.stem}-{page_num}.png",
+            'thumbnail_path': screenshots_dir / f"{pdf_path.stem}-{page_num}-thumb.png"
+        }
+        
+        required = 'file_path' if old.get('full', True) else 'thumbnail_path'
+        
+        for key, target in targets.items():
+            if key not in old:
+                if key == required:
+                    return None
+                continue
+            source = context.artifacts_dir / old[key]
+            if not source.exists():
+                return None
+            if source != target:
+                source.replace(target)
+            entry[key] = str(target.relative_to(context.artifacts_dir))
+        
+        return entry
+    
+    def _update_tiles(self, info: Dict[str, Any], image, pdf_path: Path, page_num: int,
+                      screenshots_dir: Path, context: TaskContext):
+        """
+        Add, keep or drop the deep-zoom pyramid for a page.
+        
+        Only full-DPI pages whose longest side is above tile_threshold are
+        tiled. If image is None (a reused page), the existing pyramid is
+        kept when it still matches, otherwise it's rebuilt from the PNG.
+        """
+        wants_tiles = (
+            self.tiles and HAS_PIL and info.get('full', True) and 'file_path' in info
+            and max(info['width'], info['height']) > self.tile_threshold
+        )
+        if not wants_tiles:
+            info.pop('tiles', None)
+            return
+        
+        name = f"{pdf_path.stem}-{page_num}"
+        old = info.get('tiles')
+        if image is None and old and old.get('tile_size') == self.tile_size:
+            if old.get('path') == str((screenshots_dir / f"{name}.dzi").relative_to(context.artifacts_dir)) \
+                    and (context.artifacts_dir / old['path']).exists():
+                return
+        
+        if image is None:
+            with Image.open(context.artifacts_dir / info['file_path']) as saved:
+                descriptor = generate_dzi(saved, screenshots_dir, name, tile_size=self.tile_size)
+        else:
+            descriptor = generate_dzi(image, screenshots_dir, name, tile_size=self.tile_size)
+        info['tiles'] = {
+            'type': descriptor['type'],
+            'path': str(descriptor['dzi_path'].relative_to(context.artifacts_dir)),
+            'tiles_path': str(descriptor['tiles_path'].relative_to(context.artifacts_dir)),
+            'tile_size': descriptor['tile_size'],
+            'overlap': descriptor['overlap'],
+            'format': descriptor['format'],
+            'levels': descriptor['levels']
+        }
+    
+    def _remove_stale_images(self, screenshots_dir: Path,
+                             screenshots: List[Dict[str, Any]],
+                             context: TaskContext):
+        """Remove images and tile pyramids that no longer belong to any page of the PDF."""
+        keep = set()
+        for info in screenshots:
+            for key in ('file_path', 'thumbnail_path'):
+                if key in info:
+                    keep.add((context.artifacts_dir / info[key]).name)
+            if 'tiles' in info:
+                keep.add((context.artifacts_dir / info['tiles']['path']).name)
+                keep.add((context.artifacts_dir / info['tiles']['tiles_path']).name)
+        
+        for path in screenshots_dir.iterdir():
+            if path.name in keep:
+                continue
+            if path.is_file() and path.suffix in ('.png', '.dzi'):
+                path.unlink()
+            elif path.is_dir() and path.name.endswith('_files'):
+                shutil.rmtree(path)
+    
+    def _group_runs(self, pages: List[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+        """Group sorted (page, dpi) pairs into (first, last, dpi) runs of consecutive pages."""
+        runs = []
+        for page_num, dpi in pages:
+            if runs and runs[-1][1] == page_num - 1 and runs[-1][2] == dpi:
+                runs[-1] = (runs[-1][0], page_num, dpi)
+            else:
+                runs.append((page_num, page_num, dpi))
+        return runs
+    
+    def _get_full_pages(self, pdf: PDFExample, context: TaskContext,
+                        page_count: int) -> set:
+        """
+        Get the 1-based page numbers to render at full DPI.
+        
+        In "referenced" mode this is page 1 plus the pages referenced by
+        the example code, capped at max_pages pages.
+        """
+        if self.mode == "all":
+            return set(range(1, min(self.max_pages, page_count) + 1))
+        
+        full_pages = {1} if page_count else set()
+        metadata_list = context.read_artifact(context.get_artifact_path(pdf, "metadata.json")) or []
+        all_pages = range(1, page_count + 1)
+        
+        referenced = set()
+        for metadata in metadata_list:
+            refs = metadata.get("page_references") or {}
+            for index in refs.get("indices", []):
+                try:
+                    referenced.add(all_pages[index])
+                except IndexError:
+                    continue
+            for start, stop in refs.get("slices", []):
+                referenced.update(all_pages[start:stop])
+        
+        for page_num in sorted(referenced):
+            if len(full_pages) >= self.max_pages:
+                break
+            full_pages.add(page_num)
+        
+        return full_pages
+    
+    def _compute_page_hashes(self, pdf_path: Path) -> Optional[List[str]]:
+        """
+        Hash each page's content stream and resources.
+        
+        Returns None if pypdf is unavailable or the PDF can't be parsed,
+        in which case every page is treated as changed.
+        """
+        if not HAS_PYPDF:
+            return None
+        
+        try:
+            reader = pypdf.PdfReader(str(pdf_path))
+            hashes = []
+            for page in reader.pages:
+                hasher = hashlib.md5()
+                contents = page.get_contents()
+                if contents is not None:
+                    hasher.update(contents.get_data())
+                hasher.update(b'\x00resources:')
+                self._hash_pdf_object(page.get('/Resources'), hasher, set())
+                for key in ('/MediaBox', '/CropBox', '/Rotate'):
+                    hasher.update(f"\x00{key}:{page.get(key)}".encode('utf-8'))
+                hashes.append(hasher.hexdigest())
+            return hashes
+        except Exception as e:
+            logger.warning(f"Could not hash pages of {pdf_path.name}: {e}")
+            return None
+    
+    def _hash_pdf_object(self, obj: Any, hasher, seen: set):
+        """Feed a PDF object into a hash, resolving references and streams."""
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key in seen:
+                # Already hashed (or a cycle) - the object itself is in the hash
+                hasher.update(b'<seen>')
+                return
+            seen.add(key)
+            obj = obj.get_object()
+        
+        if isinstance(obj, StreamObject):
+            try:
+                data = obj.get_data()
+            except Exception:
+                data = getattr(obj, '_data', b'') or b''
+            hasher.update(b'<stream>')
+            hasher.update(data)
+            # The stream dictionary (filters, sizes, nested resources)
+            for key in sorted(k for k in obj.keys() if k not in ('/Length', '/Filter')):
+                hasher.update(str(key).encode('utf-8'))
+                self._hash_pdf_object(obj.raw_get(key), hasher, seen)
+        elif isinstance(obj, DictionaryObject):
+            hasher.update(b'<<')
+            for key in sorted(obj.keys()):
+                if key == '/Parent':
+                    continue
+                hasher.update(str(key).encode('utf-8'))
+                self._hash_pdf_object(obj.raw_get(key), hasher, seen)
+            hasher.update(b'>>')
+        elif isinstance(obj, ArrayObject):
+            hasher.update(b'[')
+            for item in obj:
+                self._hash_pdf_object(item, hasher, seen)
+            hasher.update(b']')
+        else:
+            hasher.update(repr(obj).encode('utf-8', errors='replace'))
     
     def needs_processing(self, pdf: PDFExample, context: TaskContext) -> bool:
         """
@@ -197,5 +531,18 @@ class ScreenshotTask(Task):
         if not screenshots:
             return True
         
+        # The full-DPI pages depend on the mode and max_pages and, in
+        # referenced mode, on the pages the code references
+        if self.mode == "referenced" or (screenshots_dir / "manifest.json").exists():
+            manifest = context.read_artifact(screenshots_dir / "manifest.json")
+            if not manifest:
+                return True
+            rendered_full = {
+                entry['page'] for entry in manifest.get('pages', [])
+                if entry.get('full', True)
+            }
+            if rendered_full != self._get_full_pages(pdf, context, manifest.get('page_count', 0)):
+                return True
+        
         # If we have screenshots and PDFs haven't changed, we're good
         return False
\ No newline at end of file
@@ -2,14 +2,18 @@
 Search index generation task for PDF Gallery.
 """
 
+import hashlib
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Any, Set
-from collections import defaultdict
+from typing import Dict, List, Any, Optional, Set, Tuple
+from collections import Counter, defaultdict
 
 from domain import PDFExample
 from tasks import BatchTask, TaskContext
+from utils.text import STOP_WORDS, fnv1a_32, tokenize
+from utils.fuzzy import build_deletion_index
+from utils.trie import build_completion_trie
 
 
 class SearchIndexTask(BatchTask):
@@ -18,16 +22,48 @@ class SearchIndexTask(BatchTask):
     
     This is a batch task that processes all PDFs at once to create:
     - Full-text search index
+    - Inverted index with precomputed BM25F weights, split into
+      content-hashed shards the frontend fetches per query term
     - Method reverse index
     - Search suggestions
+    - A size report with bytes per document field and search file
     """
     
-    def __init__(self):
+    # Field weights for BM25F - a title hit counts three times a body hit
+    FIELD_BOOSTS = {
+        "title": 3.0,
+        "methods": 2.5,
+        "tags": 2.0,
+        "description": 1.5,
+        "content": 1.0,
+        "code": 0.8,
+    }
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    # Scores are stored as integers: round(score * SCORE_SCALE)
+    SCORE_SCALE = 100
+    INVERTED_INDEX_VERSION = 3
+    # Terms are sharded by a hash of this many leading characters
+    SHARD_PREFIX_LENGTH = 2
+    # Completions stored at each autocomplete trie node
+    AUTOCOMPLETE_TOP_K = 5
+    # Typo tolerance (SymSpell): edit distance, expanded prefix, shortest word
+    TYPO_MAX_DISTANCE = 2
+    TYPO_PREFIX_LENGTH = 7
+    TYPO_MIN_LENGTH = 4
+    # Files written to search/: the manifest and content-hashed tables
+    SEARCH_FILE_RE = re.compile(
+        r'manifest\.json|(?:shard-\d+|docs|autocomplete|typos(?:-\d+)?)\.[0-9a-f]{10}\.json'
+    )
+    # Fields whose text lives in a document's shared "text" buffer
+    SPAN_FIELDS = ("content", "code")
+    
+    def __init__(self, shard_count: int = 16, size_budget: Optional[int] = None):
         super().__init__(name="search_index", dependencies=["metadata", "execution"])
-        self.stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-            'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were'
-        }
+        self.stop_words = set(STOP_WORDS)
+        self.shard_count = shard_count
+        # Bytes the shipped search files (search/) may take
+        self.size_budget = size_budget
     
     def process_batch(self, pdfs: List[PDFExample], context: TaskContext) -> Dict[str, Any]:
         """Build search index from all PDFs."""
@@ -73,28 +109,55 @@ class SearchIndexTask(BatchTask):
             "stats": {
                 "totalDocuments": len(documents),
                 "totalMethods": len(method_index),
-                "indexVersion": "2.0"
+                "indexVersion": "3.0"
             }
         }
         
-        # Save full index
+        # Save full index without pretty printing - indenting every span
+        # offset would cost more than the spans themselves
         full_path = context.artifacts_dir / "search_index.json"
-        context.write_artifact(full_path, full_index)
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(full_path, 'w') as f:
+            json.dump(full_index, f, separators=(',', ':'))
         
-        # Create compact version
-        compact_index = self._create_compact_index(full_index)
+        # The frontend queries the sharded index below; drop the compact
+        # full-document index older builds shipped
         compact_path = context.artifacts_dir / "search_index.compact.json"
+        if compact_path.exists():
+            compact_path.unlink()
         
-        # Save compact version without pretty printing
-        compact_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(compact_path, 'w') as f:
-            json.dump(compact_index, f, separators=(',', ':'))
+        # Create inverted index, split into lazily fetched shards
+        slots = self._assign_doc_ids(documents, context)
+        field_texts = [self._get_field_texts(doc) for doc in documents]
+        inverted_index = self._build_inverted_index(documents, field_texts, slots)
+        autocomplete = self._build_autocomplete(inverted_index, all_metadata)
+        typos = self._build_typo_index(inverted_index)
+        shard_stats = self._write_sharded_index(inverted_index, autocomplete, typos, context)
+        
+        # Report where the bytes go, and warn once the budget is exceeded
+        size_report = self._build_size_report(full_index, context)
+        report_path = context.artifacts_dir / "search_size_report.json"
+        context.write_artifact(report_path, size_report)
+        if size_report["overBudget"]:
+            context.log(
+                f"search_index: shipped search files take {size_report['shippedBytes']} bytes, "
+                f"over the {size_report['budget']} byte budget - see {report_path.name}",
+                "WARNING"
+            )
         
         return {
             "documents_indexed": len(documents),
             "methods_indexed": len(method_index),
+            "terms_indexed": len(inverted_index["postings"]),
             "index_size": full_path.stat().st_size if full_path.exists() else 0,
-            "compact_size": compact_path.stat().st_size if compact_path.exists() else 0
+            "inverted_size": shard_stats["size"],
+            "shards": shard_stats["shards"],
+            "shards_written": shard_stats["shards_written"],
+            "typo_shards": shard_stats["typo_shards"],
+            "autocomplete_entries": len(autocomplete["entries"]),
+            "typo_deletes": sum(len(shard) for shard in typos["shards"]),
+            "shipped_size": size_report["shippedBytes"],
+            "over_budget": size_report["overBudget"]
         }
     
     def get_inputs(self, pdf: PDFExample) -> List[Path]:
@@ -115,24 +178,36 @@ class SearchIndexTask(BatchTask):
         """Output files for the batch task."""
         return [
             context.artifacts_dir / "search_index.json",
-            context.artifacts_dir / "search_index.compact.json"
+            context.artifacts_dir / "search" / "manifest.json"
         ]
     
+    def needs_batch_processing(self, pdfs: List[PDFExample], context: TaskContext) -> bool:
+        """Also rebuild an index written by another version, or with the retired compact index."""
+        if super().needs_batch_processing(pdfs, context):
+            return True
+        if (context.artifacts_dir / "search_index.compact.json").exists():
+            return True
+        return self._load_search_manifest(context) is None
+    
     def _build_document(self, metadata: Dict[str, Any], 
                        execution: Dict[str, Any],
                        context: TaskContext) -> Dict[str, Any]:
-        """Build a search document from metadata and execution."""
-        # Extract searchable content
-        content = self._extract_content(execution)
-        code = self._extract_code(execution)
+        """
+        Build a search document from metadata and execution.
+        
+        Cell text is stored once: "text" holds every markdown and code
+        cell in order, and "spans" tags each [field, start, end] slice of
+        it as "content" (markdown) or "code".
+        """
+        text, spans = self._extract_spans(execution)
         
         return {
             "id": metadata.get("id", ""),
             "slug": metadata.get("slug", ""),
             "title": metadata.get("title", ""),
             "description": metadata.get("description", ""),
-            "content": content,
-            "code": code,
+            "text": text,
+            "spans": spans,
             "methods": metadata.get("methods", []),
             "selectors": metadata.get("selectors", []),
             "tags": metadata.get("tags", []),
@@ -140,51 +215,331 @@ class SearchIndexTask(BatchTask):
             "pdf": metadata.get("pdf", "")
         }
     
-    def _extract_content(self, execution: Dict[str, Any]) -> str:
-        """Extract searchable text content."""
+    def _extract_spans(self, execution: Dict[str, Any]) -> Tuple[str, List[List[Any]]]:
+        """Concatenate markdown and code cells (tabs included) into one tagged text."""
         if not execution or "cells" not in execution:
-            return ""
+            return "", []
         
-        content_parts = []
+        parts = []
+        spans = []
+        offset = 0
         
         for cell in execution.get("cells", []):
-            if cell["type"] == "markdown":
-                # Clean markdown
-                text = cell["content"]
-                text = re.sub(r'#+ ', '', text)  # Remove headers
-                text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Remove bold
-                text = re.sub(r'\*(.*?)\*', r'\1', text)  # Remove italic
-                text = re.sub(r'`(.*?)`', r'\1', text)  # Remove inline code
-                content_parts.append(text)
-            elif cell["type"] == "code":
-                # Include code content
-                content_parts.append(cell["content"])
-            elif cell["type"] == "tab":
-                # Process tab cells
-                for tab_cell in cell.get("cells", []):
-                    if tab_cell["type"] == "markdown":
-                        content_parts.append(tab_cell["content"])
-                    elif tab_cell["type"] == "code":
-                        content_parts.append(tab_cell["content"])
-        
-        return "\n".join(content_parts)
-    
-    def _extract_code(self, execution: Dict[str, Any]) -> str:
-        """Extract only code content."""
-        if not execution or "cells" not in execution:
-            return ""
+            cells = cell.get("cells", []) if cell["type"] == "tab" else [cell]
+            for inner in cells:
+                if inner["type"] == "markdown":
+                    field = "content"
+                    text = self._clean_markdown(inner["content"])
+                elif inner["type"] == "code":
+                    field = "code"
+                    text = inner["content"]
+                else:
+                    continue
+                
+                if parts:
+                    offset += 1  # "\n" separator
+                parts.append(text)
+                spans.append([field, offset, offset + len(text)])
+                offset += len(text)
+        
+        return "\n".join(parts), spans
+    
+    def _clean_markdown(self, text: str) -> str:
+        """Strip markdown syntax from searchable text."""
+        text = re.sub(r'#+ ', '', text)  # Remove headers
+        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Remove bold
+        text = re.sub(r'\*(.*?)\*', r'\1', text)  # Remove italic
+        text = re.sub(r'`(.*?)`', r'\1', text)  # Remove inline code
+        return text
+        
+    def _span_text(self, doc: Dict[str, Any], field: str) -> str:
+        """Get the text of one span field of a document."""
+        text = doc["text"]
+        return "\n".join(text[start:end] for name, start, end in doc["spans"] if name == field)
+    
+    def _get_field_texts(self, doc: Dict[str, Any]) -> Dict[str, str]:
+        """Get the text of each indexed field, with markdown and code kept apart."""
+        texts = {field: self._span_text(doc, field) for field in self.SPAN_FIELDS}
+        texts.update({
+            "title": doc["title"],
+            "description": doc["description"],
+            "methods": " ".join(doc["methods"]),
+            "tags": " ".join(doc["tags"]),
+        })
+        return texts
         
-        code_parts = []
+    def _assign_doc_ids(self, documents: List[Dict[str, Any]],
+                        context: TaskContext) -> List[Optional[int]]:
+        """
+        Give each document a stable integer ID.
         
-        for cell in execution.get("cells", []):
-            if cell["type"] == "code":
-                code_parts.append(cell["content"])
-            elif cell["type"] == "tab":
-                for tab_cell in cell.get("cells", []):
-                    if tab_cell["type"] == "code":
-                        code_parts.append(tab_cell["content"])
+        Documents keep the ID they had in the previous build (matched by
+        slug), so adding or removing an example doesn't renumber every
+        posting. IDs of removed documents are reused by new ones.
+        
+        Returns:
+            List where position = doc ID and value = index into documents
+            (None for a free ID)
+        """
+        previous_slugs = []
+        manifest = self._load_search_manifest(context)
+        if manifest:
+            try:
+                docs = context.read_artifact(self._search_dir(context) / manifest["docs"])
+                previous_slugs = [doc["slug"] if doc else None for doc in docs or []]
+            except (KeyError, TypeError, ValueError, IOError):
+                previous_slugs = []
+        
+        by_slug = {doc["slug"]: index for index, doc in enumerate(documents)}
+        slots = [by_slug.pop(slug, None) if slug else None for slug in previous_slugs]
+        
+        free = [doc_id for doc_id, index in enumerate(slots) if index is None]
+        for index in sorted(by_slug.values()):
+            if free:
+                slots[free.pop(0)] = index
+            else:
+                slots.append(index)
+        
+        # Trailing free IDs can be dropped
+        while slots and slots[-1] is None:
+            slots.pop()
         
-        return "\n".join(code_parts)
+        return slots
+    
+    def _build_inverted_index(self, documents: List[Dict[str, Any]],
+                              field_texts: List[Dict[str, str]],
+                              slots: List[Optional[int]]) -> Dict[str, Any]:
+        """
+        Build an inverted index of term -> postings with BM25F weights.
+        
+        Each posting list is a flat array [doc_delta, weight, ...] where
+        doc_delta is the gap from the previous doc ID and weight is the
+        term's saturated, field-boosted BM25F term frequency times
+        SCORE_SCALE. The IDF factor only depends on the document count
+        and the posting list length, so it is applied at query time -
+        that way adding a document doesn't rewrite every posting.
+        """
+        fields = list(self.FIELD_BOOSTS)
+        doc_fields = {}  # doc ID -> field -> Counter of terms
+        total_lengths = dict.fromkeys(fields, 0)
+        
+        for doc_id, index in enumerate(slots):
+            if index is None:
+                continue
+            texts = field_texts[index]
+            counts = {field: Counter(tokenize(texts.get(field, ""))) for field in fields}
+            doc_fields[doc_id] = counts
+            for field in fields:
+                total_lengths[field] += sum(counts[field].values())
+        
+        doc_count = len(doc_fields)
+        avg_lengths = {
+            field: (total_lengths[field] / doc_count) if doc_count else 0
+            for field in fields
+        }
+        
+        # Boosted, length-normalised term frequency per document (BM25F)
+        term_weights: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for doc_id, counts in doc_fields.items():
+            for field, counter in counts.items():
+                if not counter:
+                    continue
+                length = sum(counter.values())
+                norm = 1 - self.BM25_B + self.BM25_B * length / avg_lengths[field]
+                boost = self.FIELD_BOOSTS[field]
+                for term, tf in counter.items():
+                    weights = term_weights[term]
+                    weights[doc_id] = weights.get(doc_id, 0.0) + boost * tf / norm
+        
+        k1 = self.BM25_K1
+        postings = {}
+        for term in sorted(term_weights):
+            weights = term_weights[term]
+            encoded = []
+            previous = 0
+            for doc_id in sorted(weights):
+                tf = weights[doc_id]
+                encoded.append(doc_id - previous)
+                encoded.append(max(1, round(tf * (k1 + 1) / (tf + k1) * self.SCORE_SCALE)))
+                previous = doc_id
+            postings[term] = encoded
+        
+        docs = []
+        for index in slots:
+            if index is None:
+                docs.append(None)
+                continue
+            doc = documents[index]
+            docs.append({
+                "id": doc["id"],
+                "slug": doc["slug"],
+                "title": doc["title"],
+                "description": doc["description"],
+                "methods": doc["methods"],
+            })
+        
+        return {
+            "docs": docs,
+            "docCount": doc_count,
+            "postings": postings
+        }
+    
+    def _shard_for(self, term: str) -> int:
+        """
+        Get the shard a term lives in.
+        
+        Shards are picked by hashing the term's first SHARD_PREFIX_LENGTH
+        characters, so all completions of a typed prefix are in one shard.
+        """
+        return fnv1a_32(term[:self.SHARD_PREFIX_LENGTH]) % self.shard_count
+    
+    def _write_sharded_index(self, index: Dict[str, Any],
+                             autocomplete: Dict[str, Any],
+                             typos: Dict[str, Any],
+                             context: TaskContext) -> Dict[str, Any]:
+        """
+        Write the inverted index as content-hashed shards plus a root manifest.
+        
+        search/manifest.json is the only file with a fixed name. Shard
+        and docs files are named after a hash of their content, so files
+        that didn't change keep their name (and any browser cache entry)
+        across deploys. Files no longer referenced are removed.
+        
+        The typo dictionary is written the same way: its word list, and
+        its deletions split into shards by utils.fuzzy.delete_shard().
+        """
+        search_dir = self._search_dir(context)
+        search_dir.mkdir(parents=True, exist_ok=True)
+        written = 0
+        
+        def write_hashed(prefix: str, data: Any) -> str:
+            nonlocal written
+            payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False, sort_keys=True)
+            digest = hashlib.md5(payload.encode('utf-8')).hexdigest()[:10]
+            filename = f"{prefix}.{digest}.json"
+            path = search_dir / filename
+            if not path.exists():
+                path.write_text(payload, encoding='utf-8')
+                written += 1
+            return filename
+        
+        shard_postings = [dict() for _ in range(self.shard_count)]
+        for term, postings in index["postings"].items():
+            shard_postings[self._shard_for(term)][term] = postings
+        
+        shards = [
+            write_hashed(f"shard-{number:02d}", {"postings": postings}) if postings else None
+            for number, postings in enumerate(shard_postings)
+        ]
+        docs_file = write_hashed("docs", index["docs"])
+        autocomplete_file = write_hashed("autocomplete", autocomplete)
+        typo_words_file = write_hashed("typos", {"words": typos["words"]})
+        typo_shards = [
+            write_hashed(f"typos-{number:02d}", {"deletes": table}) if table else None
+            for number, table in enumerate(typos["shards"])
+        ]
+        
+        manifest = {
+            "version": self.INVERTED_INDEX_VERSION,
+            "scoreScale": self.SCORE_SCALE,
+            "docCount": index["docCount"],
+            "prefixLength": self.SHARD_PREFIX_LENGTH,
+            "shardCount": self.shard_count,
+            "docs": docs_file,
+            "autocomplete": autocomplete_file,
+            "typos": {
+                "maxDistance": typos["maxDistance"],
+                "prefixLength": typos["prefixLength"],
+                "shardCount": typos["shardCount"],
+                "words": typo_words_file,
+                "shards": typo_shards
+            },
+            "shards": shards
+        }
+        with open(self._manifest_path(context), 'w') as f:
+            json.dump(manifest, f, separators=(',', ':'))
+        
+        keep = {docs_file, autocomplete_file, typo_words_file, "manifest.json"}
+        keep |= {name for name in shards + typo_shards if name}
+        for path in search_dir.glob("*.json"):
+            if path.name not in keep:
+                path.unlink()
+        
+        return {
+            "shards": sum(1 for name in shards if name),
+            "typo_shards": sum(1 for name in typo_shards if name),
+            "shards_written": written,
+            "size": sum(p.stat().st_size for p in search_dir.glob("*.json"))
+        }
+    
+    def _build_autocomplete(self, index: Dict[str, Any],
+                            metadata_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build the prefix completion trie over terms, methods and selectors.
+        
+        Terms are weighted by document frequency, methods and selectors
+        by the number of examples using them. A method that is also an
+        indexed term (e.g. extract_table) is suggested once, under the
+        larger weight.
+        """
+        completions: Dict[str, List[Any]] = {}
+        
+        def add(key: str, text: str, weight: int):
+            if key in completions:
+                completions[key][1] = max(completions[key][1], weight)
+            else:
+                completions[key] = [text, weight]
+        
+        usage = Counter()
+        for item in metadata_list:
+            usage.update(set(item.get("methods", [])))
+            usage.update(set(item.get("selectors", [])))
+        for text, count in usage.items():
+            add(text.lower(), text, count)
+        
+        for term, postings in index["postings"].items():
+            add(term, term, len(postings) // 2)
+        
+        return build_completion_trie(
+            [(key, text, weight) for key, (text, weight) in completions.items()],
+            top_k=self.AUTOCOMPLETE_TOP_K
+        )
+    
+    def _build_typo_index(self, index: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the SymSpell deletion dictionary for typo-tolerant search.
+        
+        Covers indexed terms of at least TYPO_MIN_LENGTH characters (which
+        includes whole method names like extract_table), ordered by
+        document frequency so more common words win ties. Deletions are
+        split into as many shards as the inverted index.
+        """
+        vocabulary = sorted(
+            (term for term in index["postings"] if len(term) >= self.TYPO_MIN_LENGTH),
+            key=lambda term: (-len(index["postings"][term]), term)
+        )
+        return build_deletion_index(
+            vocabulary,
+            max_distance=self.TYPO_MAX_DISTANCE,
+            prefix_length=self.TYPO_PREFIX_LENGTH,
+            shard_count=self.shard_count
+        )
+    
+    def _search_dir(self, context: TaskContext) -> Path:
+        return context.artifacts_dir / "search"
+    
+    def _manifest_path(self, context: TaskContext) -> Path:
+        return self._search_dir(context) / "manifest.json"
+    
+    def _load_search_manifest(self, context: TaskContext) -> Optional[Dict[str, Any]]:
+        """Load the previous sharded index manifest, if any."""
+        try:
+            manifest = context.read_artifact(self._manifest_path(context))
+        except (ValueError, IOError):
+            return None
+        if not manifest or manifest.get("version") != self.INVERTED_INDEX_VERSION:
+            return None
+        return manifest
     
     def _build_method_index(self, metadata_list: List[Dict[str, Any]]) -> Dict[str, List[str]]:
         """Build reverse index of methods to document IDs."""
@@ -204,7 +559,7 @@ class SearchIndexTask(BatchTask):
     def _build_suggestions(self, metadata_list: List[Dict[str, Any]]) -> Dict[str, List[str]]:
         """Build search suggestions."""
         methods = set()
-        terms = set()
+        terms = Counter()
         
         for item in metadata_list:
             # Collect methods
@@ -212,35 +567,51 @@ class SearchIndexTask(BatchTask):
             
             # Extract terms from titles and descriptions
             text = f"{item.get('title', '')} {item.get('description', '')}"
-            words = re.findall(r'\b\w+\b', text.lower())
             
-            # Filter stop words and short words
-            for word in words:
-                if len(word) > 3 and word not in self.stop_words:
-                    terms.add(word)
+            # Filter short words (tokenize already drops stop words)
+            terms.update(word for word in tokenize(text) if len(word) > 3)
+        
+        # Top 50 terms by frequency, ties alphabetically
+        top_terms = sorted(terms.items(), key=lambda item: (-item[1], item[0]))[:50]
         
         return {
             "methods": sorted(list(methods)),
-            "terms": sorted(list(terms))[:50]  # Top 50 terms
+            "terms": [term for term, _count in top_terms]
         }
     
-    def _create_compact_index(self, full_index: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a compact version of the index."""
-        compact_docs = []
-        
-        for doc in full_index["documents"]:
-            # Truncate long fields
-            compact_doc = doc.copy()
-            if len(compact_doc["content"]) > 500:
-                compact_doc["content"] = compact_doc["content"][:500] + "..."
-            if len(compact_doc["code"]) > 300:
-                compact_doc["code"] = compact_doc["code"][:300] + "..."
-            
-            compact_docs.append(compact_doc)
+    def _build_size_report(self, full_index: Dict[str, Any],
+                           context: TaskContext) -> Dict[str, Any]:
+        """
+        Break the search artifacts down by bytes per field and per file.
+        
+        Document fields are measured as their compact JSON encoding, so
+        "text" vs "spans" vs "methods" shows what grows with the gallery.
+        The budget covers what the frontend can download: everything
+        under search/.
+        """
+        def field_bytes(documents: List[Dict[str, Any]]) -> Dict[str, int]:
+            sizes: Dict[str, int] = Counter()
+            for doc in documents:
+                for field, value in doc.items():
+                    sizes[field] += len(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+            return dict(sorted(sizes.items(), key=lambda item: -item[1]))
+        
+        search_files: Dict[str, int] = Counter()
+        for path in sorted(self._search_dir(context).glob("*.json")):
+            kind = path.name.split(".", 1)[0]
+            if kind.startswith("shard-"):
+                kind = "shards"
+            elif kind.startswith("typos-"):
+                kind = "typos"
+            search_files[kind] += path.stat().st_size
+        
+        shipped = sum(search_files.values())
         
         return {
-            "documents": compact_docs,
-            "methodIndex": full_index["methodIndex"],
-            "suggestions": full_index["suggestions"],
-            "stats": full_index["stats"]
-        }
\ No newline at end of file
+            "documents": len(full_index["documents"]),
+            "fieldBytes": field_bytes(full_index["documents"]),
+            "searchFiles": dict(search_files),
+            "shippedBytes": shipped,
+            "budget": self.size_budget,
+            "overBudget": bool(self.size_budget) and shipped > self.size_budget
+        }
@@ -0,0 +1,292 @@
+"""
+Thumbnail sprite sheet task for PDF Gallery.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from domain import PDFExample
+from tasks import BatchTask, TaskContext
+
+# Try to import PIL
+try:
+    from PIL import Image, ImageOps
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+    Image = None
+
+
+class ThumbnailSpriteTask(BatchTask):
+    """
+    Task to pack first-page thumbnails into sprite sheets.
+    
+    The gallery index shows one thumbnail per PDF. Instead of one request
+    per thumbnail, the thumbnails are cropped to a fixed cell size and
+    packed into WebP sheets of columns x rows cells, described by
+    sprites/atlas.json.
+    
+    Sheet assignment is stable: a PDF keeps its slot across builds, new
+    PDFs fill freed slots first, and only sheets whose members changed
+    are re-encoded. Sheet filenames include a content hash so they can
+    be cached forever.
+    """
+    
+    ATLAS_VERSION = 1
+    
+    def __init__(self,
+                 cell_size: Tuple[int, int] = (340, 440),
+                 columns: int = 4,
+                 rows: int = 4,
+                 quality: int = 80):
+        super().__init__(name="sprites", dependencies=["screenshots"])
+        self.cell_size = tuple(cell_size)
+        self.columns = columns
+        self.rows = rows
+        self.quality = quality
+    
+    @property
+    def sheet_capacity(self) -> int:
+        return self.columns * self.rows
+    
+    def process_batch(self, pdfs: List[PDFExample], context: TaskContext) -> Dict[str, Any]:
+        """Build or update the sprite sheets and atlas."""
+        if not HAS_PIL:
+            context.log("PIL not installed, skipping sprite sheets", "ERROR")
+            return {"error": "PIL not installed"}
+        
+        sprites_dir = self._sprites_dir(context)
+        sprites_dir.mkdir(parents=True, exist_ok=True)
+        
+        thumbnails = self._collect_thumbnails(pdfs, context)
+        previous = self._load_previous_atlas(context)
+        sheets = self._assign_sheets(thumbnails, previous)
+        
+        sheets_built = 0
+        atlas_sheets = []
+        sprites = {}
+        
+        for index, members in enumerate(sheets):
+            sheet_hash = self._sheet_hash(members, thumbnails)
+            old = previous['sheets'][index] if previous and index < len(previous['sheets']) else None
+            
+            if old and old.get('hash') == sheet_hash and (sprites_dir / old['file']).exists():
+                filename = old['file']
+            else:
+                filename = f"sheet-{index}.{sheet_hash[:10]}.webp"
+                self._build_sheet(members, thumbnails, context, sprites_dir / filename)
+                sheets_built += 1
+                context.log(f"Built sprite sheet {filename}")
+            
+            atlas_sheets.append({
+                'file': filename,
+                'hash': sheet_hash,
+                'members': members
+            })
+            
+            for slot, pdf_id in enumerate(members):
+                if pdf_id is None:
+                    continue
+                col, row = slot % self.columns, slot // self.columns
+                sprites[pdf_id] = {
+                    'sheet': index,
+                    'slot': slot,
+                    'col': col,
+                    'row': row,
+                    'x': col * self.cell_size[0],
+                    'y': row * self.cell_size[1],
+                    'thumbnail_hash': thumbnails[pdf_id]['hash']
+                }
+        
+        atlas = {
+            'version': self.ATLAS_VERSION,
+            'cell': list(self.cell_size),
+            'columns': self.columns,
+            'rows': self.rows,
+            'quality': self.quality,
+            'sheet_size': [self.cell_size[0] * self.columns, self.cell_size[1] * self.rows],
+            'sheets': atlas_sheets,
+            'sprites': sprites
+        }
+        context.write_artifact(self._atlas_path(context), atlas)
+        
+        removed = self._remove_stale_sheets(sprites_dir, {s['file'] for s in atlas_sheets})
+        
+        return {
+            "thumbnails": len(thumbnails),
+            "sheets": len(atlas_sheets),
+            "sheets_built": sheets_built,
+            "sheets_removed": removed
+        }
+    
+    def get_inputs(self, pdf: PDFExample) -> List[Path]:
+        """Inputs are the PDF files the thumbnails are rendered from."""
+        return pdf.pdf_files
+    
+    def get_outputs(self, pdf: PDFExample, context: TaskContext) -> List[Path]:
+        """Output files - not used for batch tasks."""
+        return []
+    
+    def get_batch_outputs(self, context: TaskContext) -> List[Path]:
+        """Output files for the batch task."""
+        return [self._atlas_path(context)]
+    
+    def needs_batch_processing(self, pdfs: List[PDFExample], context: TaskContext) -> bool:
+        """Rebuild when the set of thumbnails or any thumbnail's content changed."""
+        previous = self._load_previous_atlas(context)
+        if previous is None:
+            return True
+        
+        sprites_dir = self._sprites_dir(context)
+        if any(not (sprites_dir / sheet['file']).exists() for sheet in previous['sheets']):
+            return True
+        
+        current = {
+            pdf_id: info['hash']
+            for pdf_id, info in self._collect_thumbnails(pdfs, context).items()
+        }
+        recorded = {
+            pdf_id: info.get('thumbnail_hash')
+            for pdf_id, info in previous['sprites'].items()
+        }
+        return current != recorded
+    
+    def _sprites_dir(self, context: TaskContext) -> Path:
+        return context.artifacts_dir / "sprites"
+    
+    def _atlas_path(self, context: TaskContext) -> Path:
+        return self._sprites_dir(context) / "atlas.json"
+    
+    def _collect_thumbnails(self, pdfs: List[PDFExample],
+                            context: TaskContext) -> Dict[str, Dict[str, Any]]:
+        """Find each published PDF's first-page thumbnail and hash it."""
+        thumbnails = {}
+        
+        for pdf in pdfs:
+            if not pdf.is_published():
+                continue
+            
+            manifest_path = context.artifacts_dir / "screenshots" / pdf.id / "manifest.json"
+            try:
+                manifest = context.read_artifact(manifest_path)
+            except (ValueError, IOError):
+                continue
+            
+            first_page = next(
+                (p for p in (manifest or {}).get('pages', []) if p.get('page') == 1),
+                None
+            )
+            if not first_page:
+                continue
+            
+            rel_path = first_page.get('thumbnail_path') or first_page.get('file_path')
+            if not rel_path or not (context.artifacts_dir / rel_path).exists():
+                continue
+            
+            path = context.artifacts_dir / rel_path
+            thumbnails[pdf.id] = {
+                'path': path,
+                'hash': hashlib.md5(path.read_bytes()).hexdigest()
+            }
+        
+        return thumbnails
+    
+    def _load_previous_atlas(self, context: TaskContext) -> Optional[Dict[str, Any]]:
+        """Load the previous atlas if it was built with the same layout."""
+        try:
+            atlas = context.read_artifact(self._atlas_path(context))
+        except (ValueError, IOError):
+            return None
+        
+        if not atlas or atlas.get('version') != self.ATLAS_VERSION:
+            return None
+        if (tuple(atlas.get('cell', ())) != self.cell_size
+                or atlas.get('columns') != self.columns
+                or atlas.get('rows') != self.rows
+                or atlas.get('quality') != self.quality):
+            return None
+        
+        return atlas
+    
+    def _assign_sheets(self, thumbnails: Dict[str, Dict[str, Any]],
+                       previous: Optional[Dict[str, Any]]) -> List[List[Optional[str]]]:
+        """
+        Assign every thumbnail to a sheet slot.
+        
+        PDFs keep the slot they had in the previous atlas. Slots of PDFs
+        that are gone are freed, and new PDFs (in id order) take the
+        first free slots before any new sheet is started.
+        """
+        sheets: List[List[Optional[str]]] = []
+        if previous:
+            for sheet in previous['sheets']:
+                members = list(sheet.get('members', []))
+                members += [None] * (self.sheet_capacity - len(members))
+                sheets.append([m if m in thumbnails else None for m in members])
+        
+        placed = {m for members in sheets for m in members if m}
+        free_slots = [
+            (index, slot)
+            for index, members in enumerate(sheets)
+            for slot, member in enumerate(members)
+            if member is None
+        ]
+        
+        for pdf_id in sorted(thumbnails):
+            if pdf_id in placed:
+                continue
+            if not free_slots:
+                sheets.append([None] * self.sheet_capacity)
+                free_slots = [(len(sheets) - 1, slot) for slot in range(self.sheet_capacity)]
+            index, slot = free_slots.pop(0)
+            sheets[index][slot] = pdf_id
+        
+        # Drop empty sheets at the end so the sheet count can shrink
+        while sheets and not any(sheets[-1]):
+            sheets.pop()
+        
+        return sheets
+    
+    def _sheet_hash(self, members: List[Optional[str]],
+                    thumbnails: Dict[str, Dict[str, Any]]) -> str:
+        """Hash a sheet's layout and the content of its thumbnails."""
+        md5 = hashlib.md5()
+        for pdf_id in members:
+            md5.update(f"{pdf_id}:{thumbnails[pdf_id]['hash'] if pdf_id else ''}\n".encode())
+        return md5.hexdigest()
+    
+    def _build_sheet(self, members: List[Optional[str]],
+                     thumbnails: Dict[str, Dict[str, Any]],
+                     context: TaskContext, output_path: Path):
+        """Paste the members' thumbnails into a new sheet and save it as WebP."""
+        width, height = self.cell_size
+        sheet = Image.new('RGB', (width * self.columns, height * self.rows), 'white')
+        
+        for slot, pdf_id in enumerate(members):
+            if pdf_id is None:
+                continue
+            with Image.open(thumbnails[pdf_id]['path']) as thumb:
+                # Crop to the cell like object-fit: cover, keeping the top of the page
+                cell = ImageOps.fit(
+                    thumb.convert('RGB'), self.cell_size,
+                    method=self._get_resample_filter(), centering=(0.5, 0.0)
+                )
+            sheet.paste(cell, ((slot % self.columns) * width, (slot // self.columns) * height))
+        
+        sheet.save(str(output_path), 'WEBP', quality=self.quality, method=6)
+    
+    def _remove_stale_sheets(self, sprites_dir: Path, keep: set) -> int:
+        """Remove sheets that are no longer referenced by the atlas."""
+        removed = 0
+        for path in sprites_dir.glob("sheet-*.webp"):
+            if path.name not in keep:
+                path.unlink()
+                removed += 1
+        return removed
+    
+    def _get_resample_filter(self):
+        """Get the appropriate resampling filter for PIL version."""
+        if hasattr(Image, 'Resampling'):
+            return Image.Resampling.LANCZOS
+        return Image.LANCZOS
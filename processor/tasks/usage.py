@@ -0,0 +1,236 @@
+"""
+Usage index task for PDF Gallery.
+"""
+
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from domain import PDFExample
+from tasks import BatchTask, TaskContext
+
+
+class UsageIndexTask(BatchTask):
+    """
+    Task to index where every natural-pdf method is called.
+    
+    usage_index.json maps each method to its call sites (PDF, approach,
+    code cell index, line in the markdown file and normalized kwargs)
+    and to argument statistics (how often each kwarg, and each
+    positional argument, is passed and its most common values), so
+    "every example calling extract_table with method='tatr'" is one
+    lookup instead of a pass over every metadata file.
+    
+    Updates are incremental: usage_index.state.json keeps each PDF's
+    call sites with the mtime/size of the metadata.json they were read
+    from, and only PDFs whose metadata.json changed are read again.
+    
+    Layout (kept compact, the methods pages and the search method
+    matches load it whole):
+        {"version", "docs": [[pdf id, approach slug, title], ...],
+         "methods": {method: {"calls", "examples",
+                              "sites": [[doc, cell, line, kwargs, args], ...],
+                              "kwargs": {name: {"count", "distinct", "values": [[value, count], ...]}},
+                              "args": {position: {...}}}}}
+    Values are strings as written; other literals are JSON encoded, and
+    non-literal arguments appear as placeholders like "<var:name>".
+    """
+    
+    USAGE_INDEX_VERSION = 2
+    # Most common values listed per argument
+    MAX_VALUES = 20
+    
+    def __init__(self):
+        super().__init__(name="usage_index", dependencies=["metadata"])
+    
+    def process_batch(self, pdfs: List[PDFExample], context: TaskContext) -> Dict[str, Any]:
+        """Build or update usage_index.json."""
+        previous = self._load_state(context) or {}
+        entries = {}
+        read = 0
+        for pdf in pdfs:
+            if not pdf.is_published():
+                continue
+            metadata_path = context.get_artifact_path(pdf, "metadata.json")
+            signature = self._signature(metadata_path)
+            entry = previous.get(pdf.id)
+            if entry is None or entry["signature"] != signature:
+                metadata_list = context.read_artifact(metadata_path) or []
+                entry = {
+                    "signature": signature,
+                    "titles": {
+                        metadata["slug"]: metadata.get("title") or metadata["slug"]
+                        for metadata in metadata_list if metadata.get("slug")
+                    },
+                    "calls": self._collect_calls(metadata_list)
+                }
+                read += 1
+            entries[pdf.id] = entry
+        
+        state_path = self._state_path(context)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        state_path.write_text(json.dumps({
+            "version": self.USAGE_INDEX_VERSION,
+            "pdfs": entries
+        }, separators=(',', ':')))
+        
+        index = self._build_index(entries)
+        output_path = self._index_path(context)
+        with open(output_path, 'w') as f:
+            json.dump(index, f, separators=(',', ':'), ensure_ascii=False)
+        
+        return {
+            "pdfs": len(entries),
+            "pdfs_read": read,
+            "removed": len(set(previous) - set(entries)),
+            "methods": len(index["methods"]),
+            "call_sites": sum(method["calls"] for method in index["methods"].values()),
+            "size": output_path.stat().st_size
+        }
+    
+    def get_inputs(self, pdf: PDFExample) -> List[Path]:
+        """Inputs are the approach files the metadata is extracted from."""
+        return [approach.file for approach in pdf.approaches if approach.is_published()]
+    
+    def get_outputs(self, pdf: PDFExample, context: TaskContext) -> List[Path]:
+        """Output files - not used for batch tasks."""
+        return []
+    
+    def get_batch_outputs(self, context: TaskContext) -> List[Path]:
+        """Output files for the batch task."""
+        return [self._index_path(context), self._state_path(context)]
+    
+    def needs_batch_processing(self, pdfs: List[PDFExample], context: TaskContext) -> bool:
+        """Rebuild when a PDF's metadata.json changed, or PDFs came or went."""
+        if any(not output.exists() for output in self.get_batch_outputs(context)):
+            return True
+        
+        previous = self._load_state(context)
+        if previous is None:
+            return True
+        
+        current = {
+            pdf.id: self._signature(context.get_artifact_path(pdf, "metadata.json"))
+            for pdf in pdfs if pdf.is_published()
+        }
+        recorded = {pdf_id: entry["signature"] for pdf_id, entry in previous.items()}
+        return current != recorded
+    
+    def _index_path(self, context: TaskContext) -> Path:
+        return context.artifacts_dir / "usage_index.json"
+    
+    def _state_path(self, context: TaskContext) -> Path:
+        return context.artifacts_dir / "usage_index.state.json"
+    
+    def _load_state(self, context: TaskContext) -> Optional[Dict[str, Any]]:
+        """Per-PDF entries of the previous run, if written by this version."""
+        path = self._state_path(context)
+        if not path.exists() or not self._index_path(context).exists():
+            return None
+        try:
+            state = json.loads(path.read_text())
+        except (ValueError, IOError):
+            return None
+        
+        if state.get("version") != self.USAGE_INDEX_VERSION:
+            return None
+        return state.get("pdfs", {})
+    
+    def _signature(self, path: Path) -> Optional[List[int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+    
+    def _collect_calls(self, metadata_list: List[Dict[str, Any]]) -> List[List[Any]]:
+        """Calls of one PDF as [method, slug, cell, line, kwargs, args]."""
+        calls = []
+        for metadata in metadata_list:
+            slug = metadata.get("slug")
+            if not slug:
+                continue
+            for usage in metadata.get("method_usage") or []:
+                if not usage.get("method"):
+                    continue
+                kwargs = {
+                    str(name): self._normalize(value)
+                    for name, value in (usage.get("kwargs") or {}).items()
+                }
+                calls.append([
+                    usage["method"],
+                    slug,
+                    usage.get("cell"),
+                    usage.get("line"),
+                    dict(sorted(kwargs.items())),
+                    [self._normalize(value) for value in usage.get("args") or []]
+                ])
+        return calls
+    
+    def _build_index(self, entries: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Aggregate the per-PDF calls into the usage_index.json layout."""
+        docs: Dict[Tuple[str, str, str], int] = {}
+        sites: Dict[str, List[List[Any]]] = {}
+        examples: Dict[str, Set[str]] = {}
+        kwarg_values: Dict[str, Dict[str, Counter]] = {}
+        arg_values: Dict[str, Dict[str, Counter]] = {}
+        
+        for pdf_id in sorted(entries):
+            titles = entries[pdf_id]["titles"]
+            for method, slug, cell, line, kwargs, args in entries[pdf_id]["calls"]:
+                doc = docs.setdefault((pdf_id, slug, titles.get(slug, slug)), len(docs))
+                sites.setdefault(method, []).append([doc, cell, line, kwargs, args])
+                examples.setdefault(method, set()).add(pdf_id)
+                for name, value in kwargs.items():
+                    kwarg_values.setdefault(method, {}).setdefault(name, Counter())[self._value_key(value)] += 1
+                for position, value in enumerate(args):
+                    arg_values.setdefault(method, {}).setdefault(str(position), Counter())[self._value_key(value)] += 1
+        
+        methods = {}
+        for method in sorted(sites):
+            method_sites = sorted(sites[method], key=lambda site: (site[0], site[1] or 0, site[2] or 0))
+            methods[method] = {
+                "calls": len(method_sites),
+                "examples": len(examples[method]),
+                "sites": method_sites,
+                "kwargs": self._argument_stats(kwarg_values.get(method, {})),
+                "args": self._argument_stats(arg_values.get(method, {}))
+            }
+        
+        return {
+            "version": self.USAGE_INDEX_VERSION,
+            "docs": [list(doc) for doc in docs],
+            "methods": methods
+        }
+    
+    def _argument_stats(self, values: Dict[str, Counter]) -> Dict[str, Any]:
+        """Count and most common values per argument, most used arguments first."""
+        stats = {}
+        for name, counter in sorted(values.items(), key=lambda item: (-sum(item[1].values()), item[0])):
+            stats[name] = {
+                "count": sum(counter.values()),
+                "distinct": len(counter),
+                "values": [
+                    [value, count]
+                    for value, count in sorted(counter.items(), key=lambda item: (-item[1], item[0]))[:self.MAX_VALUES]
+                ]
+            }
+        return stats
+    
+    def _normalize(self, value: Any) -> Any:
+        """Make an extracted argument value JSON-safe (non-JSON literals become strings)."""
+        if value is None or isinstance(value, (str, bool, int, float)):
+            return value
+        if isinstance(value, (list, tuple)):
+            return [self._normalize(item) for item in value]
+        if isinstance(value, dict):
+            return {str(key): self._normalize(item) for key, item in value.items()}
+        return str(value)
+    
+    def _value_key(self, value: Any) -> str:
+        """The string a value is counted under: strings as-is, the rest as JSON."""
+        if isinstance(value, str):
+            return value
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
@@ -8,6 +8,7 @@ from typing import Dict, List, Any
 
 from domain import PDFExample
 from tasks import BatchTask, TaskContext
+from utils.imaging import read_placeholder
 
 
 class ValidationTask(BatchTask):
@@ -50,11 +51,16 @@ class ValidationTask(BatchTask):
                 continue
             
             metadata_list = context.read_artifact(metadata_path)
+            placeholder = read_placeholder(context.artifacts_dir / "screenshots" / pdf.id)
             
             # Validate each approach
             for metadata in metadata_list:
                 errors = self._validate_approach(pdf, metadata, context)
                 
+                # Let the frontend paint a placeholder before the thumbnail loads
+                if placeholder:
+                    metadata['placeholder'] = placeholder
+                
                 # Add ALL metadata to all_metadata, not just valid ones
                 all_metadata.append(metadata)
                 
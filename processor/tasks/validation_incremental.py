@@ -8,6 +8,7 @@ from typing import Dict, List, Any, Set
 
 from domain import PDFExample
 from tasks import Task, TaskContext
+from utils.imaging import read_placeholder
 
 
 class IncrementalValidationTask(Task):
@@ -63,11 +64,16 @@ class IncrementalValidationTask(Task):
         metadata_list = context.read_artifact(metadata_path)
         valid_approaches = []
         invalid_approaches = []
+        placeholder = read_placeholder(context.artifacts_dir / "screenshots" / pdf.id)
         
         # Validate each approach
         for metadata in metadata_list:
             errors = self._validate_approach(pdf, metadata, context)
             
+            # Let the frontend paint a placeholder before the thumbnail loads
+            if placeholder:
+                metadata['placeholder'] = placeholder
+            
             if errors:
                 invalid_approaches.append({
                     "item": metadata,
@@ -0,0 +1,97 @@
+"""
+On-disk cache of markdown analysis results, keyed by content hash.
+
+Each entry holds a file's parsed document (front matter and cells) and
+what MetadataTask extracted from its code, so an unchanged file costs a
+hash and a small JSON read instead of a YAML parse and AST walks.
+Entries live under a directory per analyzer version; bumping the
+version orphans (and removes) the old ones.
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from domain.document import ParsedDocument, content_hash
+
+
+class AnalysisCache:
+    """
+    Content-addressed store at <cache_dir>/<version>/<hh>/<hash>.json.
+    
+    Entries never go stale: a changed file has a different hash. hits and
+    misses count lookups since the cache was opened.
+    """
+    
+    def __init__(self, cache_dir: Path, version: str):
+        self.cache_dir = Path(cache_dir)
+        self.version = str(version)
+        self.hits = 0
+        self.misses = 0
+        self._pruned = False
+    
+    def _entry_path(self, digest: str) -> Path:
+        return self.cache_dir / self.version / digest[:2] / f"{digest}.json"
+    
+    def get(self, content: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the analysis of some markdown content.
+        
+        On a hit the cached document is also registered, so
+        ParsedDocument.parse() (and Approach.document) reuse it.
+        
+        Returns:
+            The stored analysis, or None on a miss (or if the file was
+            stored without one)
+        """
+        path = self._entry_path(content_hash(content))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            ParsedDocument.from_dict(entry["document"])
+            analysis = entry["analysis"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return analysis
+    
+    def has(self, content: str) -> bool:
+        """Whether content has an entry (without loading it or counting a lookup)."""
+        return self._entry_path(content_hash(content)).exists()
+    
+    def put(self, document: ParsedDocument, analysis: Optional[Dict[str, Any]]):
+        """Store a document and its analysis (skipped if not JSON serializable)."""
+        if not self._pruned:
+            self._prune_old_versions()
+        
+        try:
+            data = json.dumps({"document": document.to_dict(), "analysis": analysis},
+                              separators=(',', ':'), ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        
+        path = self._entry_path(document.content_hash)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to temp file first for atomicity
+            temp_file = path.with_suffix('.tmp')
+            temp_file.write_text(data, encoding='utf-8')
+            temp_file.replace(path)
+        except OSError as e:
+            print(f"Warning: Could not write analysis cache: {e}")
+    
+    def _prune_old_versions(self):
+        """Remove entries written by other analyzer versions."""
+        self._pruned = True
+        if not self.cache_dir.exists():
+            return
+        for child in self.cache_dir.iterdir():
+            if child.is_dir() and child.name != self.version:
+                shutil.rmtree(child, ignore_errors=True)
+    
+    def clear(self):
+        """Remove every entry."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
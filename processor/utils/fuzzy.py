@@ -0,0 +1,136 @@
+"""
+Typo-tolerant term lookup with a symmetric deletion (SymSpell) dictionary.
+
+Every vocabulary word is indexed under all strings obtained by deleting
+up to max_distance characters from its prefix. A misspelled query is
+expanded the same way, so candidate corrections are found by dictionary
+lookups instead of comparing the query against every word.
+
+The deletions are sharded by their first character: deleting up to d
+characters leaves a string starting with one of the first d + 1
+characters, so a lookup reads at most max_distance + 1 shards.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.text import fnv1a_32
+
+
+def deletes(word: str, max_distance: int) -> Set[str]:
+    """Get word and every string made by deleting up to max_distance characters."""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        next_frontier -= results
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def delete_shard(key: str, shard_count: int) -> int:
+    """Get the shard holding a deletion key (hashed by its first character)."""
+    return fnv1a_32(key[:1]) % shard_count
+
+
+def build_deletion_index(words: Iterable[str], max_distance: int = 2,
+                         prefix_length: int = 7, shard_count: int = 1) -> Dict[str, object]:
+    """
+    Build a SymSpell deletion dictionary.
+    
+    Args:
+        words: Vocabulary, most important first - a word's position is
+            its ID and breaks ties between equally close corrections
+        max_distance: Largest edit distance to correct
+        prefix_length: Only this many leading characters are expanded,
+            which bounds the dictionary size for long identifiers
+        shard_count: Number of shards the deletions are split into
+    
+    Returns:
+        {"maxDistance", "prefixLength", "shardCount", "words": [...],
+         "shards": [{delete: [word IDs]}, ...]}
+    """
+    words = list(words)
+    index: Dict[str, List[int]] = {}
+    for word_id, word in enumerate(words):
+        for key in deletes(word[:prefix_length], max_distance):
+            index.setdefault(key, []).append(word_id)
+    
+    shards: List[Dict[str, List[int]]] = [{} for _ in range(shard_count)]
+    for key in sorted(index):
+        shards[delete_shard(key, shard_count)][key] = index[key]
+    
+    return {
+        "maxDistance": max_distance,
+        "prefixLength": prefix_length,
+        "shardCount": shard_count,
+        "words": words,
+        "shards": shards
+    }
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Damerau-Levenshtein with adjacent
+    transpositions), or max_distance + 1 once it is known to exceed it.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def lookup(index: Dict[str, object], term: str, max_distance: int = None,
+           load_shard: Optional[Callable[[int], Dict[str, List[int]]]] = None) -> List[Tuple[str, int]]:
+    """
+    Find vocabulary words within max_distance edits of term.
+    
+    Mirrors fuzzyLookup() in the frontend's src/utils/search-engine.js.
+    
+    Args:
+        index: Dictionary from build_deletion_index(); "shards" may be
+            left out when load_shard is given
+        term: Word to correct
+        max_distance: Largest edit distance, the dictionary's by default
+        load_shard: Get a deletion shard by number, for dictionaries
+            whose shards are read on demand
+    
+    Returns:
+        (word, distance) pairs, closest first, then by word ID
+    """
+    if max_distance is None:
+        max_distance = index["maxDistance"]
+    if load_shard is None:
+        load_shard = index["shards"].__getitem__
+    words = index["words"]
+    
+    candidates = set()
+    for key in deletes(term[:index["prefixLength"]], max_distance):
+        table = load_shard(delete_shard(key, index["shardCount"]))
+        candidates.update(table.get(key, ()))
+    
+    matches = []
+    for word_id in candidates:
+        distance = edit_distance(term, words[word_id], max_distance)
+        if distance <= max_distance:
+            matches.append((distance, word_id))
+    
+    return [(words[word_id], distance) for distance, word_id in sorted(matches)]
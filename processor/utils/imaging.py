@@ -0,0 +1,177 @@
+"""
+Image helpers for screenshot artifacts.
+"""
+
+import base64
+import io
+import json
+import math
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# Try to import PIL
+try:
+    from PIL import Image, features
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+    Image = None
+    features = None
+
+
+DZI_NAMESPACE = "http://schemas.microsoft.com/deepzoom/2008"
+
+
+def _resample_filter():
+    """Get the best downsampling filter for this PIL version."""
+    if hasattr(Image, 'Resampling'):
+        return Image.Resampling.LANCZOS
+    return Image.LANCZOS
+
+
+def generate_dzi(image, output_dir: Path, name: str,
+                 tile_size: int = 256, overlap: int = 1,
+                 tile_format: str = "png",
+                 max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Write a Deep Zoom (DZI) tile pyramid for an image.
+    
+    Produces `{name}.dzi` and `{name}_files/{level}/{col}_{row}.{format}`
+    in output_dir, the layout OpenSeadragon and other deep-zoom viewers
+    read. Level max is the full-size image, and each level below it
+    halves the size down to 1x1. Tiles are encoded in a thread pool.
+    
+    Returns:
+        Descriptor with the pyramid's geometry and paths
+    """
+    width, height = image.size
+    max_level = math.ceil(math.log2(max(width, height))) if max(width, height) > 1 else 0
+    
+    files_dir = output_dir / f"{name}_files"
+    if files_dir.exists():
+        shutil.rmtree(files_dir)
+    
+    save_kwargs = {"optimize": True} if tile_format == "png" else {"quality": 85}
+    pil_format = "JPEG" if tile_format in ("jpg", "jpeg") else tile_format.upper()
+    if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    
+    def save_tile(tile, path: Path):
+        tile.save(str(path), pil_format, **save_kwargs)
+    
+    tile_count = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        level_image = image
+        
+        for level in range(max_level, -1, -1):
+            scale = 2 ** (max_level - level)
+            level_width = max(1, math.ceil(width / scale))
+            level_height = max(1, math.ceil(height / scale))
+            if level_image.size != (level_width, level_height):
+                # Each level is downsampled from the one above it
+                level_image = level_image.resize((level_width, level_height), _resample_filter())
+            
+            level_dir = files_dir / str(level)
+            level_dir.mkdir(parents=True, exist_ok=True)
+            
+            cols = math.ceil(level_width / tile_size)
+            rows = math.ceil(level_height / tile_size)
+            for col in range(cols):
+                for row in range(rows):
+                    left = max(0, col * tile_size - overlap)
+                    top = max(0, row * tile_size - overlap)
+                    right = min(level_width, (col + 1) * tile_size + overlap)
+                    bottom = min(level_height, (row + 1) * tile_size + overlap)
+                    
+                    tile = level_image.crop((left, top, right, bottom))
+                    tile_path = level_dir / f"{col}_{row}.{tile_format}"
+                    futures.append(executor.submit(save_tile, tile, tile_path))
+                    tile_count += 1
+        
+        for future in futures:
+            future.result()  # Re-raise any encoding errors
+    
+    dzi_path = output_dir / f"{name}.dzi"
+    dzi_path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Image xmlns="{DZI_NAMESPACE}" Format="{tile_format}" '
+        f'Overlap="{overlap}" TileSize="{tile_size}">\n'
+        f'  <Size Width="{width}" Height="{height}"/>\n'
+        '</Image>\n',
+        encoding='utf-8'
+    )
+    
+    return {
+        "type": "dzi",
+        "dzi_path": dzi_path,
+        "tiles_path": files_dir,
+        "width": width,
+        "height": height,
+        "tile_size": tile_size,
+        "overlap": overlap,
+        "format": tile_format,
+        "levels": max_level + 1,
+        "tile_count": tile_count
+    }
+
+
+def make_placeholder(image, size: int = 16) -> Dict[str, Any]:
+    """
+    Build a tiny low-quality placeholder (LQIP) for an image.
+    
+    The image is shrunk to fit in size x size pixels and encoded as a
+    base64 data URI (WebP if this Pillow build supports it, else PNG),
+    which the frontend can paint, blurred, before the real image loads.
+    
+    Returns:
+        Dict with the data URI, the average colour and the aspect ratio
+    """
+    width, height = image.size
+    scale = min(1.0, size / max(width, height, 1))
+    if image.mode in ("1", "P"):
+        # Palette images can't be resampled with a smoothing filter
+        image = image.convert("RGB")
+    # Shrink first (reducing by whole factors before the final filter),
+    # so only the tiny image is converted
+    small = image.resize(
+        (max(1, round(width * scale)), max(1, round(height * scale))),
+        _resample_filter(),
+        reducing_gap=2.0
+    )
+    if small.mode != "RGB":
+        small = small.convert("RGB")
+    
+    buffer = io.BytesIO()
+    if features.check("webp"):
+        small.save(buffer, "WEBP", quality=40)
+        mime = "image/webp"
+    else:
+        small.save(buffer, "PNG", optimize=True)
+        mime = "image/png"
+    
+    r, g, b = small.resize((1, 1), _resample_filter()).getpixel((0, 0))
+    
+    return {
+        "lqip": f"data:{mime};base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}",
+        "color": f"#{r:02x}{g:02x}{b:02x}",
+        "aspect_ratio": round(image.size[0] / image.size[1], 4) if image.size[1] else None
+    }
+
+
+def read_placeholder(screenshots_dir: Path, page: int = 1) -> Optional[Dict[str, Any]]:
+    """
+    Get a page's placeholder (see make_placeholder) from the screenshot
+    manifest in screenshots_dir, or None if there is none.
+    """
+    try:
+        with open(screenshots_dir / "manifest.json", 'r') as f:
+            manifest = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return None
+    for entry in (manifest or {}).get('pages', []):
+        if entry.get('page') == page:
+            return entry.get('placeholder')
+    return None
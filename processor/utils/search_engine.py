@@ -0,0 +1,195 @@
+"""
+Offline query engine for the sharded search index.
+
+Reads artifacts/search/ (written by SearchIndexTask) and scores queries
+the same way searchDocuments() in the frontend's
+src/utils/search-engine.js does, so search latency and relevance can be
+measured without a browser.
+"""
+
+import bisect
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.fuzzy import lookup
+from utils.text import fnv1a_32, is_cjk_char, normalize, tokenize
+from utils.trie import complete as trie_complete
+
+# Same constants as search-engine.js
+PREFIX_WEIGHT = 0.7  # Terms matched by prefix (the word still being typed)
+MAX_PREFIX_TERMS = 10
+FUZZY_WEIGHT = 0.5  # Terms substituted for a misspelled word
+MAX_FUZZY_TERMS = 3
+MAX_CHAR_TERMS = 50  # Bigrams searched for a lone CJK character (most common first)
+
+
+class SearchEngine:
+    """
+    Query engine over artifacts/search/.
+    
+    Like the browser, it reads the manifest and the docs table up front
+    and loads shards, the autocomplete trie and the typo dictionary the
+    first time a query needs them. bytes_loaded counts the JSON read so
+    far, i.e. what the browser would have downloaded.
+    """
+    
+    def __init__(self, search_dir: Path):
+        self.search_dir = Path(search_dir)
+        self.bytes_loaded = 0
+        self.manifest = self._read("manifest.json")
+        self.docs: List[Optional[Dict[str, Any]]] = self._read(self.manifest["docs"])
+        self._shards: Dict[int, Dict[str, Any]] = {}
+        self._decoded: Dict[str, List[Tuple[int, float]]] = {}
+        self._autocomplete = None
+        self._typos = None
+        self._typo_shards: Dict[int, Dict[str, List[int]]] = {}
+    
+    def _read(self, filename: str) -> Any:
+        data = (self.search_dir / filename).read_bytes()
+        self.bytes_loaded += len(data)
+        return json.loads(data)
+    
+    def _shard_for(self, term: str) -> int:
+        return fnv1a_32(term[:self.manifest["prefixLength"]]) % self.manifest["shardCount"]
+    
+    def _load_shard(self, term: str) -> Dict[str, Any]:
+        """Load (once) the shard holding a term and all terms sharing its prefix."""
+        return self._load_shard_number(self._shard_for(term))
+    
+    def _load_shard_number(self, number: int) -> Dict[str, Any]:
+        if number not in self._shards:
+            filename = self.manifest["shards"][number]
+            postings = self._read(filename)["postings"] if filename else {}
+            self._shards[number] = {"postings": postings, "terms": sorted(postings)}
+        return self._shards[number]
+    
+    def _get_postings(self, shard: Dict[str, Any], term: str) -> List[Tuple[int, float]]:
+        """Decode a term's posting list into (doc ID, score) pairs, applying its IDF."""
+        if term in self._decoded:
+            return self._decoded[term]
+        
+        encoded = shard["postings"].get(term)
+        pairs = []
+        if encoded:
+            doc_count = self.manifest["docCount"]
+            scale = self.manifest["scoreScale"]
+            df = len(encoded) / 2
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            doc_id = 0
+            for i in range(0, len(encoded), 2):
+                doc_id += encoded[i]
+                pairs.append((doc_id, idf * encoded[i + 1] / scale))
+        self._decoded[term] = pairs
+        return pairs
+    
+    def _expand_prefix(self, shard: Dict[str, Any], prefix: str) -> List[str]:
+        """Find a shard's terms starting with a prefix."""
+        terms = shard["terms"]
+        matches = []
+        for i in range(bisect.bisect_left(terms, prefix), len(terms)):
+            if len(matches) >= MAX_PREFIX_TERMS or not terms[i].startswith(prefix):
+                break
+            matches.append(terms[i])
+        return matches
+    
+    def _character_terms(self, char: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Find the terms containing a lone CJK character: the character
+        itself and the bigrams it starts or ends. Bigrams are sharded by
+        both their characters, so every shard is loaded.
+        """
+        matches = []
+        for number in range(self.manifest["shardCount"]):
+            shard = self._load_shard_number(number)
+            for term in shard["terms"]:
+                if term == char or (len(term) == 2 and char in term):
+                    matches.append((term, shard))
+        # Most documents first, then alphabetically
+        matches.sort(key=lambda match: (-len(match[1]["postings"][match[0]]), match[0]))
+        return matches[:MAX_CHAR_TERMS]
+    
+    def fuzzy_lookup(self, term: str) -> List[Tuple[str, int]]:
+        """
+        Find indexed terms within the typo dictionary's edit distance of
+        a term, loading only the deletion shards the term needs.
+        """
+        typos = self.manifest.get("typos")
+        if not typos:
+            return []
+        if self._typos is None:
+            self._typos = dict(typos, words=self._read(typos["words"])["words"])
+        return lookup(self._typos, term, load_shard=self._load_typo_shard)
+    
+    def _load_typo_shard(self, number: int) -> Dict[str, List[int]]:
+        if number not in self._typo_shards:
+            filename = self.manifest["typos"]["shards"][number]
+            self._typo_shards[number] = self._read(filename)["deletes"] if filename else {}
+        return self._typo_shards[number]
+    
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Score documents for a query.
+        
+        Each query term contributes its BM25F score; the last term is
+        also matched as a prefix, a lone CJK character matches the
+        bigrams it is part of, and a term that isn't in the index is
+        replaced by its closest spellings.
+        
+        Returns:
+            [{"doc": ..., "score": ...}] sorted by descending score
+        """
+        query_terms = tokenize(query)
+        shards = [self._load_shard(term) for term in query_terms]
+        scores: Dict[int, float] = {}
+        
+        for position, term in enumerate(query_terms):
+            shard = shards[position]
+            # Best score per document for this query term
+            term_scores: Dict[int, float] = {}
+            candidates = [(term, 1, shard)]
+            lone_char = is_cjk_char(term)
+            if lone_char:
+                candidates.extend(
+                    (match, 1, match_shard)
+                    for match, match_shard in self._character_terms(term) if match != term
+                )
+            elif position == len(query_terms) - 1:
+                for match in self._expand_prefix(shard, term):
+                    if match != term:
+                        candidates.append((match, PREFIX_WEIGHT, shard))
+            
+            # Unknown word: fall back to the closest spellings in the vocabulary
+            if not lone_char and len(candidates) == 1 and not shard["postings"].get(term):
+                corrections = self.fuzzy_lookup(term)
+                best = corrections[0][1] if corrections else 0
+                for word, distance in corrections[:MAX_FUZZY_TERMS]:
+                    if distance > best:
+                        break
+                    candidates.append((word, FUZZY_WEIGHT, self._load_shard(word)))
+            
+            for candidate, weight, candidate_shard in candidates:
+                for doc_id, score in self._get_postings(candidate_shard, candidate):
+                    weighted = score * weight
+                    if weighted > term_scores.get(doc_id, 0):
+                        term_scores[doc_id] = weighted
+            
+            for doc_id, score in term_scores.items():
+                scores[doc_id] = scores.get(doc_id, 0) + score
+        
+        results = [
+            {"doc": self.docs[doc_id], "score": score}
+            for doc_id, score in scores.items()
+            if doc_id < len(self.docs) and self.docs[doc_id]
+        ]
+        results.sort(key=lambda result: -result["score"])
+        return results[:limit]
+    
+    def complete(self, prefix: str) -> List[Tuple[str, int]]:
+        """Complete a prefix from the autocomplete trie."""
+        if not self.manifest.get("autocomplete"):
+            return []
+        if self._autocomplete is None:
+            self._autocomplete = self._read(self.manifest["autocomplete"])
+        return trie_complete(self._autocomplete, normalize(prefix))
@@ -0,0 +1,140 @@
+"""
+Text helpers for building search indices.
+
+The frontend mirrors tokenize() and fnv1a_32() in
+src/utils/search-engine.js, so any change here has to be made there
+as well.
+"""
+
+import re
+import unicodedata
+from typing import List, Tuple
+
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were'
+})
+
+WORD_RE = re.compile(r'\w+')
+
+# Scripts written without spaces between words - indexed as character bigrams
+CJK_RANGES = (
+    (0x1100, 0x11FF),    # Hangul Jamo
+    (0x3040, 0x30FF),    # Hiragana, Katakana
+    (0x3130, 0x318F),    # Hangul Compatibility Jamo
+    (0x31F0, 0x31FF),    # Katakana Phonetic Extensions
+    (0x3400, 0x4DBF),    # CJK Unified Ideographs Extension A
+    (0x4E00, 0x9FFF),    # CJK Unified Ideographs
+    (0xAC00, 0xD7AF),    # Hangul Syllables
+    (0xF900, 0xFAFF),    # CJK Compatibility Ideographs
+    (0x20000, 0x2FA1F),  # CJK Extensions B-F, Compatibility Supplement
+)
+
+# Characters dropped before tokenizing
+_REMOVED = (
+    [0x00AD, 0x200C, 0x200D]  # Soft hyphen, ZWNJ, ZWJ (Indic shaping controls)
+    + [0x0640]  # Arabic tatweel
+    + list(range(0x064B, 0x0660)) + [0x0670]  # Arabic harakat, superscript alef
+)
+_NORMALIZE_TABLE = {cp: None for cp in _REMOVED}
+_NORMALIZE_TABLE.update({
+    0x0623: 'ا', 0x0625: 'ا', 0x0622: 'ا', 0x0671: 'ا',  # Alef variants
+    0x0649: 'ي',  # Alef maksura
+    0x0629: 'ه',  # Teh marbuta
+})
+
+_BREAK, _WORD, _CJK = 0, 1, 2
+
+
+def _is_cjk(cp: int) -> bool:
+    for start, end in CJK_RANGES:
+        if cp < start:
+            return False
+        if cp <= end:
+            return True
+    return False
+
+
+def is_cjk_char(text: str) -> bool:
+    """Whether text is a single CJK character (a term tokenize() keeps alone)."""
+    return len(text) == 1 and _is_cjk(ord(text))
+
+
+def _char_class(ch: str) -> int:
+    """Classify a character as part of a word, a CJK run or a break."""
+    category = unicodedata.category(ch)
+    # Marks count as word characters so Indic vowel signs don't split words
+    if category[0] in 'LNM':
+        return _CJK if _is_cjk(ord(ch)) else _WORD
+    return _WORD if ch == '_' else _BREAK
+
+
+def _scan(text: str) -> List[Tuple[int, str]]:
+    """Split normalized text into (class, run) pairs of word and CJK runs."""
+    if text.isascii():
+        return [(_WORD, word) for word in WORD_RE.findall(text)]
+    
+    runs = []
+    start = 0
+    current = _BREAK
+    for i, ch in enumerate(text):
+        cls = _char_class(ch)
+        if cls != current:
+            if current != _BREAK:
+                runs.append((current, text[start:i]))
+            start = i
+            current = cls
+    if current != _BREAK:
+        runs.append((current, text[start:]))
+    return runs
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize text for indexing.
+    
+    NFKC folds full-width and compatibility forms; then the text is
+    lowercased, Indic joiners and Arabic diacritics/tatweel are removed
+    and Arabic letter variants are unified.
+    """
+    return unicodedata.normalize('NFKC', text).lower().translate(_NORMALIZE_TABLE)
+
+
+def tokenize(text: str, min_length: int = 2) -> List[str]:
+    """
+    Split text into lowercase search terms.
+    
+    Identifiers are kept whole and also split on underscores, so
+    `extract_table` yields `extract_table`, `extract` and `table`.
+    Runs of CJK characters become overlapping character bigrams (a
+    lone character is kept as is). Stop words and non-CJK terms shorter
+    than min_length are dropped.
+    """
+    tokens = []
+    
+    for cls, run in _scan(normalize(text)):
+        if cls == _CJK:
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            continue
+        
+        parts = [run]
+        if '_' in run:
+            parts.extend(p for p in run.split('_') if p)
+        
+        for part in parts:
+            if len(part) >= min_length and part not in STOP_WORDS:
+                tokens.append(part)
+    
+    return tokens
+
+
+def fnv1a_32(text: str) -> int:
+    """32-bit FNV-1a hash of the UTF-8 bytes of text (stable across runs and in JS)."""
+    value = 0x811c9dc5
+    for byte in text.encode('utf-8'):
+        value ^= byte
+        value = (value * 0x01000193) & 0xffffffff
+    return value
@@ -0,0 +1,111 @@
+"""
+Prefix completion trie for search autocomplete.
+
+The trie is built once at index time and serialized as nested lists,
+so the frontend can complete a prefix by walking at most len(prefix)
+characters - every node already holds its best completions.
+"""
+
+from typing import Dict, List, Any, Tuple
+
+
+class _Node:
+    __slots__ = ("children", "entry", "top")
+    
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.entry = None  # Index of the entry ending here
+        self.top: List[int] = []
+
+
+def build_completion_trie(entries: List[Tuple[str, str, int]],
+                          top_k: int = 8) -> Dict[str, Any]:
+    """
+    Build a radix trie over weighted completion entries.
+    
+    Args:
+        entries: (key, display text, weight) tuples. Keys are what the
+            user types (lowercased); display text is what is suggested.
+        top_k: Number of completions stored at each node
+    
+    Returns:
+        {"entries": [[text, weight], ...], "root": node} where a node is
+        [top, {edge_label: node, ...}] and top lists entry indices by
+        descending weight; a leaf is just its entry index. Chains of
+        single-child nodes are merged into one multi-character edge.
+        Without entries the root is the empty node [[], {}].
+    """
+    # Heaviest entries first, so ranks double as tie-breaks
+    ordered = sorted(
+        (entry for entry in entries if entry[0]),
+        key=lambda entry: (-entry[2], entry[0], entry[1])
+    )
+    
+    root = _Node()
+    for index, (key, _text, _weight) in enumerate(ordered):
+        node = root
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+        if node.entry is None:
+            node.entry = index
+    
+    _collect_top(root, top_k)
+    
+    return {
+        "entries": [[text, weight] for _key, text, weight in ordered],
+        "root": _serialize(root) if root.children else [[], {}]
+    }
+
+
+def _collect_top(node: _Node, top_k: int) -> List[int]:
+    """Fill in each node's best entries (lowest index = heaviest), bottom-up."""
+    candidates = [node.entry] if node.entry is not None else []
+    for child in node.children.values():
+        candidates.extend(_collect_top(child, top_k))
+    node.top = sorted(candidates)[:top_k]
+    return node.top
+
+
+def _serialize(node: _Node) -> List[Any]:
+    """Serialize a node, merging single-child chains into radix edges."""
+    edges = {}
+    for ch, child in sorted(node.children.items()):
+        label = ch
+        while len(child.children) == 1 and child.entry is None:
+            (next_ch, next_child), = child.children.items()
+            label += next_ch
+            child = next_child
+        edges[label] = _serialize(child)
+    if not edges:
+        # A leaf's only completion is its own entry
+        return node.entry
+    return [node.top, edges]
+
+
+def complete(trie: Dict[str, Any], prefix: str) -> List[Tuple[str, int]]:
+    """
+    Get the best completions of a prefix as (text, weight) pairs.
+    
+    Mirrors complete() in the frontend's src/utils/search-engine.js.
+    """
+    node = trie["root"]
+    if node is None:
+        # Empty tries of older builds
+        return []
+    remaining = prefix
+    while remaining:
+        if isinstance(node, int):
+            return []
+        for label, child in node[1].items():
+            if remaining.startswith(label):
+                node = child
+                remaining = remaining[len(label):]
+                break
+            if label.startswith(remaining):
+                node = child
+                remaining = ""
+                break
+        else:
+            return []
+    top = [node] if isinstance(node, int) else node[0]
+    return [tuple(trie["entries"][index]) for index in top]